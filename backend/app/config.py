@@ -6,16 +6,145 @@ from dotenv import load_dotenv
 ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
 load_dotenv(dotenv_path=ENV_PATH, override=False)
 
+
+def _env(name: str, default: str) -> str:
+    """Like os.getenv, but an empty value (a bare `KEY=` line in .env) counts as unset."""
+    return os.getenv(name) or default
+
+
 class Settings:
     ASR_PROVIDER: str = os.getenv("ASR_PROVIDER", "vosk").lower()
     VOSK_MODEL_PATH: str = os.getenv("VOSK_MODEL_PATH", "")
+    # Per-language Vosk models ("en:/models/en,hi:/models/hi"); VOSK_MODEL_PATH serves
+    # VOSK_DEFAULT_LANG and any language without its own model. Models load on first
+    # use (ASR_PRELOAD_LANGS at startup) and the least recently used are dropped once
+    # ASR_MEMORY_BUDGET_MB is exceeded (0 = no limit).
+    VOSK_MODEL_PATHS: str = _env("VOSK_MODEL_PATHS", "")
+    VOSK_DEFAULT_LANG: str = _env("VOSK_DEFAULT_LANG", "en")
+    ASR_PRELOAD_LANGS: str = _env("ASR_PRELOAD_LANGS", "")
+    ASR_MEMORY_BUDGET_MB: float = float(_env("ASR_MEMORY_BUDGET_MB", "0"))
     LIBRETRANSLATE_URL: str = os.getenv("LIBRETRANSLATE_URL", "https://libretranslate.com")
+    # Provider routing: circuit opens after N consecutive failures, half-opens after the cool-down
+    ROUTER_FAILURE_THRESHOLD: int = int(_env("ROUTER_FAILURE_THRESHOLD", "3"))
+    ROUTER_OPEN_SECONDS: float = float(_env("ROUTER_OPEN_SECONDS", "30"))
+    # Outbound HTTP: keep-alive clients pooled per host and shared by every provider,
+    # over HTTP/2 when HTTP_HTTP2 is on and httpx + h2 are installed (else requests)
+    HTTP_POOL_HOSTS: int = int(_env("HTTP_POOL_HOSTS", "16"))
+    HTTP_POOL_PER_HOST: int = int(_env("HTTP_POOL_PER_HOST", "32"))
+    HTTP_TIMEOUT: float = float(_env("HTTP_TIMEOUT", "10"))
+    HTTP_KEEPALIVE_SECONDS: float = float(_env("HTTP_KEEPALIVE_SECONDS", "60"))
+    HTTP_HTTP2: bool = _env("HTTP_HTTP2", "1") not in ("0", "false", "no")
+    # Background translator health probes (0 disables); pair as "src:tgt"
+    HEALTH_PROBE_SECONDS: float = float(_env("HEALTH_PROBE_SECONDS", "30"))
+    HEALTH_PROBE_PAIR: str = _env("HEALTH_PROBE_PAIR", "en:hi")
+    # Hedged translation: race a backup provider once the primary exceeds its p95.
+    # TRANSLATE_HEDGE_BUDGET caps backups as a fraction of requests (0.1 = at most ~10% extra load).
+    TRANSLATE_HEDGE: bool = _env("TRANSLATE_HEDGE", "0") in ("1", "true", "yes")
+    TRANSLATE_HEDGE_BUDGET: float = float(_env("TRANSLATE_HEDGE_BUDGET", "0.1"))
+    TRANSLATE_HEDGE_MIN_DELAY_MS: float = float(_env("TRANSLATE_HEDGE_MIN_DELAY_MS", "150"))
+    TRANSLATE_HEDGE_MAX_DELAY_MS: float = float(_env("TRANSLATE_HEDGE_MAX_DELAY_MS", "2000"))
+    # Cross-session micro-batching of translation calls per language pair
+    TRANSLATE_BATCH: bool = _env("TRANSLATE_BATCH", "1") not in ("0", "false", "no")
+    TRANSLATE_BATCH_MAX: int = int(_env("TRANSLATE_BATCH_MAX", "32"))
+    TRANSLATE_BATCH_MAX_WAIT_MS: float = float(_env("TRANSLATE_BATCH_MAX_WAIT_MS", "15"))
+    # Offline Argos models: pairs ("src:tgt,...") loaded at startup in the background;
+    # missing pairs are installed in the background when ARGOS_AUTO_INSTALL is on.
+    # TRANSLATE_PREFER_OFFLINE puts a warm Argos model ahead of the online providers.
+    ARGOS_PRELOAD_PAIRS: str = _env("ARGOS_PRELOAD_PAIRS", "en:hi")
+    ARGOS_AUTO_INSTALL: bool = _env("ARGOS_AUTO_INSTALL", "1") not in ("0", "false", "no")
+    TRANSLATE_PREFER_OFFLINE: bool = _env("TRANSLATE_PREFER_OFFLINE", "0") in ("1", "true", "yes")
     FRONTEND_ORIGIN: str = os.getenv("FRONTEND_ORIGIN", "http://localhost:5173")
     STORAGE_AUDIO: str = os.getenv("STORAGE_AUDIO", "backend/storage/audio")
     STORAGE_VIDEO: str = os.getenv("STORAGE_VIDEO", "backend/storage/videos")
     MISTRAL_API_KEY: str = os.getenv("MISTRAL_API_KEY", "")
     MISTRAL_MODEL: str = os.getenv("MISTRAL_MODEL", "voxtral-mini-latest")
     MISTRAL_API_URL: str = os.getenv("MISTRAL_API_URL", "https://api.mistral.ai/v1/chat/completions")
+    # Per-session ffmpeg decoders idle longer than this are reaped
+    DECODER_IDLE_SECONDS: float = float(_env("DECODER_IDLE_SECONDS", "120"))
+    # Session store: memory (one worker), sqlite (WAL file shared by workers on a host
+    # or shared disk) or redis (SESSION_STORE_URL, shared across nodes). Sessions idle
+    # longer than SESSION_TTL_SECONDS expire (0 = never). NODE_ID names this worker in
+    # the X-Session-Node sticky-routing header (default host:pid).
+    SESSION_STORE: str = _env("SESSION_STORE", "memory").lower()
+    SESSION_STORE_PATH: str = _env("SESSION_STORE_PATH", "backend/storage/sessions.sqlite3")
+    SESSION_STORE_URL: str = _env("SESSION_STORE_URL", "redis://127.0.0.1:6379/0")
+    SESSION_TTL_SECONDS: float = float(_env("SESSION_TTL_SECONDS", "3600"))
+    NODE_ID: str = _env("NODE_ID", "")
+    # Memory-store segment timelines are journaled here (one JSONL file per session) and
+    # replayed at startup, so a restart keeps in-flight sessions. Empty disables the journal.
+    SESSION_JOURNAL_DIR: str = _env("SESSION_JOURNAL_DIR", "backend/storage/journals")
+    # Worker pools: CPU-bound Vosk decoding runs in ASR_PROCESSES worker
+    # processes forked after the model loads (0 = threads in the API process),
+    # with jobs routed per session; each stage admits *_CONCURRENCY calls at once
+    # and queues at most STAGE_QUEUE_LIMIT more before returning 503.
+    ASR_PROCESSES: int = int(_env("ASR_PROCESSES", "2"))
+    # A worker call that takes longer fails the chunk and the worker is killed and respawned
+    ASR_CALL_TIMEOUT_SECONDS: float = float(_env("ASR_CALL_TIMEOUT_SECONDS", "30"))
+    DECODE_CONCURRENCY: int = int(_env("DECODE_CONCURRENCY", "4"))
+    ASR_CONCURRENCY: int = int(_env("ASR_CONCURRENCY", "2"))
+    TRANSLATE_CONCURRENCY: int = int(_env("TRANSLATE_CONCURRENCY", "8"))
+    TTS_CONCURRENCY: int = int(_env("TTS_CONCURRENCY", "8"))
+    IO_CONCURRENCY: int = int(_env("IO_CONCURRENCY", "4"))
+    STAGE_QUEUE_LIMIT: int = int(_env("STAGE_QUEUE_LIMIT", "32"))
+    # Voice activity detection on decoded chunks: silent chunks skip ASR/translate/TTS
+    # and speech is trimmed to its span. VAD_MODE is energy (NumPy) or webrtc (needs webrtcvad).
+    VAD: bool = _env("VAD", "1") not in ("0", "false", "no")
+    VAD_MODE: str = _env("VAD_MODE", "energy").lower()
+    VAD_THRESHOLD_DB: float = float(_env("VAD_THRESHOLD_DB", "9"))
+    VAD_HANGOVER_MS: int = int(_env("VAD_HANGOVER_MS", "300"))
+    VAD_MIN_SPEECH_MS: int = int(_env("VAD_MIN_SPEECH_MS", "120"))
+    # Build each session's dubbed AAC track while it runs so render only muxes
+    DUB_TRACK_INCREMENTAL: bool = _env("DUB_TRACK_INCREMENTAL", "1") not in ("0", "false", "no")
+    # Rate the dubbed track is mixed at; gTTS clips are 24 kHz, so this avoids resampling them
+    MIX_SAMPLE_RATE: int = int(_env("MIX_SAMPLE_RATE", "24000"))
+    # Render jobs: a dedicated pool (RENDER_WORKERS) with a bounded queue, niced ffmpeg
+    # (RENDER_FFMPEG_THREADS caps encoder threads, 0 = ffmpeg default); jobs persist as JSON
+    RENDER_WORKERS: int = int(_env("RENDER_WORKERS", "1"))
+    RENDER_MAX_QUEUED: int = int(_env("RENDER_MAX_QUEUED", "8"))
+    RENDER_NICE: int = int(_env("RENDER_NICE", "10"))
+    RENDER_FFMPEG_THREADS: int = int(_env("RENDER_FFMPEG_THREADS", "0"))
+    RENDER_JOBS_DIR: str = _env("RENDER_JOBS_DIR", "backend/storage/render_jobs")
+    # Burned-in subtitles are encoded in this many keyframe-aligned ranges at once
+    # (0 = auto: half the CPU cores, at most 8; 1 = single encode)
+    RENDER_PARALLEL_PARTS: int = int(_env("RENDER_PARALLEL_PARTS", "0"))
+    # Content-addressed cache of render artifacts (SRT, dubbed audio, encoded parts, final MP4)
+    RENDER_CACHE: bool = _env("RENDER_CACHE", "1") not in ("0", "false", "no")
+    RENDER_CACHE_DIR: str = _env("RENDER_CACHE_DIR", "backend/storage/render_cache")
+    RENDER_CACHE_MAX_MB: float = float(_env("RENDER_CACHE_MAX_MB", "2048"))
+    # Chunks a single session may have in flight across its pipeline stages
+    PIPELINE_MAX_PENDING: int = int(_env("PIPELINE_MAX_PENDING", "8"))
+    # Translation cache: in-memory LRU in front of a SQLite file
+    TRANSLATION_CACHE: bool = _env("TRANSLATION_CACHE", "1") not in ("0", "false", "no")
+    TRANSLATION_CACHE_PATH: str = _env("TRANSLATION_CACHE_PATH", "backend/storage/cache/translations.sqlite3")
+    TRANSLATION_CACHE_MEMORY_ITEMS: int = int(_env("TRANSLATION_CACHE_MEMORY_ITEMS", "4096"))
+    TRANSLATION_CACHE_MAX_ENTRIES: int = int(_env("TRANSLATION_CACHE_MAX_ENTRIES", "200000"))
+    TRANSLATION_CACHE_TTL_HOURS: float = float(_env("TRANSLATION_CACHE_TTL_HOURS", "720"))
+    # Content-addressed TTS clip cache (disk LRU under a byte budget + small memory tier)
+    TTS_CACHE: bool = _env("TTS_CACHE", "1") not in ("0", "false", "no")
+    TTS_CACHE_DIR: str = _env("TTS_CACHE_DIR", "backend/storage/tts_cache")
+    TTS_CACHE_MAX_MB: float = float(_env("TTS_CACHE_MAX_MB", "512"))
+    TTS_CACHE_MEMORY_MB: float = float(_env("TTS_CACHE_MEMORY_MB", "16"))
+    TTS_VOICE: str = _env("TTS_VOICE", "com")
+    # Streaming TTS (response_mode=stream|ws): translated text is split at sentence/clause
+    # boundaries (first piece <= TTS_STREAM_FIRST_CHARS, others <= TTS_STREAM_MAX_CHARS) and
+    # the pieces render concurrently on TTS_STREAM_WORKERS threads, delivered in order
+    TTS_STREAMING: bool = _env("TTS_STREAMING", "1") not in ("0", "false", "no")
+    TTS_STREAM_WORKERS: int = int(_env("TTS_STREAM_WORKERS", "4"))
+    TTS_STREAM_MAX_CHARS: int = int(_env("TTS_STREAM_MAX_CHARS", "120"))
+    TTS_STREAM_FIRST_CHARS: int = int(_env("TTS_STREAM_FIRST_CHARS", "60"))
+
+    # Storage lifecycle: session files are sharded per session (<root>/<sid[:2]>/<sid>/),
+    # a janitor sweeps every STORAGE_JANITOR_SECONDS (0 = off) and removes chunk clips and
+    # uploads of ended sessions after their retention, render outputs after theirs, and the
+    # oldest removable files above STORAGE_MAX_MB. Sessions above STORAGE_SESSION_MAX_MB lose
+    # their render outputs first and then get 507 on new chunks/uploads. 0 = no quota.
+    STORAGE_SHARDED: bool = _env("STORAGE_SHARDED", "1") not in ("0", "false", "no")
+    STORAGE_JANITOR_SECONDS: float = float(_env("STORAGE_JANITOR_SECONDS", "60"))
+    STORAGE_MAX_MB: float = float(_env("STORAGE_MAX_MB", "10240"))
+    STORAGE_SESSION_MAX_MB: float = float(_env("STORAGE_SESSION_MAX_MB", "1024"))
+    STORAGE_AUDIO_RETENTION_HOURS: float = float(_env("STORAGE_AUDIO_RETENTION_HOURS", "6"))
+    STORAGE_UPLOAD_RETENTION_HOURS: float = float(_env("STORAGE_UPLOAD_RETENTION_HOURS", "6"))
+    STORAGE_RENDER_RETENTION_HOURS: float = float(_env("STORAGE_RENDER_RETENTION_HOURS", "48"))
 
     def ensure_storage(self):
         Path(self.STORAGE_AUDIO).mkdir(parents=True, exist_ok=True)
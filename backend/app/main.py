@@ -1,30 +1,54 @@
+import asyncio
 import base64
+import json
 import os
 import shutil
+import socket
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import quote
 import logging
 
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 from .config import settings
 from .models.schemas import SessionStartResponse, ChunkResponse, StopResponse
-from .services.asr_vosk import VoskASR
+from .services.asr_registry import VoskModelRegistry, parse_model_paths
+from .services.asr_pool import VoskWorkerPool
 from .services.asr_mistral import MistralASR
 from .services.translate_libre import LibreTranslate
 from .services.translate_orchestrator import TranslatorOrchestrator
+from .services.translate_cache import TranslationCache
+from .services.provider_router import ProviderRouter
+from .services.health_prober import HealthProber
+from .services.translate_hedge import HedgeBudget, HedgedTranslator
+from .services.translate_batcher import TranslationBatcher
 try:
     from .services.translate_argos import ArgosTranslate
     _ARGOS_AVAIL = True
 except Exception:
     _ARGOS_AVAIL = False
+from .services.argos_registry import ArgosModelRegistry, parse_pairs
 from .services.tts_gtts import GTTSService
-from .utils.audio import transcode_to_wav_mono_16k
-from .services.render_ffmpeg import render_final_video
+from .services.tts_cache import TTSCache
+from .services.tts_streaming import StreamingTTS
+from .utils.decoder import DecoderPool, StreamDecoder, stream_format_for
+from .utils.vad import VoiceActivityDetector
+from .utils import http
+from .services.render_ffmpeg import RenderControl, render_final_video
+from .services.render_segmented import resolve_parts
+from .services.render_cache import RenderCache
+from .services.session_store import make_session_store
+from .services.storage_janitor import AUDIO, RENDER, UPLOAD, StorageJanitor
+from .services.render_jobs import RenderJob, RenderJobManager
+from .services.dub_track import DubTrackRegistry
+from .services.scheduler import Scheduler, StageOverloaded
+from .services.pipeline import ChunkJob, PipelineRegistry, SessionPipeline
 
 app = FastAPI(title="Real-Time Video Translation & Dubbing")
 
@@ -54,14 +78,121 @@ except Exception:
     pass
 
 # Globals / Singletons
+http.configure(
+    pool_hosts=settings.HTTP_POOL_HOSTS,
+    pool_per_host=settings.HTTP_POOL_PER_HOST,
+    timeout=settings.HTTP_TIMEOUT,
+    keepalive_seconds=settings.HTTP_KEEPALIVE_SECONDS,
+    http2=settings.HTTP_HTTP2,
+)
 ASR = None
 # Compose multi-provider translator (Libre -> MyMemory fallback -> Argos offline)
-_libre = LibreTranslate(settings.LIBRETRANSLATE_URL)
-_argos = ArgosTranslate() if _ARGOS_AVAIL else None
-TRANSLATE = TranslatorOrchestrator(_libre, _argos)
-TTS = GTTSService()
+ROUTER = ProviderRouter(
+    failure_threshold=settings.ROUTER_FAILURE_THRESHOLD,
+    open_seconds=settings.ROUTER_OPEN_SECONDS,
+)
+_libre = LibreTranslate(settings.LIBRETRANSLATE_URL, router=ROUTER)
+ARGOS_MODELS = ArgosModelRegistry(auto_install=settings.ARGOS_AUTO_INSTALL)
+_argos = ArgosTranslate(ARGOS_MODELS) if _ARGOS_AVAIL else None
+_translation_cache = None
+if settings.TRANSLATION_CACHE:
+    try:
+        _translation_cache = TranslationCache(
+            settings.TRANSLATION_CACHE_PATH,
+            memory_items=settings.TRANSLATION_CACHE_MEMORY_ITEMS,
+            max_entries=settings.TRANSLATION_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.TRANSLATION_CACHE_TTL_HOURS * 3600,
+        )
+    except Exception as e:
+        logger.warning("translate.cache.disabled err=%s", e)
+_hedger = None
+if settings.TRANSLATE_HEDGE:
+    _hedger = HedgedTranslator(
+        ROUTER,
+        budget=HedgeBudget(ratio=settings.TRANSLATE_HEDGE_BUDGET),
+        min_delay_ms=settings.TRANSLATE_HEDGE_MIN_DELAY_MS,
+        max_delay_ms=settings.TRANSLATE_HEDGE_MAX_DELAY_MS,
+        max_workers=settings.TRANSLATE_CONCURRENCY * 2,
+    )
+TRANSLATE = TranslatorOrchestrator(
+    _libre, _argos, cache=_translation_cache, hedger=_hedger, prefer_offline=settings.TRANSLATE_PREFER_OFFLINE,
+)
+BATCHER = None
+if settings.TRANSLATE_BATCH:
+    BATCHER = TranslationBatcher(
+        TRANSLATE,
+        run=lambda fn, *args: SCHED.run("translate", fn, *args, reject=False),
+        max_batch=settings.TRANSLATE_BATCH_MAX,
+        max_wait_ms=settings.TRANSLATE_BATCH_MAX_WAIT_MS,
+    )
+_probe_src, _, _probe_tgt = settings.HEALTH_PROBE_PAIR.partition(":")
+PROBER = HealthProber(_libre, _argos, interval=settings.HEALTH_PROBE_SECONDS, source=_probe_src or "en", target=_probe_tgt or "hi")
+_tts_cache = None
+if settings.TTS_CACHE:
+    try:
+        _tts_cache = TTSCache(
+            settings.TTS_CACHE_DIR,
+            max_bytes=int(settings.TTS_CACHE_MAX_MB * 1024 * 1024),
+            memory_bytes=int(settings.TTS_CACHE_MEMORY_MB * 1024 * 1024),
+        )
+    except Exception as e:
+        logger.warning("tts.cache.disabled err=%s", e)
+TTS = GTTSService(cache=_tts_cache, voice=settings.TTS_VOICE)
+STREAM_TTS = None
+if settings.TTS_STREAMING:
+    STREAM_TTS = StreamingTTS(
+        TTS,
+        workers=settings.TTS_STREAM_WORKERS,
+        max_chars=settings.TTS_STREAM_MAX_CHARS,
+        first_chars=settings.TTS_STREAM_FIRST_CHARS,
+    )
+DECODERS = DecoderPool(idle_timeout=settings.DECODER_IDLE_SECONDS)
+DUB_TRACKS = None  # built after JANITOR, which owns the per-session layout
+RENDER_CACHE = None
+if settings.RENDER_CACHE:
+    try:
+        RENDER_CACHE = RenderCache(settings.RENDER_CACHE_DIR, max_bytes=int(settings.RENDER_CACHE_MAX_MB * 1024 * 1024))
+    except Exception as e:
+        logger.warning("render.cache.disabled err=%s", e)
+SCHED = Scheduler()
+ASR_POOL = None  # forked Vosk workers sharing the loaded model (ASR_PROCESSES > 0)
+_TRANSCRIBE = None  # blocking callable(session_id, pcm) -> text
 
-SESSIONS = {}
+# Session state lives in SESSION_STORE (memory, or sqlite/redis shared by all workers);
+# pipelines, decoders, VADs and dub tracks stay local to the node that owns the session
+SESSIONS = make_session_store(
+    settings.SESSION_STORE,
+    ttl=settings.SESSION_TTL_SECONDS,
+    path=settings.SESSION_STORE_PATH,
+    url=settings.SESSION_STORE_URL,
+    journal_dir=settings.SESSION_JOURNAL_DIR,
+)
+NODE_ID = settings.NODE_ID or f"{socket.gethostname()}:{os.getpid()}"
+JANITOR = StorageJanitor(
+    settings.STORAGE_AUDIO,
+    settings.STORAGE_VIDEO,
+    is_live=lambda sid: SESSIONS.get(sid) is not None,
+    busy=lambda: RENDERS.busy_sessions(),
+    sharded=settings.STORAGE_SHARDED,
+    max_bytes=int(settings.STORAGE_MAX_MB * 1024 * 1024),
+    session_max_bytes=int(settings.STORAGE_SESSION_MAX_MB * 1024 * 1024),
+    retention_s={
+        AUDIO: settings.STORAGE_AUDIO_RETENTION_HOURS * 3600,
+        UPLOAD: settings.STORAGE_UPLOAD_RETENTION_HOURS * 3600,
+        RENDER: settings.STORAGE_RENDER_RETENTION_HOURS * 3600,
+    },
+    interval=settings.STORAGE_JANITOR_SECONDS,
+)
+if settings.DUB_TRACK_INCREMENTAL:
+    DUB_TRACKS = DubTrackRegistry(
+        settings.STORAGE_VIDEO,
+        sample_rate=settings.MIX_SAMPLE_RATE,
+        dir_for=lambda sid: JANITOR.session_dir(settings.STORAGE_VIDEO, sid),
+    )
+_route_misses = 0
+VADS = {}  # session_id -> VoiceActivityDetector (noise floor and hangover persist per session)
+AUDIO_SOCKETS = {}  # session_id -> set of WebSockets receiving dubbed clips (response_mode=ws)
+RESPONSE_MODES = ("json", "url", "binary", "ws", "stream")
 
 @app.on_event("startup")
 def load_asr():
@@ -78,38 +209,189 @@ def load_asr():
         )
         logger.info("Mistral ASR ready (model=%s)", settings.MISTRAL_MODEL)
     else:
-        logger.info("Loading Vosk model from: %s", settings.VOSK_MODEL_PATH)
-        if not settings.VOSK_MODEL_PATH or not Path(settings.VOSK_MODEL_PATH).exists():
+        paths = parse_model_paths(settings.VOSK_MODEL_PATHS)
+        if not paths and (not settings.VOSK_MODEL_PATH or not Path(settings.VOSK_MODEL_PATH).exists()):
             raise RuntimeError("VOSK_MODEL_PATH not set or invalid. See backend/.env.example")
-        ASR = VoskASR(settings.VOSK_MODEL_PATH)
-        logger.info("Vosk model loaded. Backend ready.")
+        ASR = VoskModelRegistry(
+            settings.VOSK_MODEL_PATH,
+            paths,
+            default_lang=settings.VOSK_DEFAULT_LANG,
+            memory_budget_bytes=int(settings.ASR_MEMORY_BUDGET_MB * 1024 * 1024),
+        )
+        hot = [l.strip() for l in settings.ASR_PRELOAD_LANGS.split(",") if l.strip()] or [ASR.default_lang]
+        logger.info("Loading Vosk models langs=%s (configured=%s)", ",".join(hot), ",".join(ASR.languages()))
+        ASR.preload(hot)
+        logger.info("Vosk models loaded. Backend ready.")
+    _build_scheduler()
+
+
+def _build_scheduler():
+    """One executor per stage so a slow provider can only exhaust its own slots."""
+    global ASR_POOL, _TRANSCRIBE
+    q = settings.STAGE_QUEUE_LIMIT
+
+    def threads(name, n):
+        return ThreadPoolExecutor(max_workers=max(1, n), thread_name_prefix=name)
+
+    # ffmpeg decoding already runs out-of-process; the stage only waits on its pipes
+    SCHED.add_stage("decode", threads("decode", settings.DECODE_CONCURRENCY), settings.DECODE_CONCURRENCY, q)
+    if isinstance(ASR, VoskModelRegistry) and settings.ASR_PROCESSES > 0:
+        # Fork before any stage thread exists; the stage threads only wait on worker results
+        ASR_POOL = VoskWorkerPool(ASR, processes=settings.ASR_PROCESSES, call_timeout=settings.ASR_CALL_TIMEOUT_SECONDS)
+        n = max(settings.ASR_CONCURRENCY, settings.ASR_PROCESSES * 2)
+        SCHED.add_stage("asr", threads("asr", n), n, q)
+        SCHED.add_stage("asr_stream", threads("asr_stream", n), n, q)
+        _TRANSCRIBE = ASR_POOL.transcribe
+    else:
+        SCHED.add_stage("asr", threads("asr", settings.ASR_CONCURRENCY), settings.ASR_CONCURRENCY, q)
+        SCHED.add_stage("asr_stream", threads("asr_stream", settings.ASR_CONCURRENCY), settings.ASR_CONCURRENCY, q)
+        if isinstance(ASR, VoskModelRegistry):
+            _TRANSCRIBE = lambda session_id, pcm, lang: ASR.transcribe_pcm(pcm, lang=lang)
+        else:
+            _TRANSCRIBE = lambda session_id, pcm, lang: ASR.transcribe_pcm(pcm)
+    SCHED.add_stage("translate", threads("translate", settings.TRANSLATE_CONCURRENCY), settings.TRANSLATE_CONCURRENCY, q)
+    SCHED.add_stage("tts", threads("tts", settings.TTS_CONCURRENCY), settings.TTS_CONCURRENCY, q)
+    SCHED.add_stage("io", threads("io", settings.IO_CONCURRENCY), settings.IO_CONCURRENCY, q)
+
+
+@app.on_event("shutdown")
+async def shutdown_background():
+    PROBER.stop()
+    if _hedger:
+        _hedger.shutdown()
+    SCHED.shutdown()
+    RENDERS.shutdown()
+    if ASR_POOL:
+        ASR_POOL.shutdown()
+    http.close_all()
+    await http.aclose_all()
+
+
+def _over_quota(session_id: str) -> JSONResponse:
+    logger.warning("storage.session_quota sid=%s usage=%s", session_id, JANITOR.usage(session_id))
+    return JSONResponse(status_code=507, content={"error": "session storage quota exceeded", **JANITOR.usage(session_id)})
+
+
+def _overloaded(e: StageOverloaded) -> JSONResponse:
+    logger.warning("sched.overloaded stage=%s retry_after=%.1fs", e.stage, e.retry_after)
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(e), "stage": e.stage, "retry_after": e.retry_after},
+        headers={"Retry-After": str(max(1, int(round(e.retry_after))))},
+    )
+
+
+async def _deny_ws(ws: WebSocket, status: int, error: str) -> None:
+    """Refuse a socket upgrade with a plain HTTP error when the server supports it."""
+    if "websocket.http.response" in (ws.scope.get("extensions") or {}):
+        await ws.send_denial_response(JSONResponse(status_code=status, content={"error": error}))
+        return
+    # Fallback: accept, report the error, close with "unsupported data"
+    await ws.accept()
+    await ws.send_json({"type": "error", "error": error})
+    await ws.close(code=1003)
+
+
+async def _sess(method: str, *args, **kwargs):
+    """Call the session store; shared backends do I/O, so they go through the io stage."""
+    fn = getattr(SESSIONS, method)
+    if not SESSIONS.blocking:
+        return fn(*args, **kwargs)
+    return await SCHED.run("io", lambda: fn(*args, **kwargs), reject=False)
+
+
+def _sticky(response: Response, node: str) -> None:
+    """Sticky-routing hint: the node holding this session's pipeline and dub track."""
+    global _route_misses
+    response.headers["X-Session-Node"] = node or NODE_ID
+    response.headers["X-Served-By"] = NODE_ID
+    if node and node != NODE_ID:
+        _route_misses += 1
+
+
+def _close_local(session_id: str) -> None:
+    """Release this node's per-session resources."""
+    DECODERS.close(session_id)
+    PIPELINES.close(session_id)
+    if DUB_TRACKS:
+        DUB_TRACKS.close(session_id)
+    VADS.pop(session_id, None)
+
+
+async def _reap_sessions() -> None:
+    expired = await _sess("expire")
+    for sid in expired:
+        _close_local(sid)
+        await SCHED.run("io", JANITOR.end_session, sid, reject=False)
+    # Sessions expired or stopped through another worker still hold resources here
+    local = set(VADS) | set(PIPELINES.sessions())
+    for sid in local - set(expired):
+        if await _sess("touch", sid) is None:
+            _close_local(sid)
+            expired.append(sid)
+    if expired:
+        logger.info("session.expired count=%d", len(expired))
+
+
+async def _reap_idle_loop():
+    interval = max(5.0, settings.DECODER_IDLE_SECONDS / 4)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            DECODERS.reap_idle()
+            PIPELINES.reap_idle()
+            await _reap_sessions()
+        except Exception as e:
+            logger.warning("reap.failed err=%s", e)
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    asyncio.create_task(_reap_idle_loop())
+    JANITOR.start()
+    if settings.HEALTH_PROBE_SECONDS > 0:
+        PROBER.start()
+    if _argos:
+        ARGOS_MODELS.preload(parse_pairs(settings.ARGOS_PRELOAD_PAIRS))
 
 @app.post("/api/session/start", response_model=SessionStartResponse)
-async def start_session():
+async def start_session(response: Response):
     sid = str(uuid.uuid4())
-    SESSIONS[sid] = {
-        "created": time.time(),
-        "chunks": 0,
-        "timeline_ms": 0,
-        "segments": [],  # list of {start_ms,end_ms,text,translated_text,audio_path}
-        "video_path": ""
-    }
-    logger.info("session.start sid=%s", sid)
+    # Segments are {start_ms,end_ms,text,translated_text,audio_path,source_lang,target_lang}
+    await _sess("create", sid, NODE_ID)
+    _sticky(response, NODE_ID)
+    logger.info("session.start sid=%s node=%s", sid, NODE_ID)
     return SessionStartResponse(session_id=sid)
 
 @app.post("/api/chunk", response_model=ChunkResponse)
 async def process_chunk(
+    response: Response,
     audio: UploadFile = File(...),
     client_ts: int = Form(0),
     source_lang: str = Form("en"),
     target_lang: str = Form("hi"),
-    session_id: str = Form("")
+    session_id: str = Form(""),
+    response_mode: str = Form("json"),
 ):
+    """
+    Run one audio chunk through decode/ASR/translate/TTS.
+
+    response_mode picks how the dubbed MP3 comes back: json (base64 in
+    audio_b64), url (audio_url of the stored clip), binary (multipart/form-data
+    with a "meta" JSON part and the raw "audio" part), ws (TTS pieces pushed to
+    /api/ws/audio subscribers as they render; url if none) or stream (chunked
+    audio/mpeg body fed piece by piece, texts in X-Text/X-Translated-Text).
+    """
     logger.info("chunk.endpoint.called sid=%s src=%s tgt=%s ct=%s", session_id, source_lang, target_lang, audio.content_type)
-    if session_id not in SESSIONS:
+    if response_mode not in RESPONSE_MODES:
+        return JSONResponse(status_code=400, content={"error": f"response_mode must be one of {'|'.join(RESPONSE_MODES)}"})
+    node = await _sess("touch", session_id) if session_id else None
+    if node is None:
         logger.warning("chunk.invalid_session sid=%s", session_id)
         return JSONResponse(status_code=400, content={"error": "invalid session"})
-    session = SESSIONS[session_id]
+    _sticky(response, node)
+    if JANITOR.over_quota(session_id):
+        return _over_quota(session_id)
 
     content = await audio.read()
     if not content:
@@ -130,108 +412,414 @@ async def process_chunk(
     else:
         suffix = ".webm"
 
-    tmpdir = None
-    text = ""
     logger.info("chunk.recv sid=%s ct=%s bytes=%s suffix=%s client_ts=%s", session_id, audio.content_type, len(content), suffix, client_ts)
+    job = ChunkJob(session_id, client_ts, content, suffix, source_lang, target_lang)
+    pusher = None
+    if response_mode == "stream" or (response_mode == "ws" and AUDIO_SOCKETS.get(session_id)):
+        job.pieces = asyncio.Queue()
+    if response_mode == "ws" and job.pieces is not None:
+        pusher = asyncio.create_task(_push_pieces(job))
+    done = asyncio.ensure_future(_run_chunk(job))
+    if response_mode == "stream":
+        first = await job.pieces.get()
+        if first:
+            done.add_done_callback(lambda f: f.cancelled() or f.exception())
+            headers = {k: v for k, v in response.headers.items() if k.lower().startswith("x-")}
+            headers.update({
+                "X-Client-Ts": str(client_ts),
+                "X-Text": quote(job.text),
+                "X-Translated-Text": quote(job.translated),
+                "Cache-Control": "no-store",
+            })
+            return StreamingResponse(_stream_pieces(job, first), media_type="audio/mpeg", headers=headers)
     try:
-        wav_path, dur, tmpdir = transcode_to_wav_mono_16k(content, suffix)
-        logger.info("chunk.transcoded sid=%s wav=%s dur=%.3fs", session_id, wav_path, dur)
-        text = ASR.transcribe_wav(wav_path)
-        logger.info("chunk.asr sid=%s text='%s'", session_id, text)
-    except Exception as e:
-        logger.exception("chunk.error.asr sid=%s err=%s", session_id, e)
-        # Cleanup tmpdir if created
-        if tmpdir:
-            try:
-                shutil.rmtree(tmpdir, ignore_errors=True)
-            except Exception:
-                pass
-        return JSONResponse(status_code=500, content={"error": f"ASR failed: {e}"})
+        await done
+    except StageOverloaded as e:
+        return _overloaded(e)
+    except RuntimeError as e:
+        logger.warning("chunk.aborted sid=%s err=%s", session_id, e)
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    if isinstance(job.error, StageOverloaded):
+        return _overloaded(job.error)
+    if job.error is not None:
+        label = "TTS" if job.failed_stage == "tts" else "ASR"
+        return JSONResponse(status_code=500, content={"error": f"{label} failed: {job.error}"})
+    if not job.text:
+        return ChunkResponse(text="", translated_text="", audio_b64="", mime="", client_ts=client_ts)
+    meta = {"text": job.text, "translated_text": job.translated, "mime": "audio/mpeg", "client_ts": client_ts}
+    audio_url = _files_url(job.audio_path) if job.audio_path else ""
+    if response_mode == "binary":
+        return _multipart_response(response, {**meta, "audio_url": audio_url}, job.audio_bytes)
+    if response_mode == "ws":
+        pushed = bool(await pusher) if pusher is not None else False
+        if pushed:
+            await _push(session_id, {"type": "audio_end", "client_ts": client_ts, "audio_url": audio_url})
+        if pushed or audio_url:
+            return ChunkResponse(**meta, audio_b64="", audio_url=audio_url, pushed=pushed)
+    elif response_mode == "url" and audio_url:
+        return ChunkResponse(**meta, audio_b64="", audio_url=audio_url)
+    # json, stream without audio, or the clip could not be stored: inline it
+    return ChunkResponse(**meta, audio_b64=base64.b64encode(job.audio_bytes).decode("utf-8"))
 
-    # Establish timing for this chunk regardless of ASR text (keeps timeline aligned)
-    start_ms = int(session.get("timeline_ms", 0))
-    add_ms = int(max(200, dur * 1000))  # minimum 200ms for stability
-    end_ms = start_ms + add_ms
-    session["timeline_ms"] = end_ms
-
-    # If ASR produced no text, skip translation & TTS to avoid empty audio, but advance timeline
-    if not text:
-        logger.info("chunk.asr.empty sid=%s -> skipping translate/tts", session_id)
-        session["chunks"] += 1
-        if tmpdir:
-            try:
-                shutil.rmtree(tmpdir, ignore_errors=True)
-            except Exception:
-                pass
-        return ChunkResponse(
-            text="",
-            translated_text="",
-            audio_b64="",
-            mime="",
-            client_ts=client_ts
+
+async def _run_chunk(job: ChunkJob) -> ChunkJob:
+    """Submit to the session pipeline; always ends `job.pieces` so readers never hang."""
+    try:
+        return await PIPELINES.get(job.session_id).submit(job)
+    finally:
+        if job.pieces is not None:
+            job.pieces.put_nowait(None)
+
+
+async def _stream_pieces(job: ChunkJob, first: bytes):
+    """Chunked audio/mpeg body: each TTS piece as soon as it is ready (MP3 frames concatenate)."""
+    yield first
+    while True:
+        data = await job.pieces.get()
+        if data is None:
+            return
+        yield data
+
+
+async def _push_pieces(job: ChunkJob) -> int:
+    """Forward TTS pieces to the session's audio sockets; returns how many reached a socket."""
+    index = delivered = 0
+    while True:
+        data = await job.pieces.get()
+        if data is None:
+            return delivered
+        header = {"type": "audio", "piece": index, "client_ts": job.client_ts, "text": job.text, "translated_text": job.translated, "mime": "audio/mpeg"}
+        if await _push(job.session_id, header, data):
+            delivered += 1
+        index += 1
+
+
+def _files_url(path: str) -> str:
+    """Public /files URL of a file under the storage base, or "" outside it."""
+    base_rel = Path(settings.STORAGE_AUDIO).parent  # backend/storage
+    try:
+        return f"/files/{Path(path).resolve().relative_to(Path(base_rel).resolve()).as_posix()}"
+    except (OSError, ValueError):
+        return ""
+
+
+def _multipart_response(response: Response, meta: dict, audio_bytes: bytes) -> Response:
+    """multipart/form-data body (readable with fetch().formData()): "meta" JSON, then the raw "audio" bytes."""
+    boundary = uuid.uuid4().hex
+    body = b"".join([
+        f'--{boundary}\r\nContent-Disposition: form-data; name="meta"\r\nContent-Type: application/json\r\n\r\n'.encode(),
+        json.dumps(meta, ensure_ascii=False).encode("utf-8"),
+        f'\r\n--{boundary}\r\nContent-Disposition: form-data; name="audio"; filename="chunk.mp3"\r\nContent-Type: {meta["mime"]}\r\n\r\n'.encode(),
+        audio_bytes,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    headers = {k: v for k, v in response.headers.items() if k.lower().startswith("x-")}
+    return Response(content=body, media_type=f"multipart/form-data; boundary={boundary}", headers=headers)
+
+
+async def _push(session_id: str, header: dict, audio_bytes: bytes = b"") -> bool:
+    """Send a JSON frame (plus the audio as a binary frame, when given) to the session's audio sockets."""
+    sockets = list(AUDIO_SOCKETS.get(session_id, ()))
+    delivered = False
+    for ws in sockets:
+        try:
+            if audio_bytes:
+                await ws.send_json({**header, "size": len(audio_bytes)})
+                await ws.send_bytes(audio_bytes)
+            else:
+                await ws.send_json(header)
+            delivered = True
+        except Exception as e:
+            logger.warning("ws.audio.send_failed sid=%s err=%s", session_id, e)
+            AUDIO_SOCKETS.get(session_id, set()).discard(ws)
+    return delivered
+
+
+# Pipeline stages for /api/chunk. Each session runs them on its own
+# SessionPipeline, so consecutive chunks overlap across stages while the
+# timeline and the segment list are still updated in chunk order.
+
+def _vad_for(session_id: str) -> VoiceActivityDetector:
+    vad = VADS.get(session_id)
+    if vad is None:
+        vad = VADS[session_id] = VoiceActivityDetector(
+            mode=settings.VAD_MODE,
+            threshold_db=settings.VAD_THRESHOLD_DB,
+            hangover_ms=settings.VAD_HANGOVER_MS,
+            min_speech_ms=settings.VAD_MIN_SPEECH_MS,
         )
+    return vad
+
+
+def _decode_chunk(job: ChunkJob) -> None:
+    """Decode to 16 kHz PCM, then trim it to speech (runs on the decode stage)."""
+    job.pcm, job.dur = DECODERS.decode(job.session_id, job.content, job.suffix)
+    if settings.VAD and job.pcm:
+        res = _vad_for(job.session_id).process(job.pcm, 16000)
+        job.pcm = res.pcm
+        if not res.silent:
+            job.speech_start_ms, job.speech_end_ms = res.start_ms, res.end_ms
 
+
+async def _step_decode(job: ChunkJob) -> None:
     try:
-        translated = TRANSLATE.translate(text, source_lang, target_lang) if text else ""
-        logger.info("chunk.translate sid=%s src=%s tgt=%s out_len=%d", session_id, source_lang, target_lang, len(translated))
+        await SCHED.run("decode", _decode_chunk, job)
+    except StageOverloaded:
+        raise
     except Exception as e:
-        logger.exception("chunk.error.translate sid=%s err=%s", session_id, e)
-        translated = ""
+        logger.exception("chunk.error.asr sid=%s err=%s", job.session_id, e)
+        raise
+    job.content = b""
+    logger.info(
+        "chunk.decoded sid=%s samples=%d dur=%.3fs speech=%s",
+        job.session_id, len(job.pcm) // 2, job.dur,
+        f"{job.speech_start_ms}-{job.speech_end_ms}ms" if job.speech_start_ms is not None else "none",
+    )
+
 
+async def _step_asr(job: ChunkJob) -> None:
     try:
-        audio_bytes = TTS.synthesize(translated or text, target_lang)
-        mime = "audio/mpeg"
-        audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-        logger.info("chunk.tts sid=%s bytes=%d mime=%s", session_id, len(audio_bytes), mime)
+        job.text = await SCHED.run("asr", _TRANSCRIBE, job.session_id, job.pcm, job.source_lang) if job.pcm else ""
+    except StageOverloaded:
+        raise
     except Exception as e:
-        logger.exception("chunk.error.tts sid=%s err=%s", session_id, e)
-        # Cleanup tmpdir on error
-        if tmpdir:
-            try:
-                shutil.rmtree(tmpdir, ignore_errors=True)
-            except Exception:
-                pass
-        return JSONResponse(status_code=500, content={"error": f"TTS failed: {e}"})
+        logger.exception("chunk.error.asr sid=%s err=%s", job.session_id, e)
+        raise
+    job.pcm = b""
+    logger.info("chunk.asr sid=%s text='%s'", job.session_id, job.text)
+    # Establish timing for this chunk regardless of ASR text (keeps timeline aligned)
+    add_ms = int(max(200, job.dur * 1000))  # minimum 200ms for stability
+    chunk_start = await _sess("advance_timeline", job.session_id, add_ms)
+    if chunk_start is None:
+        raise RuntimeError("session closed")
+    job.start_ms, job.end_ms = chunk_start, chunk_start + add_ms
+    if job.speech_start_ms is not None:
+        # Place the segment on the speech span VAD found, not the whole chunk
+        job.start_ms = chunk_start + job.speech_start_ms
+        job.end_ms = min(chunk_start + add_ms, job.start_ms + max(200, job.speech_end_ms - job.speech_start_ms))
+    if not job.text:
+        logger.info("chunk.asr.empty sid=%s -> skipping translate/tts", job.session_id)
+
+
+async def _step_translate(job: ChunkJob) -> None:
+    if not job.text:
+        return
+    # Later stages wait rather than shed: this chunk already advanced the timeline,
+    # so admission control happens at decode/ASR.
+    try:
+        if BATCHER:
+            job.translated = await BATCHER.translate(job.text, job.source_lang, job.target_lang)
+        else:
+            job.translated = await SCHED.run("translate", TRANSLATE.translate, job.text, job.source_lang, job.target_lang, reject=False)
+        logger.info("chunk.translate sid=%s src=%s tgt=%s out_len=%d", job.session_id, job.source_lang, job.target_lang, len(job.translated))
+    except Exception as e:
+        logger.exception("chunk.error.translate sid=%s err=%s", job.session_id, e)
+        job.translated = ""
+
 
-    # Optionally store synthesized audio
+async def _step_tts(job: ChunkJob) -> None:
+    if not job.text:
+        return
+    text = job.translated or job.text
+    try:
+        if job.pieces is not None:
+            # Progressive delivery: pieces reach the response/socket while later ones still render
+            loop = asyncio.get_running_loop()
+
+            def on_piece(_index: int, data: bytes) -> None:
+                loop.call_soon_threadsafe(job.pieces.put_nowait, data)
+
+            if STREAM_TTS is not None:
+                job.audio_bytes, clip_key = await SCHED.run("tts", STREAM_TTS.synthesize_clip, text, job.target_lang, on_piece, reject=False)
+            else:
+                job.audio_bytes, clip_key = await SCHED.run("tts", TTS.synthesize_clip, text, job.target_lang, reject=False)
+                on_piece(0, job.audio_bytes)
+        else:
+            job.audio_bytes, clip_key = await SCHED.run("tts", TTS.synthesize_clip, text, job.target_lang, reject=False)
+        logger.info("chunk.tts sid=%s bytes=%d mime=%s", job.session_id, len(job.audio_bytes), "audio/mpeg")
+    except Exception as e:
+        logger.exception("chunk.error.tts sid=%s err=%s", job.session_id, e)
+        raise
     ts = int(time.time()*1000)
-    out_path = Path(settings.STORAGE_AUDIO) / f"{session_id}_{ts}.mp3"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path = await SCHED.run("io", JANITOR.path, settings.STORAGE_AUDIO, job.session_id, f"{ts}_{job.seq}.mp3", reject=False)
+    JANITOR.record(job.session_id, len(job.audio_bytes))
+    if clip_key:
+        # Cached clips are stored once; the session gets a hard link (or a copy)
+        job.audio_path = await SCHED.run("io", _tts_cache.link, clip_key, str(out_path), job.audio_bytes, reject=False)
+        return
+    # Raw bytes go to disk once; response modes other than json serve this file
     try:
-        with open(out_path, "wb") as f:
-            f.write(base64.b64decode(audio_b64))
-    except Exception:
-        pass
+        await SCHED.run("io", out_path.write_bytes, job.audio_bytes, reject=False)
+    except Exception as e:
+        logger.warning("chunk.tts.store_failed sid=%s path=%s err=%s", job.session_id, out_path, e)
+        return
+    job.audio_path = str(out_path)
+
 
+async def _deliver_chunk(job: ChunkJob) -> None:
     # Record segment for later rendering
+    segment = None
+    if job.text:
+        segment = {
+            "start_ms": job.start_ms,
+            "end_ms": job.end_ms,
+            "text": job.text,
+            "translated_text": job.translated,
+            "audio_path": job.audio_path,
+            "source_lang": job.source_lang,
+            "target_lang": job.target_lang,
+        }
+    chunks = await _sess("record_chunk", job.session_id, segment)
+    if chunks is None:
+        return
+    if segment and DUB_TRACKS and job.audio_path:
+        DUB_TRACKS.get(job.session_id).append(job.start_ms, job.audio_path)
+    logger.info("chunk.done sid=%s chunks=%d", job.session_id, chunks)
+
+
+def _make_pipeline(session_id: str) -> SessionPipeline:
+    steps = [
+        ("decode", _step_decode),
+        ("asr", _step_asr),
+        ("translate", _step_translate),
+        ("tts", _step_tts),
+    ]
+    return SessionPipeline(session_id, steps, _deliver_chunk, max_pending=settings.PIPELINE_MAX_PENDING)
+
+
+PIPELINES = PipelineRegistry(_make_pipeline, idle_timeout=settings.DECODER_IDLE_SECONDS)
+
+@app.websocket("/api/ws/audio")
+async def audio_stream(ws: WebSocket, session_id: str = ""):
+    """
+    Dubbed audio of chunks posted with response_mode=ws, pushed while TTS
+    runs. Each piece is a text frame {"type": "audio", "piece", "client_ts",
+    "text", "translated_text", "mime", "size"} followed by one binary frame
+    with its MP3 bytes; {"type": "audio_end", "client_ts", "audio_url"}
+    follows the last piece of a chunk.
+    """
+    await ws.accept()
+    if not session_id or await _sess("get", session_id) is None:
+        await ws.send_json({"type": "error", "error": "invalid session"})
+        await ws.close(code=1008)
+        return
+    AUDIO_SOCKETS.setdefault(session_id, set()).add(ws)
+    logger.info("ws.audio.open sid=%s", session_id)
     try:
-        session["segments"].append({
-            "start_ms": start_ms,
-            "end_ms": end_ms,
-            "text": text,
-            "translated_text": translated,
-            "audio_path": str(out_path)
-        })
+        while True:
+            msg = await ws.receive()
+            if msg.get("type") == "websocket.disconnect":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sockets = AUDIO_SOCKETS.get(session_id)
+        if sockets is not None:
+            sockets.discard(ws)
+            if not sockets:
+                AUDIO_SOCKETS.pop(session_id, None)
+        logger.info("ws.audio.close sid=%s", session_id)
+
+
+@app.websocket("/api/ws/asr")
+async def asr_stream(ws: WebSocket, session_id: str = "", sample_rate: int = 16000, format: str = "pcm16", source_lang: str = ""):
+    """
+    Streaming ASR over one persistent recognizer per socket.
+
+    Client sends binary frames (raw PCM16 mono at `sample_rate`, or webm/ogg
+    Opus container bytes when `format` says so) and optional text control
+    frames: {"type": "eof"} flushes the recognizer and closes the stream.
+    Server pushes {"type": "partial"|"final", "text", "start_ms", ...}.
+    An unsupported `format` is refused with HTTP 400 before the upgrade.
+    """
+    try:
+        demuxer = stream_format_for(format)
+    except ValueError as e:
+        logger.warning("ws.asr.bad_format sid=%s fmt=%r", session_id, format)
+        await _deny_ws(ws, 400, str(e))
+        return
+    await ws.accept()
+    if not isinstance(ASR, VoskModelRegistry):
+        await ws.send_json({"type": "error", "error": "streaming ASR requires ASR_PROVIDER=vosk"})
+        await ws.close(code=1003)
+        return
+    session = await _sess("get", session_id) if session_id else None
+    if session_id and session is None:
+        await ws.send_json({"type": "error", "error": "invalid session"})
+        await ws.close(code=1008)
+        return
+    # Offset stream-relative timings onto the session timeline
+    base_ms = int(session["timeline_ms"]) if session else 0
+    decoder = None
+    rate = 16000 if demuxer else int(sample_rate or 16000)
+    try:
+        if ASR_POOL:
+            stream = await SCHED.run("asr_stream", ASR_POOL.open_stream, session_id, rate, source_lang, reject=False)
+        else:
+            stream = await SCHED.run("asr_stream", ASR.open_stream, rate, source_lang, reject=False)
+        if demuxer:
+            decoder = StreamDecoder(demuxer, rate)
     except Exception as e:
-        logger.warning("segment.append.failed sid=%s err=%s", session_id, e)
+        logger.exception("ws.asr.open_failed sid=%s err=%s", session_id, e)
+        await ws.send_json({"type": "error", "error": f"stream setup failed: {e}"})
+        await ws.close(code=1011)
+        return
+    logger.info("ws.asr.open sid=%s fmt=%s rate=%d", session_id, format, rate)
 
-    session["chunks"] += 1
-    logger.info("chunk.done sid=%s chunks=%d", session_id, session["chunks"])
+    async def _emit(events):
+        for ev in events:
+            if "start_ms" in ev:
+                ev["start_ms"] += base_ms
+            if "end_ms" in ev:
+                ev["end_ms"] += base_ms
+            await ws.send_json(ev)
+            if ev["type"] == "final":
+                logger.info("ws.asr.final sid=%s text='%s'", session_id, ev["text"])
 
-    # Cleanup tmpdir after successful processing
-    if tmpdir:
+    try:
+        while True:
+            msg = await ws.receive()
+            if msg.get("type") == "websocket.disconnect":
+                break
+            data = msg.get("bytes")
+            if data:
+                if decoder:
+                    await SCHED.run("decode", decoder.feed, data, reject=False)
+                    data = decoder.read()
+                if data:
+                    await _emit(await SCHED.run("asr_stream", stream.accept, data, reject=False))
+                continue
+            text = msg.get("text")
+            if not text:
+                continue
+            try:
+                ctrl = json.loads(text)
+            except ValueError:
+                await ws.send_json({"type": "error", "error": "invalid control frame"})
+                continue
+            if ctrl.get("type") == "eof":
+                if decoder:
+                    tail = await SCHED.run("decode", decoder.finish, reject=False)
+                    if tail:
+                        await _emit(await SCHED.run("asr_stream", stream.accept, tail, reject=False))
+                await _emit(await SCHED.run("asr_stream", stream.finish, reject=False))
+                await ws.send_json({"type": "eof"})
+                await ws.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.exception("ws.asr.error sid=%s err=%s", session_id, e)
         try:
-            shutil.rmtree(tmpdir, ignore_errors=True)
+            await ws.close(code=1011)
         except Exception:
             pass
-
-    return ChunkResponse(
-        text=text,
-        translated_text=translated,
-        audio_b64=audio_b64,
-        mime=mime,
-        client_ts=client_ts
-    )
+    finally:
+        if decoder:
+            decoder.close()
+        if ASR_POOL:
+            stream.close()
+        logger.info("ws.asr.close sid=%s", session_id)
 
 def _mask(s: str) -> str:
     if not s:
@@ -239,72 +827,131 @@ def _mask(s: str) -> str:
     return (s[:3] + "***" + s[-2:]) if len(s) > 5 else "***"
 
 @app.get("/api/health/translate")
-async def health_translate(src: str = "en", tgt: str = "hi"):
-    """Lightweight diagnostics for translator providers. Keys are masked in response."""
-    import os as _os
+async def health_translate():
+    """Cached diagnostics for translator providers from the background prober. Keys are masked in response."""
+    snap = PROBER.snapshot
     diag = {
+        "checked_at": snap.get("checked_at"),
+        "pair": snap.get("pair"),
         "libre": {
-            "urls": _os.getenv("LIBRETRANSLATE_URL", "https://libretranslate.com"),
-            "api_key_masked": _mask(_os.getenv("LIBRETRANSLATE_API_KEY", "")),
-            "ok": False,
+            "urls": ",".join(_libre.base_urls),
+            "api_key_masked": _mask(os.getenv("LIBRETRANSLATE_API_KEY", "")),
+            **(snap.get("libre") or {"ok": False}),
         },
-        "mymemory": {"ok": False},
-        "argos": {"available": bool(_ARGOS_AVAIL), "ok": False},
+        "mymemory": snap.get("mymemory") or {"ok": False},
+        "argos": {**(snap.get("argos") or {"available": bool(_ARGOS_AVAIL), "ok": False}), "models": ARGOS_MODELS.stats()},
+        "router": ROUTER.snapshot(),
+        "cache": _translation_cache.stats() if _translation_cache else {"enabled": False},
+        "hedge": _hedger.stats() if _hedger else {"enabled": False},
+        "batch": BATCHER.stats() if BATCHER else {"enabled": False},
     }
-    sample = "hello"
-    # Libre (includes internal fallbacks)
-    try:
-        out = _libre.translate(sample, src, tgt)
-        diag["libre"]["ok"] = bool(out)
-    except Exception:
-        diag["libre"]["ok"] = False
-    # MyMemory direct check
-    try:
-        import requests as _req
-        r = _req.get("https://api.mymemory.translated.net/get", params={"q": sample, "langpair": f"{src}|{tgt}"}, timeout=8)
-        if r.ok:
-            j = r.json()
-            diag["mymemory"]["ok"] = bool((j.get("responseData", {}) or {}).get("translatedText"))
-    except Exception:
-        pass
-    # Argos
-    if _argos:
-        try:
-            _argos.ensure_model(src, tgt)
-            aout = _argos.translate(sample, src, tgt)
-            diag["argos"]["ok"] = bool(aout)
-        except Exception:
-            diag["argos"]["ok"] = False
     return diag
 
+@app.get("/api/health/scheduler")
+async def health_scheduler():
+    """Per-stage load: running/queued calls, average latency and rejections."""
+    return {
+        "stages": SCHED.stats(),
+        "decoders": DECODERS.stats(),
+        "asr_workers": ASR_POOL.stats() if ASR_POOL else {"enabled": False},
+        "asr_models": ASR.stats() if isinstance(ASR, VoskModelRegistry) else {"enabled": False},
+        "pipelines": PIPELINES.stats(),
+        "tts_cache": _tts_cache.stats() if _tts_cache else {"enabled": False},
+        "http": http.stats(),
+        "vad": _vad_summary(),
+        "dub_tracks": DUB_TRACKS.stats() if DUB_TRACKS else {"enabled": False},
+        "render_jobs": RENDERS.stats(),
+        "tts_streaming": STREAM_TTS.stats() if STREAM_TTS else {"enabled": False},
+        "render_cache": RENDER_CACHE.stats() if RENDER_CACHE else {"enabled": False},
+        "sessions": {**(await _sess("stats")), "node": NODE_ID, "route_misses": _route_misses},
+        "storage": JANITOR.usage(),
+    }
+
+
+def _vad_summary():
+    audio = sum(v.audio_ms for v in VADS.values())
+    speech = sum(v.speech_ms for v in VADS.values())
+    return {
+        "enabled": settings.VAD,
+        "sessions": len(VADS),
+        "skipped_chunks": sum(v.skipped for v in VADS.values()),
+        "speech_ratio": round(speech / audio, 3) if audio else None,
+    }
+
+
+@app.get("/api/session/stats")
+async def session_stats(session_id: str = ""):
+    """Timeline position, segment count and VAD speech ratio for one session."""
+    session = await _sess("get", session_id) if session_id else None
+    if session is None:
+        return JSONResponse(status_code=400, content={"error": "invalid session"})
+    vad = VADS.get(session_id)
+    return {
+        "chunks": session["chunks"],
+        "timeline_ms": session["timeline_ms"],
+        "segments": session["segment_count"],
+        "node": session["node"],
+        "vad": vad.stats() if vad else {"enabled": settings.VAD},
+    }
+
+@app.get("/api/session/segments")
+async def session_segments(session_id: str = "", start_ms: int = 0, end_ms: int = 0, last_ms: int = 0):
+    """
+    Segments overlapping [start_ms, end_ms) (end_ms=0: to the end), or the
+    trailing `last_ms` of the session, without reading the whole timeline.
+    """
+    session = await _sess("get", session_id) if session_id else None
+    if session is None:
+        return JSONResponse(status_code=400, content={"error": "invalid session"})
+    if last_ms > 0:
+        end_ms = session["timeline_ms"] + 1
+        start_ms = max(0, end_ms - 1 - last_ms)
+    segments = await _sess("segments", session_id, start_ms, end_ms if end_ms > 0 else 2 ** 62)
+    return {"session_id": session_id, "start_ms": start_ms, "segments": segments or []}
+
+@app.get("/api/storage/usage")
+async def storage_usage(session_id: str = ""):
+    """Disk usage by artifact class as of the last janitor sweep, or one session's bytes and quota."""
+    return JANITOR.usage(session_id)
+
 @app.post("/api/session/stop", response_model=StopResponse)
 async def stop_session(session_id: str = Form("")):
-    if session_id in SESSIONS:
-        del SESSIONS[session_id]
-    logger.info("session.stop sid=%s", session_id)
+    if session_id:
+        await _sess("delete", session_id)
+    vad = VADS.get(session_id)
+    _close_local(session_id)
+    if session_id:
+        # Clips and the upload go now unless a queued render still needs them (the janitor retries)
+        await SCHED.run("io", JANITOR.end_session, session_id, reject=False)
+    logger.info("session.stop sid=%s speech_ratio=%s", session_id, vad.stats()["speech_ratio"] if vad else None)
     return StopResponse(ok=True)
 
 @app.post("/api/video/upload")
 async def upload_video(video: UploadFile = File(...), session_id: str = Form("")):
     if not session_id:
         return JSONResponse(status_code=400, content={"error": "session_id required"})
+    if JANITOR.over_quota(session_id):
+        return _over_quota(session_id)
     ts = int(time.time()*1000)
     ext = ".webm"
     if video.filename:
         _, ext = os.path.splitext(video.filename)
         if not ext:
             ext = ".webm"
-    save_path = Path(settings.STORAGE_VIDEO) / f"{session_id}_{ts}{ext}"
-    save_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(save_path, "wb") as f:
-        shutil.copyfileobj(video.file, f)
+    save_path = await SCHED.run("io", JANITOR.path, settings.STORAGE_VIDEO, session_id, f"{ts}{ext}", reject=False)
+
+    def _save():
+        with open(save_path, "wb") as f:
+            shutil.copyfileobj(video.file, f)
+        JANITOR.record(session_id, save_path.stat().st_size)
+
+    await SCHED.run("io", _save, reject=False)
     logger.info("video.saved sid=%s path=%s size_bytes=%s", session_id, save_path, getattr(video, 'size', 'n/a'))
     # Store path for later rendering
     try:
-        if session_id in SESSIONS:
-            SESSIONS[session_id]["video_path"] = str(save_path)
-    except Exception:
-        pass
+        await _sess("update", session_id, video_path=str(save_path))
+    except Exception as e:
+        logger.warning("video.session_update_failed sid=%s err=%s", session_id, e)
     # Build public URLs (served under /files)
     base_rel = Path(settings.STORAGE_AUDIO).parent  # backend/storage
     try:
@@ -315,28 +962,127 @@ async def upload_video(video: UploadFile = File(...), session_id: str = Form("")
     return {"saved": str(save_path), "url": url}
 
 
-@app.post("/api/video/render")
-async def render_video(session_id: str = Form(""), burn_subs: int = Form(1)):
-    if not session_id or session_id not in SESSIONS:
+def _discard_snapshot(snapshot) -> None:
+    """Remove an unused dub track copy once the track worker has written it."""
+    def _drop(fut):
+        if fut.result():
+            Path(fut.result()).unlink(missing_ok=True)
+    snapshot.add_done_callback(_drop)
+
+
+def _discard_render_context(ctx) -> None:
+    """A render cancelled before it ran: drop the dub track copy made for it."""
+    if ctx.get("track_snapshot"):
+        _discard_snapshot(ctx["track_snapshot"][1])
+
+
+def _run_render_job(job: RenderJob, control: RenderControl):
+    """Job runner (render pool thread): reuse the dub track snapshot when it covers every segment."""
+    ctx = job.context
+    segments = ctx["segments"]
+    dubbed = None
+    track = ctx.get("track")
+    if track is not None:
+        covered, snapshot = ctx["track_snapshot"]
+        if covered == sum(1 for s in segments if s.get("audio_path")):
+            control.report("audio", 0.0)
+            try:
+                dubbed = snapshot.result(timeout=60)
+            except Exception:
+                dubbed = None
+                _discard_snapshot(snapshot)
+        else:
+            _discard_snapshot(snapshot)
+        if dubbed is None:
+            logger.warning("render.dub_track.unusable sid=%s stats=%s; mixing from segments", job.session_id, track.stats())
+    try:
+        final_path, srt_path = render_final_video(
+            ctx["video_path"], segments, out_dir=str(JANITOR.session_dir(settings.STORAGE_VIDEO, job.session_id)),
+            use_translated=True, burn_subs=job.options["burn_subs"], dubbed_audio_path=dubbed, control=control,
+            subs_mode=job.options.get("subs_mode", ""), container=job.options.get("container", "auto"),
+            original_tracks=job.options.get("original_tracks", False),
+            parallel_parts=resolve_parts(settings.RENDER_PARALLEL_PARTS), cache=RENDER_CACHE,
+            mix_sample_rate=settings.MIX_SAMPLE_RATE,
+        )
+    finally:
+        if dubbed:
+            # The render cache keeps its own hard link
+            Path(dubbed).unlink(missing_ok=True)
+    base_rel = Path(settings.STORAGE_AUDIO).parent  # backend/storage
+    rel_final = Path(final_path).resolve().relative_to(Path(base_rel).resolve())
+    rel_srt = Path(srt_path).resolve().relative_to(Path(base_rel).resolve())
+    return {
+        "final_path": final_path,
+        "srt_path": srt_path,
+        "final_url": f"/files/{rel_final.as_posix()}",
+        "srt_url": f"/files/{rel_srt.as_posix()}"
+    }
+
+
+RENDERS = RenderJobManager(
+    settings.RENDER_JOBS_DIR,
+    _run_render_job,
+    workers=settings.RENDER_WORKERS,
+    max_queued=settings.RENDER_MAX_QUEUED,
+    nice=settings.RENDER_NICE,
+    ffmpeg_threads=settings.RENDER_FFMPEG_THREADS,
+    discard=_discard_render_context,
+)
+
+
+@app.post("/api/video/render", status_code=202)
+async def render_video(
+    session_id: str = Form(""),
+    burn_subs: int = Form(1),
+    subs_mode: str = Form(""),
+    container: str = Form("auto"),
+    original_tracks: int = Form(0),
+):
+    """
+    Queue a render job; poll GET /api/render/{job_id} for progress and result URLs.
+    subs_mode: burn | soft | none (empty: burn_subs decides).
+    """
+    session = await _sess("get", session_id, with_segments=True) if session_id else None
+    if session is None:
         return JSONResponse(status_code=400, content={"error": "invalid session"})
-    session = SESSIONS[session_id]
     video_path = session.get("video_path")
     segments = session.get("segments", [])
-    if not video_path or not Path(video_path).exists():
-        return JSONResponse(status_code=400, content={"error": "video not uploaded for this session"})
+    subs_mode = subs_mode or ("burn" if burn_subs else "none")
+    if subs_mode not in ("burn", "soft", "none") or container not in ("auto", "mp4", "webm"):
+        return JSONResponse(status_code=400, content={"error": "subs_mode must be burn|soft|none and container auto|mp4|webm"})
     if not segments:
         return JSONResponse(status_code=400, content={"error": "no audio segments to render"})
-    try:
-        final_path, srt_path = render_final_video(video_path, segments, out_dir=settings.STORAGE_VIDEO, use_translated=True, burn_subs=bool(burn_subs))
-        base_rel = Path(settings.STORAGE_AUDIO).parent  # backend/storage
-        rel_final = Path(final_path).resolve().relative_to(Path(base_rel).resolve())
-        rel_srt = Path(srt_path).resolve().relative_to(Path(base_rel).resolve())
-        return {
-            "final_path": final_path,
-            "srt_path": srt_path,
-            "final_url": f"/files/{rel_final.as_posix()}",
-            "srt_url": f"/files/{rel_srt.as_posix()}"
-        }
-    except Exception as e:
-        logger.exception("render.failed sid=%s err=%s", session_id, e)
-        return JSONResponse(status_code=500, content={"error": f"render failed: {e}"})
+    # The lease keeps the janitor off the inputs until the queued job takes over
+    with JANITOR.lease(session_id):
+        if not video_path or not Path(video_path).exists():
+            return JSONResponse(status_code=400, content={"error": "video not uploaded for this session"})
+        track = DUB_TRACKS.peek(session_id) if DUB_TRACKS else None
+        # Copy the live track as of these segments; it keeps growing for later renders
+        snapshot = track.snapshot() if track is not None else None
+        try:
+            job = RENDERS.submit(
+                session_id,
+                {"burn_subs": subs_mode == "burn", "subs_mode": subs_mode, "container": container, "original_tracks": bool(original_tracks)},
+                context={"video_path": video_path, "segments": segments, "track": track, "track_snapshot": snapshot},
+            )
+        except StageOverloaded as e:
+            if snapshot is not None:
+                _discard_snapshot(snapshot[1])
+            return _overloaded(e)
+    return {"job_id": job.id, "status": job.status, "status_url": f"/api/render/{job.id}"}
+
+
+@app.get("/api/render/{job_id}")
+async def render_status(job_id: str):
+    job = RENDERS.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "unknown render job"})
+    return job.as_dict()
+
+
+@app.post("/api/render/{job_id}/cancel")
+async def render_cancel(job_id: str):
+    job = RENDERS.cancel(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "unknown render job"})
+    return job.as_dict()
@@ -9,6 +9,10 @@ class ChunkResponse(BaseModel):
     audio_b64: str
     mime: str
     client_ts: int
+    # response_mode=url|ws: the stored clip under /files (audio_b64 is then empty)
+    audio_url: str = ""
+    # response_mode=ws: the clip was pushed to the session's audio socket(s)
+    pushed: bool = False
 
 class StopResponse(BaseModel):
     ok: bool
@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ..utils.memory import rss_bytes
+
+try:
+    from argostranslate import package as argos_package
+    from argostranslate import translate as argos_translate
+    ARGOS_AVAILABLE = True
+except Exception:
+    ARGOS_AVAILABLE = False
+
+Pair = Tuple[str, str]
+
+
+def parse_pairs(raw: str) -> Iterable[Pair]:
+    """"en:hi,en:es" -> [("en", "hi"), ("en", "es")]"""
+    out = []
+    for part in (raw or "").split(","):
+        src, _, tgt = part.strip().partition(":")
+        if src and tgt:
+            out.append((src.strip(), tgt.strip()))
+    return out
+
+
+class ArgosModelRegistry:
+    """
+    Resolves and keeps one Argos translation object per (source, target).
+
+    A resolved object holds its CTranslate2 model, which is loaded once and
+    then shared by every thread (CTranslate2 translators are thread-safe).
+    Requests only ever look at what is already installed; refreshing the
+    package index and downloading models happens in the background, either
+    during the startup preload or after a miss via `request_install`.
+    """
+
+    def __init__(self, auto_install: bool = True, miss_ttl: float = 60.0, warm_text: str = "hello"):
+        self.logger = logging.getLogger("rt_dub")
+        self.auto_install = auto_install
+        self.miss_ttl = float(miss_ttl)
+        self.warm_text = warm_text
+        self._lock = threading.Lock()
+        self._models: Dict[Pair, Any] = {}
+        self._misses: Dict[Pair, float] = {}
+        self._info: Dict[Pair, Dict[str, Any]] = {}
+        self._installing: set = set()
+        self._index_refreshed = False
+
+    @staticmethod
+    def _pair(source: str, target: str) -> Pair:
+        return (source or "en", target)
+
+    def _resolve_installed(self, pair: Pair) -> Optional[Any]:
+        langs = {lang.code: lang for lang in argos_translate.get_installed_languages()}
+        src, tgt = langs.get(pair[0]), langs.get(pair[1])
+        if src is None or tgt is None:
+            return None
+        return src.get_translation(tgt)
+
+    def _load(self, pair: Pair) -> Optional[Any]:
+        """Resolve and warm one pair; the first translate loads the model weights."""
+        rss0 = rss_bytes()
+        t0 = time.monotonic()
+        tr = self._resolve_installed(pair)
+        if tr is None:
+            return None
+        try:
+            tr.translate(self.warm_text)
+        except Exception as e:
+            self.logger.warning("argos.warm.failed pair=%s->%s err=%s", pair[0], pair[1], e)
+        info = {
+            "load_ms": int((time.monotonic() - t0) * 1000),
+            "rss_delta_mb": round(max(0, rss_bytes() - rss0) / (1024 * 1024), 1),
+            "loaded_at": time.time(),
+            "requests": 0,
+        }
+        with self._lock:
+            self._models[pair] = tr
+            self._misses.pop(pair, None)
+            self._info[pair] = info
+        self.logger.info("argos.model.loaded pair=%s->%s load_ms=%d rss_delta_mb=%s", pair[0], pair[1], info["load_ms"], info["rss_delta_mb"])
+        return tr
+
+    def get(self, source: str, target: str) -> Optional[Any]:
+        """Translation object for the pair, or None when it is not installed (never downloads)."""
+        if not ARGOS_AVAILABLE:
+            return None
+        pair = self._pair(source, target)
+        with self._lock:
+            tr = self._models.get(pair)
+            if tr is not None:
+                self._info[pair]["requests"] += 1
+                return tr
+            missed = self._misses.get(pair)
+            if missed is not None and time.monotonic() - missed < self.miss_ttl:
+                return None
+        tr = self._load(pair)
+        if tr is None:
+            with self._lock:
+                self._misses[pair] = time.monotonic()
+            self.request_install(*pair)
+        return tr
+
+    def loaded(self, source: str, target: str) -> bool:
+        with self._lock:
+            return self._pair(source, target) in self._models
+
+    def install(self, source: str, target: str) -> bool:
+        """Blocking index refresh + download; only call this off the request path."""
+        if not ARGOS_AVAILABLE:
+            return False
+        pair = self._pair(source, target)
+        if self._resolve_installed(pair) is not None:
+            return True
+        if not self._index_refreshed:
+            self.logger.info("argos.update_index")
+            try:
+                argos_package.update_package_index()
+                self._index_refreshed = True
+            except Exception as e:
+                self.logger.warning("argos.update_index.failed err=%s", e)
+        try:
+            available = argos_package.get_available_packages()
+        except Exception as e:
+            self.logger.warning("argos.get_available_packages.failed err=%s", e)
+            return False
+        pkg = next((p for p in available if getattr(p, "from_code", None) == pair[0] and getattr(p, "to_code", None) == pair[1]), None)
+        if not pkg:
+            self.logger.warning("argos.package_not_found pair=%s->%s", pair[0], pair[1])
+            return False
+        self.logger.info("argos.installing pair=%s->%s", pair[0], pair[1])
+        try:
+            argos_package.install_from_path(pkg.download())
+        except Exception as e:
+            self.logger.warning("argos.install.failed err=%s", e)
+            return False
+        self.logger.info("argos.install.ok pair=%s->%s", pair[0], pair[1])
+        return True
+
+    def _install_and_load(self, pair: Pair) -> None:
+        try:
+            if self.install(*pair):
+                self._load(pair)
+        except Exception as e:
+            self.logger.warning("argos.preload.failed pair=%s->%s err=%s", pair[0], pair[1], e)
+        finally:
+            with self._lock:
+                self._installing.discard(pair)
+
+    def request_install(self, source: str, target: str) -> None:
+        """Schedule a background install+load for a missing pair (at most one per pair)."""
+        if not (ARGOS_AVAILABLE and self.auto_install):
+            return
+        pair = self._pair(source, target)
+        with self._lock:
+            if pair in self._installing or pair in self._models:
+                return
+            self._installing.add(pair)
+        threading.Thread(target=self._install_and_load, args=(pair,), name="argos-install", daemon=True).start()
+
+    def preload(self, pairs: Iterable[Pair]) -> Optional[threading.Thread]:
+        """Load (installing if allowed) the given pairs on a background thread."""
+        pairs = [self._pair(s, t) for s, t in pairs]
+        if not (ARGOS_AVAILABLE and pairs):
+            return None
+
+        def _run() -> None:
+            for pair in pairs:
+                try:
+                    if self._load(pair) is None and self.auto_install and self.install(*pair):
+                        self._load(pair)
+                except Exception as e:
+                    self.logger.warning("argos.preload.failed pair=%s->%s err=%s", pair[0], pair[1], e)
+
+        t = threading.Thread(target=_run, name="argos-preload", daemon=True)
+        t.start()
+        return t
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "available": ARGOS_AVAILABLE,
+                "models": {f"{s}->{t}": dict(info) for (s, t), info in self._info.items()},
+                "installing": [f"{s}->{t}" for s, t in self._installing],
+                "missing": [f"{s}->{t}" for s, t in self._misses],
+            }
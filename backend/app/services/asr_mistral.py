@@ -2,7 +2,8 @@ import base64
 import logging
 from typing import Optional, List, Dict
 
-import requests
+from ..utils import http
+from ..utils.audio import pcm16_to_wav_bytes
 
 
 class MistralASR:
@@ -41,9 +42,15 @@ class MistralASR:
             return message["text"].strip()
         return ""
 
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int = 16000, prompt: Optional[str] = None) -> str:
+        return self.transcribe_audio_bytes(pcm16_to_wav_bytes(pcm, sample_rate), prompt)
+
     def transcribe_wav(self, wav_path: str, prompt: Optional[str] = None) -> str:
         with open(wav_path, "rb") as f:
             audio_bytes = f.read()
+        return self.transcribe_audio_bytes(audio_bytes, prompt)
+
+    def transcribe_audio_bytes(self, audio_bytes: bytes, prompt: Optional[str] = None) -> str:
         audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
         instruction = prompt or "Transcribe the audio accurately. Respond with only the transcript." 
         payload = {
@@ -62,7 +69,7 @@ class MistralASR:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
-        resp = requests.post(self.api_url, json=payload, headers=headers, timeout=self.timeout)
+        resp = http.get_client().post(self.api_url, json=payload, headers=headers, timeout=self.timeout)
         try:
             resp.raise_for_status()
         except Exception as exc:
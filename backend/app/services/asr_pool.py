@@ -0,0 +1,335 @@
+import contextlib
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import signal
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class AsrWorkerTimeout(RuntimeError):
+    """A pool call ran past its deadline; the worker was killed and respawned."""
+
+
+def _worker_main(idx: int, asr, jobs, results, running) -> None:
+    """
+    Worker process loop. `asr` is the parent's VoskModelRegistry inherited
+    through fork, so models loaded before the fork stay shared copy-on-write.
+    Streaming recognizers live here, keyed by stream id, between jobs.
+    `running` is [start time, job id] of the job in progress (id 0 = idle),
+    so the parent times a job from when it starts, not from when it queued.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # The parent's event loop wakes on this fd; a signal here must not reach it
+    signal.set_wakeup_fd(-1)
+    after_fork = getattr(asr, "after_fork", None)
+    if after_fork:
+        after_fork()
+    streams: Dict[str, Any] = {}
+    while True:
+        item = jobs.get()
+        if item is None:
+            break
+        job_id, op, args = item
+        t0 = time.monotonic()
+        running[0] = time.time()
+        running[1] = job_id
+        try:
+            if op == "transcribe":
+                out = asr.transcribe_pcm(*args)
+            elif op == "open":
+                stream_id, rate, lang = args
+                streams[stream_id] = asr.open_stream(rate, lang)
+                out = None
+            elif op == "accept":
+                stream_id, pcm = args
+                out = streams[stream_id].accept(pcm)
+            elif op == "finish":
+                st = streams.pop(args[0], None)
+                out = st.finish() if st else []
+            elif op == "close":
+                streams.pop(args[0], None)
+                out = None
+            else:
+                raise ValueError(f"unknown op {op}")
+            result = (idx, job_id, True, out, time.monotonic() - t0)
+        except Exception as e:
+            result = (idx, job_id, False, f"{type(e).__name__}: {e}", time.monotonic() - t0)
+        running[1] = 0
+        results.put(result)
+
+
+# Ops that hold no worker state, so a replacement worker can rerun them
+RETRYABLE_OPS = ("transcribe",)
+
+
+class _Worker:
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.proc = None
+        self.jobs = None
+        self.running = None  # shared [start time, job id] of the job in progress
+        self.pending: Dict[int, Tuple[Future, str, tuple]] = {}
+        self.busy_s = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = -1
+        self.timeouts = 0
+        self.requeued = 0
+        self.started = time.monotonic()
+
+    def current(self) -> Tuple[int, float]:
+        """(job id, seconds it has been running); id 0 when idle."""
+        started, job_id = self.running[0], int(self.running[1])
+        return job_id, (time.time() - started if job_id else 0.0)
+
+
+class PooledStream:
+    """VoskStream look-alike whose recognizer lives in a pool worker."""
+
+    def __init__(self, pool: "VoskWorkerPool", affinity: str, sample_rate: int, lang: str = ""):
+        self.pool = pool
+        self.affinity = affinity
+        self.stream_id = uuid.uuid4().hex
+        self.sample_rate = int(sample_rate)
+        pool.call(affinity, "open", self.stream_id, self.sample_rate, lang)
+
+    def accept(self, pcm: bytes) -> List[Dict]:
+        return self.pool.call(self.affinity, "accept", self.stream_id, pcm)
+
+    def finish(self) -> List[Dict]:
+        return self.pool.call(self.affinity, "finish", self.stream_id)
+
+    def close(self) -> None:
+        try:
+            self.pool.submit(self.affinity, "close", self.stream_id)
+        except Exception:
+            pass
+
+
+class VoskWorkerPool:
+    """
+    N forked Vosk worker processes sharing the parent's loaded models.
+
+    `asr` is a VoskModelRegistry whose hot set is loaded in the API process;
+    workers are forked from it so that memory is shared copy-on-write
+    instead of loaded N times. Every
+    job is routed by an affinity key (the session id) to one worker, which
+    keeps a session's streaming recognizer in that worker across frames.
+    Blocking `call`/`transcribe` are meant to run on a scheduler stage thread.
+
+    A job that has been running (not queued) for longer than `call_timeout`
+    seconds is taken as a wedged decoder: the caller gets AsrWorkerTimeout,
+    the worker is killed and respawned, and its queued stateless jobs are
+    rerun on the new one. Stream jobs fail, since the recognizers died with
+    it. The collector checks the same deadline for jobs nobody waits on.
+
+    Respawns fork from the running API process, not a fresh interpreter:
+    spawn/forkserver would have to reload every model per worker. The child
+    only touches state that is safe after a fork: a job queue made just
+    before it, the results queue (write-only there; multiprocessing resets
+    its feeder thread in the child), logging (CPython reinitialises handler
+    locks at fork) and the registry, which is forked while holding its
+    lock (`fork_lock`) and gets fresh locks in the child (`after_fork`).
+    The child drops the event loop's signal wakeup fd and never runs the loop.
+    """
+
+    def __init__(self, asr, processes: int = 2, call_timeout: float = 30.0):
+        self.logger = logging.getLogger("rt_dub")
+        self.asr = asr
+        self.call_timeout = float(call_timeout)
+        self._ctx = mp.get_context("fork")
+        self._results = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._rr = itertools.count()
+        self._closed = False
+        self.workers = [_Worker(i) for i in range(max(1, int(processes)))]
+        for w in self.workers:
+            self._spawn(w)
+        self._collector = threading.Thread(target=self._collect, name="asr-pool-results", daemon=True)
+        self._collector.start()
+        self.logger.info("asr.pool.started processes=%d", len(self.workers))
+
+    def _spawn(self, w: _Worker) -> None:
+        w.jobs = self._ctx.Queue()
+        w.running = self._ctx.Array("d", 2, lock=False)
+        w.proc = self._ctx.Process(
+            target=_worker_main, args=(w.idx, self.asr, w.jobs, self._results, w.running),
+            name=f"vosk-worker-{w.idx}", daemon=True,
+        )
+        fork_lock = getattr(self.asr, "fork_lock", None)
+        with fork_lock() if fork_lock else contextlib.nullcontext():
+            w.proc.start()
+        w.restarts += 1
+        w.started = time.monotonic()
+        w.busy_s = 0.0
+
+    def _pick(self, affinity: str) -> _Worker:
+        if affinity:
+            return self.workers[zlib.crc32(affinity.encode("utf-8")) % len(self.workers)]
+        # No session: least queued worker, round-robin on ties
+        start = next(self._rr)
+        order = self.workers[start % len(self.workers):] + self.workers[:start % len(self.workers)]
+        return min(order, key=lambda w: len(w.pending))
+
+    def _submit(self, affinity: str, op: str, args: tuple) -> Tuple[_Worker, int, Future]:
+        if self._closed:
+            raise RuntimeError("asr pool closed")
+        fut: Future = Future()
+        job_id = next(self._ids)
+        with self._lock:
+            w = self._pick(affinity)
+            w.pending[job_id] = (fut, op, args)
+            w.jobs.put((job_id, op, args))
+            return w, job_id, fut
+
+    def submit(self, affinity: str, op: str, *args: Any) -> Future:
+        return self._submit(affinity, op, args)[2]
+
+    def call(self, affinity: str, op: str, *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run one job and wait for it. `timeout` (default `call_timeout`, <= 0
+        waits forever) counts from when the worker starts the job.
+        """
+        timeout = self.call_timeout if timeout is None else timeout
+        w, job_id, fut = self._submit(affinity, op, args)
+        if timeout <= 0:
+            return fut.result()
+        while True:
+            try:
+                return fut.result(timeout=min(0.25, timeout))
+            except FutureTimeout:
+                pass
+            running, elapsed = w.current()
+            if running != job_id or elapsed <= timeout:
+                continue
+            err = AsrWorkerTimeout(f"asr worker {w.idx} timed out after {timeout:.0f}s ({op})")
+            if self._replace(w, err, "timeout", job_id=job_id):
+                raise err
+
+    def transcribe(self, affinity: str, pcm: bytes, lang: str = "", sample_rate: int = 16000) -> str:
+        return self.call(affinity, "transcribe", pcm, sample_rate, lang)
+
+    def open_stream(self, affinity: str, sample_rate: int = 16000, lang: str = "") -> PooledStream:
+        return PooledStream(self, affinity, sample_rate, lang)
+
+    def _collect(self) -> None:
+        last_check = time.monotonic()
+        while not self._closed:
+            if time.monotonic() - last_check >= 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                idx, job_id, ok, out, elapsed = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            w = self.workers[idx]
+            with self._lock:
+                entry = w.pending.pop(job_id, None)
+                w.busy_s += elapsed
+                w.completed += 1
+                if not ok:
+                    w.failed += 1
+            fut = entry[0] if entry else None
+            if fut is None or fut.done():
+                continue
+            if ok:
+                fut.set_result(out)
+            else:
+                fut.set_exception(RuntimeError(out))
+
+    def _replace(self, w: _Worker, err: Exception, reason: str, proc=None, job_id: int = 0) -> bool:
+        """
+        Kill `w`'s process (only if it is still `proc` / still running
+        `job_id`), fork a new one, rerun its queued stateless jobs there and
+        fail the rest with `err`. Returns False when there was nothing to do.
+        """
+        with self._lock:
+            if self._closed or (proc is not None and w.proc is not proc):
+                return False  # already replaced (by the health check or another caller)
+            proc = w.proc
+            running, _ = w.current()
+            if job_id and running != job_id:
+                return False  # finished in the meantime
+            if proc.is_alive():
+                proc.kill()
+            proc.join(timeout=1)
+            if reason == "timeout":
+                w.timeouts += 1
+            # The job in progress may be what wedged or crashed the worker; never rerun it
+            retry = {k: v for k, v in w.pending.items() if k != running and v[1] in RETRYABLE_OPS}
+            lost = [v[0] for k, v in w.pending.items() if k not in retry]
+            w.pending = retry
+            self.logger.error(
+                "asr.pool.worker_%s idx=%d exitcode=%s lost_jobs=%d requeued=%d",
+                reason, w.idx, proc.exitcode, len(lost), len(retry),
+            )
+            # Streams held by the old worker are gone; their sockets see errors and close
+            self._spawn(w)
+            for k, (_, op, args) in retry.items():
+                w.jobs.put((k, op, args))
+            w.requeued += len(retry)
+        for fut in lost:
+            if not fut.done():
+                fut.set_exception(err)
+        return True
+
+    def _check_workers(self) -> None:
+        for w in self.workers:
+            proc = w.proc
+            if self._closed:
+                return
+            if not proc.is_alive():
+                self._replace(w, RuntimeError("asr worker died"), "died", proc=proc)
+                continue
+            running, elapsed = w.current()
+            if running and self.call_timeout > 0 and elapsed > self.call_timeout:
+                # Wedged on a job nobody is waiting on (e.g. a stream close)
+                err = AsrWorkerTimeout(f"asr worker {w.idx} timed out after {self.call_timeout:.0f}s")
+                self._replace(w, err, "timeout", proc=proc, job_id=running)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            workers = [
+                {
+                    "idx": w.idx,
+                    "pid": w.proc.pid if w.proc else None,
+                    "alive": bool(w.proc and w.proc.is_alive()),
+                    "queue_depth": len(w.pending),
+                    "utilization_pct": round(100.0 * w.busy_s / max(1e-6, now - w.started), 1),
+                    "completed": w.completed,
+                    "failed": w.failed,
+                    "restarts": w.restarts,
+                    "timeouts": w.timeouts,
+                    "requeued": w.requeued,
+                }
+                for w in self.workers
+            ]
+        return {"processes": len(workers), "queue_depth": sum(w["queue_depth"] for w in workers), "workers": workers}
+
+    def shutdown(self) -> None:
+        self._closed = True
+        for w in self.workers:
+            try:
+                w.jobs.put(None)
+            except Exception:
+                pass
+        for w in self.workers:
+            w.proc.join(timeout=2)
+            if w.proc.is_alive():
+                w.proc.terminate()
+            for fut, _, _ in w.pending.values():
+                if not fut.done():
+                    fut.set_exception(RuntimeError("asr pool closed"))
+            w.pending.clear()
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Optional
+
+from ..utils.memory import rss_bytes
+
+if TYPE_CHECKING:
+    from .asr_vosk import VoskASR
+
+
+def parse_model_paths(raw: str) -> Dict[str, str]:
+    """"en:/models/en,hi:/models/hi" -> {"en": "/models/en", "hi": "/models/hi"} (paths may contain ':')"""
+    out: Dict[str, str] = {}
+    for part in (raw or "").split(","):
+        lang, _, path = part.strip().partition(":")
+        if lang and path:
+            out[lang.strip().lower()] = path.strip()
+    return out
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+class VoskModelRegistry:
+    """
+    Source language -> Vosk model, loaded lazily and kept under a memory budget.
+
+    Languages without their own model fall back to the default one. Each
+    load records the RSS growth it caused (or the model's on-disk size when
+    that is not measurable); when the resident total would exceed
+    `memory_budget_bytes` the least recently used models are dropped first.
+    Callers already holding an evicted model keep it alive until they finish.
+    Models preloaded before the ASR workers fork are shared with them; a
+    worker's own lazy loads count against that worker's budget. `loader`
+    builds a model from its path (VoskASR by default).
+    """
+
+    def __init__(self, default_path: str, paths: Optional[Dict[str, str]] = None, default_lang: str = "en", memory_budget_bytes: int = 0, loader: Optional[Callable[[str], Any]] = None):
+        self.logger = logging.getLogger("rt_dub")
+        if loader is None:
+            # Imported here so the registry works with any loader; still fails at startup without vosk
+            from .asr_vosk import VoskASR
+            loader = VoskASR
+        self.loader = loader
+        self.default_lang = (default_lang or "en").lower()
+        self.paths: Dict[str, str] = {k: v for k, v in (paths or {}).items() if v}
+        if default_path:
+            self.paths.setdefault(self.default_lang, default_path)
+        missing = [f"{k}={v}" for k, v in self.paths.items() if not Path(v).exists()]
+        for m in missing:
+            self.logger.warning("asr.registry.path_missing %s", m)
+        self.paths = {k: v for k, v in self.paths.items() if Path(v).exists()}
+        if not self.paths:
+            raise RuntimeError("No valid Vosk model path (VOSK_MODEL_PATH / VOSK_MODEL_PATHS)")
+        if self.default_lang not in self.paths:
+            self.default_lang = next(iter(self.paths))
+        self.memory_budget = max(0, int(memory_budget_bytes))
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._models: "OrderedDict[str, VoskASR]" = OrderedDict()
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self.evictions = 0
+
+    def resolve(self, lang: str) -> str:
+        """Registry key serving `lang` (its own model, else the default)."""
+        lang = (lang or "").lower()
+        if lang in self.paths:
+            return lang
+        base = lang.split("-")[0]
+        return base if base in self.paths else self.default_lang
+
+    def languages(self) -> Iterable[str]:
+        return list(self.paths)
+
+    def _resident(self) -> int:
+        return sum(info["resident_bytes"] for key, info in self._info.items() if key in self._models)
+
+    def _evict_for(self, need: int, keep: str) -> None:
+        if not self.memory_budget:
+            return
+        with self._lock:
+            while self._models and self._resident() + need > self.memory_budget:
+                victim = next((k for k in self._models if k != keep), None)
+                if victim is None:
+                    break
+                self._models.pop(victim)
+                self.evictions += 1
+                self.logger.info("asr.model.evicted lang=%s resident_mb=%.0f", victim, self._resident() / (1024 * 1024))
+
+    def get(self, lang: str = "") -> "VoskASR":
+        key = self.resolve(lang)
+        with self._lock:
+            asr = self._models.get(key)
+            if asr is not None:
+                self._models.move_to_end(key)
+                self._info[key]["last_used"] = time.time()
+                return asr
+        with self._load_lock:
+            with self._lock:
+                asr = self._models.get(key)
+                if asr is not None:
+                    return asr
+            path = self.paths[key]
+            disk = _dir_size(path)
+            self._evict_for(disk, keep=key)
+            rss0 = rss_bytes()
+            t0 = time.monotonic()
+            asr = self.loader(path)
+            delta = rss_bytes() - rss0
+            info = {
+                "path": path,
+                "load_ms": int((time.monotonic() - t0) * 1000),
+                "resident_bytes": delta if delta > 0 else disk,
+                "disk_bytes": disk,
+                "loaded_at": time.time(),
+                "last_used": time.time(),
+            }
+            with self._lock:
+                self._models[key] = asr
+                self._info[key] = info
+            self.logger.info("asr.model.loaded lang=%s load_ms=%d resident_mb=%.0f", key, info["load_ms"], info["resident_bytes"] / (1024 * 1024))
+            self._evict_for(0, keep=key)
+            return asr
+
+    def preload(self, langs: Iterable[str]) -> None:
+        """Load a hot set up front (call before forking ASR workers so they share it)."""
+        for lang in langs:
+            try:
+                self.get(lang)
+            except Exception as e:
+                self.logger.warning("asr.model.preload_failed lang=%s err=%s", lang, e)
+
+    @contextmanager
+    def fork_lock(self):
+        """Hold across a fork so the child never sees the model table mid-update."""
+        with self._lock:
+            yield
+
+    def after_fork(self) -> None:
+        """In a forked child: other threads are gone, so any lock they held must be replaced."""
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    # VoskASR-compatible surface for callers that do not pick a language
+    def open_stream(self, sample_rate: int = 16000, lang: str = ""):
+        return self.get(lang).open_stream(sample_rate)
+
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int = 16000, lang: str = "") -> str:
+        return self.get(lang).transcribe_pcm(pcm, sample_rate)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = list(self._models)
+            return {
+                "default": self.default_lang,
+                "configured": sorted(self.paths),
+                "loaded": loaded,
+                "resident_mb": round(self._resident() / (1024 * 1024), 1),
+                "budget_mb": round(self.memory_budget / (1024 * 1024), 1) if self.memory_budget else None,
+                "evictions": self.evictions,
+                "models": {
+                    k: {
+                        "loaded": k in self._models,
+                        "load_ms": v["load_ms"],
+                        "resident_mb": round(v["resident_bytes"] / (1024 * 1024), 1),
+                        "last_used": v["last_used"],
+                    }
+                    for k, v in self._info.items()
+                },
+            }
@@ -1,32 +1,100 @@
 import json
-from typing import Optional
+from typing import Optional, List, Dict
 from vosk import Model, KaldiRecognizer
 import wave
 from pathlib import Path
 
+
+class VoskStream:
+    """
+    Incremental recognizer bound to one streaming session.
+
+    Keeps a single KaldiRecognizer alive across frames so decoder state and
+    context survive between chunks. `accept` returns partial/final events as
+    soon as Vosk reports them; timings are relative to the first sample fed.
+    """
+
+    def __init__(self, model: Model, sample_rate: int = 16000):
+        self.sample_rate = int(sample_rate)
+        self.rec = KaldiRecognizer(model, self.sample_rate)
+        self.rec.SetWords(False)
+        self.samples = 0
+        self._utt_start = 0
+        self._last_partial = ""
+        self._carry = b""
+
+    def _ms(self, samples: int) -> int:
+        return int(samples * 1000 / self.sample_rate)
+
+    def _final_event(self, payload: str) -> Optional[Dict]:
+        res = json.loads(payload)
+        text = (res.get("text") or "").strip()
+        start = self._utt_start
+        self._utt_start = self.samples
+        self._last_partial = ""
+        if not text:
+            return None
+        return {"type": "final", "text": text, "start_ms": self._ms(start), "end_ms": self._ms(self.samples)}
+
+    def accept(self, pcm: bytes) -> List[Dict]:
+        """Feed PCM16 mono bytes; returns zero or more partial/final events."""
+        data = self._carry + pcm
+        # Keep sample alignment when frames split a 16-bit sample
+        if len(data) % 2:
+            self._carry = data[-1:]
+            data = data[:-1]
+        else:
+            self._carry = b""
+        if not data:
+            return []
+        self.samples += len(data) // 2
+        events: List[Dict] = []
+        if self.rec.AcceptWaveform(data):
+            ev = self._final_event(self.rec.Result())
+            if ev:
+                events.append(ev)
+        else:
+            partial = (json.loads(self.rec.PartialResult()).get("partial") or "").strip()
+            if partial and partial != self._last_partial:
+                self._last_partial = partial
+                events.append({"type": "partial", "text": partial, "start_ms": self._ms(self._utt_start)})
+        return events
+
+    def finish(self) -> List[Dict]:
+        """Flush the recognizer at end of stream."""
+        ev = self._final_event(self.rec.FinalResult())
+        return [ev] if ev else []
+
+
 class VoskASR:
     def __init__(self, model_path: str):
         if not model_path or not Path(model_path).exists():
             raise RuntimeError(f"Vosk model path not found: {model_path}")
         self.model = Model(model_path)
 
+    def open_stream(self, sample_rate: int = 16000) -> VoskStream:
+        return VoskStream(self.model, sample_rate)
+
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int = 16000) -> str:
+        """Decode a complete utterance of PCM16 mono bytes held in memory."""
+        rec = KaldiRecognizer(self.model, sample_rate)
+        rec.SetWords(False)
+        text_parts = []
+        step = 8000  # 4000 frames of 16-bit audio
+        for off in range(0, len(pcm), step):
+            if rec.AcceptWaveform(pcm[off:off + step]):
+                res = json.loads(rec.Result())
+                if res.get("text"):
+                    text_parts.append(res["text"])
+        final = json.loads(rec.FinalResult())
+        if final.get("text"):
+            text_parts.append(final["text"])
+        return " ".join(tp for tp in text_parts if tp).strip()
+
     def transcribe_wav(self, wav_path: str) -> str:
         # Expect mono 16kHz WAV
         with wave.open(wav_path, "rb") as wf:
             if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
                 raise ValueError("WAV must be mono PCM16")
-            rec = KaldiRecognizer(self.model, wf.getframerate())
-            rec.SetWords(False)
-            text_parts = []
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                if rec.AcceptWaveform(data):
-                    res = json.loads(rec.Result())
-                    if res.get("text"):
-                        text_parts.append(res["text"])
-            final = json.loads(rec.FinalResult())
-            if final.get("text"):
-                text_parts.append(final["text"])
-            return " ".join(tp for tp in text_parts if tp).strip()
+            return self.transcribe_pcm(wf.readframes(wf.getnframes()), wf.getframerate())
+
@@ -0,0 +1,245 @@
+import logging
+import os
+import subprocess
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+# gTTS produces 24 kHz mono MP3, so mixing at that rate avoids resampling every clip
+# (the default; the server passes Settings.MIX_SAMPLE_RATE)
+MIX_SAMPLE_RATE = 24000
+# Samples per AAC frame; ffmpeg's AAC encoder also primes every stream with one frame
+AAC_FRAME = 1024
+
+
+class MixError(Exception):
+    pass
+
+
+def decode_clip(path: str, sample_rate: int = MIX_SAMPLE_RATE) -> np.ndarray:
+    """Decode any audio file to mono int16 samples at `sample_rate`."""
+    cmd = [FFMPEG_BIN, "-v", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+    res = subprocess.run(cmd, capture_output=True)
+    if res.returncode != 0:
+        raise MixError(f"decode failed for {path}: {res.stderr.decode('utf-8', 'ignore')[:300]}")
+    return np.frombuffer(res.stdout, dtype=np.int16)
+
+
+def soft_limit(block: np.ndarray, knee: float = 0.9) -> np.ndarray:
+    """int32 mix -> int16 with a tanh knee above `knee` of full scale instead of hard clipping."""
+    x = block.astype(np.float32) / 32768.0
+    over = np.abs(x) > knee
+    if over.any():
+        mag = np.abs(x[over])
+        x[over] = np.sign(x[over]) * (knee + (1.0 - knee) * np.tanh((mag - knee) / (1.0 - knee)))
+    return np.clip(x * 32768.0, -32768, 32767).astype(np.int16)
+
+
+class ClipMixer:
+    """
+    Streams a dubbed track built from timed clips into one encoder process.
+
+    Clips are added in start order; each is decoded once and added into an
+    int32 accumulator that only spans the clips still overlapping the write
+    position. Everything before the next clip's start is final, so it is
+    limited to int16 and written to the encoder's stdin immediately. Memory
+    therefore depends on the longest overlap, not on session length, and
+    work is linear in the number of clips. Clips hard-linked from the TTS
+    cache (same inode) are decoded once per mix. `rotate` closes the
+    encoder at an AAC frame boundary and continues into a new file, so a
+    running mix can be copied without being ended.
+    """
+
+    def __init__(self, out_path: str, sample_rate: int = MIX_SAMPLE_RATE, codec_args: Optional[List[str]] = None, out_format: Optional[str] = None, decoded_cache: int = 64):
+        self.logger = logging.getLogger("rt_dub")
+        self.sample_rate = int(sample_rate)
+        self.out_path = out_path
+        self._acc = np.zeros(0, dtype=np.int32)
+        self._acc_start = 0  # sample index of _acc[0] on the track
+        self.written = 0
+        self.clips = 0
+        self._decoded: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._decoded_max = decoded_cache
+        self._codec_args = codec_args or ["-c:a", "aac", "-b:a", "128k"]
+        self._out_format = out_format
+        self._part_start = 0  # track sample where the current encoder's input begins
+        self._recent = np.zeros(0, dtype=np.int16)  # last written samples, to restart at a frame boundary
+        self._spawn(out_path)
+
+    def _cmd(self, out_path: str) -> List[str]:
+        cmd = [
+            FFMPEG_BIN, "-y", "-v", "error",
+            "-f", "s16le", "-ar", str(self.sample_rate), "-ac", "1", "-i", "pipe:0",
+            *self._codec_args,
+        ]
+        if self._out_format:
+            cmd += ["-f", self._out_format]
+        cmd.append(out_path)
+        return cmd
+
+    def _spawn(self, out_path: str) -> None:
+        self.out_path = out_path
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            # A previous output may be hard-linked from the render cache; never truncate it in place
+            os.unlink(out_path)
+        except OSError:
+            pass
+        self._proc = subprocess.Popen(self._cmd(out_path), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def _clip(self, path: str) -> np.ndarray:
+        st = os.stat(path)
+        key = (st.st_dev, st.st_ino, st.st_size)
+        pcm = self._decoded.get(key)
+        if pcm is None:
+            pcm = decode_clip(path, self.sample_rate)
+            self._decoded[key] = pcm
+            if len(self._decoded) > self._decoded_max:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(key)
+        return pcm
+
+    def _feed(self, pcm16: np.ndarray) -> None:
+        try:
+            self._proc.stdin.write(pcm16.tobytes())
+        except BrokenPipeError:
+            raise MixError(f"encoder exited early: {self._encoder_error()}")
+
+    def _write(self, pcm16: np.ndarray) -> None:
+        self._feed(pcm16)
+        self.written += len(pcm16)
+        if len(pcm16) >= AAC_FRAME:
+            self._recent = pcm16[-AAC_FRAME:].copy()
+        else:
+            self._recent = np.concatenate([self._recent, pcm16])[-AAC_FRAME:]
+
+    def _flush_until(self, pos: int) -> None:
+        """Write out the final part of the track up to sample `pos`."""
+        if pos <= self._acc_start:
+            return
+        n = min(pos - self._acc_start, len(self._acc))
+        if n:
+            self._write(soft_limit(self._acc[:n]))
+            self._acc = self._acc[n:]
+            self._acc_start += n
+        gap = pos - self._acc_start
+        block = self.sample_rate  # 1 s of silence per write
+        while gap > 0:
+            k = min(gap, block)
+            self._write(np.zeros(k, dtype=np.int16))
+            gap -= k
+            self._acc_start += k
+
+    def add(self, start_ms: int, path: str) -> None:
+        """Mix one clip at `start_ms`; starts must be non-decreasing."""
+        start = int(max(0, start_ms) * self.sample_rate // 1000)
+        if start < self._acc_start:
+            # Out of order (or overlapping an already flushed part): place it at the write head
+            start = self._acc_start
+        self._flush_until(start)
+        pcm = self._clip(path)
+        if len(pcm) > len(self._acc):
+            self._acc = np.concatenate([self._acc, np.zeros(len(pcm) - len(self._acc), dtype=np.int32)])
+        self._acc[: len(pcm)] += pcm
+        self.clips += 1
+
+    def pad_to(self, ms: int) -> None:
+        """Extend the track with silence (or the pending tail) up to `ms`."""
+        self._flush_until(int(ms * self.sample_rate // 1000))
+
+    def _encoder_error(self) -> str:
+        try:
+            self._stderr.seek(0)
+            return self._stderr.read().decode("utf-8", "ignore")[:1000]
+        except Exception:
+            return ""
+
+    def close(self) -> None:
+        """Flush the tail and wait for the encoder."""
+        try:
+            if len(self._acc):
+                self._write(soft_limit(self._acc))
+                self._acc_start += len(self._acc)
+                self._acc = np.zeros(0, dtype=np.int32)
+        except BrokenPipeError:
+            pass
+        self._finish()
+
+    def _finish(self) -> None:
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        rc = self._proc.wait()
+        err = self._encoder_error()
+        self._stderr.close()
+        if rc != 0:
+            raise MixError(f"encoder failed ({rc}): {err}")
+
+    def rotate(self, out_path: str) -> Tuple[str, int]:
+        """
+        Close the current output and continue the mix into `out_path`.
+
+        Returns (closed_path, frames): keep only the first `frames` AAC
+        frames of the closed output, then append the new one. The new
+        encoder starts at the last frame boundary and its priming frame
+        takes the place of the dropped frame, so the joined ADTS stays on
+        the original timeline (only the frame at the join is inexact).
+        """
+        cut = self.written // AAC_FRAME * AAC_FRAME
+        frames = (cut - self._part_start) // AAC_FRAME
+        closed = self.out_path
+        self._finish()
+        self._part_start = cut
+        self._spawn(out_path)
+        self._feed(self._recent[len(self._recent) - (self.written - cut):])
+        return closed, frames
+
+    def encode_pending(self, out_path: str) -> None:
+        """
+        Encode what the current output would still get if the mix ended now:
+        its input since the last `rotate` plus the unflushed tail. Call right
+        after `rotate`; the running mix is not changed.
+        """
+        head = self._recent[len(self._recent) - (self.written - self._part_start):]
+        pcm = np.concatenate([head, soft_limit(self._acc)]) if len(self._acc) else head
+        res = subprocess.run(self._cmd(out_path), input=pcm.tobytes(), capture_output=True)
+        if res.returncode != 0:
+            raise MixError(f"encoder failed ({res.returncode}): {res.stderr.decode('utf-8', 'ignore')[:1000]}")
+
+    def abort(self) -> None:
+        try:
+            self._proc.kill()
+            self._proc.wait()
+        except Exception:
+            pass
+        self._stderr.close()
+
+
+def mix_segments(segments: Iterable[Dict], out_path: str, sample_rate: int = MIX_SAMPLE_RATE, codec_args: Optional[List[str]] = None, on_clip: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Mix every segment's audio_path at its start_ms into `out_path`; returns the clip count.
+    `on_clip(done, total)` is called after each clip and may raise to abort the mix.
+    """
+    clips = sorted(
+        ((int(s.get("start_ms", 0)), s.get("audio_path")) for s in segments if s.get("audio_path") and Path(s["audio_path"]).exists()),
+        key=lambda c: c[0],
+    )
+    if not clips:
+        raise MixError("No audio streams available from segments")
+    mixer = ClipMixer(out_path, sample_rate=sample_rate, codec_args=codec_args)
+    try:
+        for i, (start_ms, path) in enumerate(clips, 1):
+            mixer.add(start_ms, path)
+            if on_clip:
+                on_clip(i, len(clips))
+        mixer.close()
+    except Exception:
+        mixer.abort()
+        raise
+    return mixer.clips
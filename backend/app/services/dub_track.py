@@ -0,0 +1,252 @@
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .audio_mixer import MIX_SAMPLE_RATE, ClipMixer
+
+
+def adts_prefix(data: bytes, frames: Optional[int] = None) -> int:
+    """Byte length of the first `frames` complete ADTS frames in `data` (all complete ones for None)."""
+    pos = count = 0
+    while pos + 7 <= len(data) and (frames is None or count < frames):
+        if data[pos] != 0xFF or data[pos + 1] & 0xF0 != 0xF0:
+            break
+        size = ((data[pos + 3] & 0x03) << 11) | (data[pos + 4] << 3) | (data[pos + 5] >> 5)
+        if size < 7 or pos + size > len(data):
+            break
+        pos += size
+        count += 1
+    return pos
+
+
+def _append_adts(dst: str, src: str, frames: Optional[int] = None) -> None:
+    data = Path(src).read_bytes()
+    with open(dst, "ab") as f:
+        f.write(data[: adts_prefix(data, frames)])
+
+
+class IncrementalDubTrack:
+    """
+    A session's dubbed audio, built while the session runs.
+
+    Segments are appended in timeline order and mixed on a background
+    thread by a ClipMixer whose encoder writes an append-only ADTS AAC file:
+    audio before the newest segment's start is final and is encoded right
+    away, so `finalize` only has to flush the last clip's tail. `snapshot`
+    copies the track as it stands for a render while segments keep being
+    appended: the encoder is rotated at an AAC frame boundary (the closed
+    part is appended to `out_path`, the mix continues into a part file) and
+    the copy gets the pending tail encoded on its own. A track that fails
+    (bad clip, encoder exit) is marked broken and callers fall back to
+    mixing from the segment list.
+    """
+
+    def __init__(self, session_id: str, out_path: str, sample_rate: int = MIX_SAMPLE_RATE):
+        self.logger = logging.getLogger("rt_dub")
+        self.session_id = session_id
+        self.out_path = out_path
+        self.sample_rate = sample_rate
+        self.appended = 0
+        self.mixed = 0
+        self.snapshots = 0
+        self.pending_snapshots = 0
+        self.broken = ""
+        self.finalized = False
+        self.last_used = time.monotonic()
+        self._mixer: Optional[ClipMixer] = None
+        self._parts = 0
+        self._snap_seq = 0
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"dub-{session_id[:8]}", daemon=True)
+        self._thread.start()
+
+    def _part_path(self) -> str:
+        self._parts += 1
+        return f"{self.out_path[:-len('.aac')]}.part{self._parts % 2}.aac"
+
+    def _snapshot(self, path: str) -> Optional[str]:
+        """Worker thread: write the track so far (tail included) to `path`."""
+        if self._mixer is None:
+            return None
+        closed, frames = self._mixer.rotate(self._part_path())
+        if closed != self.out_path:
+            _append_adts(self.out_path, closed, frames)
+            os.unlink(closed)
+        else:
+            # First rotation: the closed part is out_path itself, trim it in place
+            os.truncate(self.out_path, adts_prefix(Path(self.out_path).read_bytes(), frames))
+        tail = f"{path}.tail"
+        try:
+            self._mixer.encode_pending(tail)
+            shutil.copyfile(self.out_path, path)
+            _append_adts(path, tail)
+        finally:
+            try:
+                os.unlink(tail)
+            except OSError:
+                pass
+        self.snapshots += 1
+        return path
+
+    def _resolve(self, fut: "Future[Optional[str]]", path: Optional[str]) -> None:
+        with self._lock:
+            self.pending_snapshots -= 1
+        fut.set_result(path)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if item[0] == "snapshot":
+                    _, path, fut = item
+                    result = None
+                    if not self.broken:
+                        try:
+                            result = self._snapshot(path)
+                        except Exception as e:
+                            self.broken = str(e)[:300]
+                            self.logger.warning("dub.track.snapshot_failed sid=%s err=%s", self.session_id, self.broken)
+                    self._resolve(fut, result)
+                    continue
+                if self.broken:
+                    continue
+                _, start_ms, path = item
+                try:
+                    if self._mixer is None:
+                        self._mixer = ClipMixer(self.out_path, self.sample_rate, codec_args=["-c:a", "aac", "-b:a", "128k"], out_format="adts")
+                    self._mixer.add(start_ms, path)
+                    self.mixed += 1
+                except Exception as e:
+                    self.broken = str(e)[:300]
+                    self.logger.warning("dub.track.broken sid=%s err=%s", self.session_id, self.broken)
+            if self._mixer is not None:
+                if self.broken:
+                    self._mixer.abort()
+                else:
+                    self._mixer.close()
+                    if self._mixer.out_path != self.out_path:
+                        _append_adts(self.out_path, self._mixer.out_path)
+                        os.unlink(self._mixer.out_path)
+        except Exception as e:
+            self.broken = self.broken or str(e)[:300]
+            self.logger.warning("dub.track.close_failed sid=%s err=%s", self.session_id, e)
+        finally:
+            # Snapshots queued behind a failure still get an answer
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and item[0] == "snapshot":
+                    self._resolve(item[2], None)
+            self._done.set()
+
+    def append(self, start_ms: int, audio_path: str) -> None:
+        """Queue one segment clip (non-blocking; call in timeline order)."""
+        with self._lock:
+            if self.finalized:
+                return
+            self.last_used = time.monotonic()
+            self.appended += 1
+            self._queue.put(("clip", int(start_ms), audio_path))
+
+    def snapshot(self) -> Tuple[int, "Future[Optional[str]]"]:
+        """
+        Queue a copy of the track for a render; appending continues.
+        Returns the number of segments the copy covers and a future for its
+        path (None when the track is unusable). The caller removes the file.
+        """
+        fut: "Future[Optional[str]]" = Future()
+        with self._lock:
+            if self.finalized:
+                fut.set_result(None)
+                return self.appended, fut
+            self.last_used = time.monotonic()
+            self.pending_snapshots += 1
+            self._snap_seq += 1
+            path = f"{self.out_path[:-len('.aac')]}.snap{self._snap_seq}.aac"
+            self._queue.put(("snapshot", path, fut))
+            return self.appended, fut
+
+    def finalize(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Flush the tail and close the encoder; returns the track path, or None if unusable."""
+        with self._lock:
+            if not self.finalized:
+                self.finalized = True
+                self._queue.put(None)
+        self._done.wait(timeout)
+        if not self._done.is_set() or self.broken or self._mixer is None:
+            return None
+        return self.out_path if Path(self.out_path).exists() else None
+
+    def abort(self) -> None:
+        self.broken = self.broken or "aborted"
+        self.finalize(timeout=0)
+        if self._mixer is not None:
+            self._mixer.abort()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "appended": self.appended,
+            "mixed": self.mixed,
+            "snapshots": self.snapshots,
+            "pending": self._queue.qsize(),
+            "finalized": self.finalized,
+            "broken": self.broken,
+        }
+
+
+class DubTrackRegistry:
+    """Per-session IncrementalDubTrack instances, written under `out_dir` (or `dir_for(session_id)`)."""
+
+    def __init__(self, out_dir: str, sample_rate: int = MIX_SAMPLE_RATE, dir_for: Optional[Callable[[str], Path]] = None):
+        self.logger = logging.getLogger("rt_dub")
+        self.out_dir = Path(out_dir)
+        self.sample_rate = sample_rate
+        self.dir_for = dir_for
+        self._tracks: Dict[str, IncrementalDubTrack] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> IncrementalDubTrack:
+        with self._lock:
+            track = self._tracks.get(session_id)
+            if track is None:
+                out_dir = self.dir_for(session_id) if self.dir_for else self.out_dir
+                out_dir.mkdir(parents=True, exist_ok=True)
+                track = IncrementalDubTrack(session_id, str(out_dir / f"{session_id}_dub_live.aac"), self.sample_rate)
+                self._tracks[session_id] = track
+            return track
+
+    def peek(self, session_id: str) -> Optional[IncrementalDubTrack]:
+        with self._lock:
+            return self._tracks.get(session_id)
+
+    def close(self, session_id: str) -> None:
+        with self._lock:
+            track = self._tracks.pop(session_id, None)
+        if track is None or track.finalized:
+            return
+        if track.pending_snapshots:
+            # A queued render still waits for its copy: let the worker finish it, then close
+            track.finalize(timeout=0)
+        else:
+            track.abort()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tracks = list(self._tracks.values())
+        return {
+            "sessions": len(tracks),
+            "pending": sum(t.stats()["pending"] for t in tracks),
+            "broken": sum(1 for t in tracks if t.broken),
+        }
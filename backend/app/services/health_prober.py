@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .provider_router import CLOSED
+from .translate_libre import MYMEMORY_KEY, LibreTranslate
+from ..utils import http
+
+ARGOS_KEY = "argos"
+
+
+class HealthProber:
+    """
+    Periodically re-tests translation providers whose circuit is open.
+
+    Healthy providers are measured by user traffic already, so only open
+    and half-open circuits are probed (`probe_all` probes every provider
+    once, e.g. for diagnostics). Probe outcomes feed the shared
+    ProviderRouter, so an open circuit is re-tested without risking user
+    traffic, and are cached in `snapshot`, which /api/health/translate
+    returns instead of making live calls; unprobed providers report their
+    passive router state.
+    """
+
+    def __init__(self, libre: LibreTranslate, argos=None, interval: float = 30.0, source: str = "en", target: str = "hi", sample: str = "hello"):
+        self.logger = logging.getLogger("rt_dub")
+        self.libre = libre
+        self.argos = argos
+        self.interval = max(1.0, float(interval))
+        self.source = source
+        self.target = target
+        self.sample = sample
+        self.snapshot: Dict[str, Any] = {"checked_at": None}
+        self.probes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self, key: str, probe_all: bool, sync_fn, async_fn, *args) -> Dict[str, Any]:
+        if not probe_all:
+            passive = self._passive(key)
+            if passive is not None:
+                return passive
+        self.probes += 1
+        t0 = time.monotonic()
+        try:
+            if http.HTTPX_AVAILABLE:
+                out = await async_fn(*args)
+            else:
+                out = await asyncio.to_thread(sync_fn, *args)
+            return {"ok": bool(out), "latency_ms": int((time.monotonic() - t0) * 1000)}
+        except Exception as e:
+            return {"ok": False, "latency_ms": int((time.monotonic() - t0) * 1000), "error": str(e)[:200]}
+
+    def _passive(self, key: str) -> Optional[Dict[str, Any]]:
+        """Router state of a closed circuit (not probed), or None when it needs a probe."""
+        state = self.libre.router.health(key).state
+        return {"ok": True, "probed": False, "state": state} if state == CLOSED else None
+
+    async def _probe_argos(self, probe_all: bool) -> Dict[str, Any]:
+        if not self.argos:
+            return {"available": False, "ok": False}
+        if not probe_all:
+            passive = self._passive(ARGOS_KEY)
+            if passive is not None:
+                return {"available": True, **passive}
+        self.probes += 1
+        t0 = time.monotonic()
+        try:
+            out = await asyncio.to_thread(self.argos.translate, self.sample, self.source, self.target)
+        except Exception as e:
+            self.libre.router.record_failure(ARGOS_KEY, e, time.monotonic() - t0)
+            return {"available": True, "ok": False, "error": str(e)[:200]}
+        self.libre.router.record_success(ARGOS_KEY, time.monotonic() - t0)
+        return {"available": True, "ok": bool(out), "latency_ms": int((time.monotonic() - t0) * 1000)}
+
+    async def probe_once(self, probe_all: bool = False) -> Dict[str, Any]:
+        args = (self.sample, self.source, self.target)
+        hosts = list(self.libre.base_urls)
+        results = await asyncio.gather(
+            *(self._probe(self.libre.host_key(b), probe_all, self.libre.translate_host, self.libre.atranslate_host, b, *args) for b in hosts),
+            self._probe(MYMEMORY_KEY, probe_all, self.libre.translate_mymemory, self.libre.atranslate_mymemory, *args),
+            self._probe_argos(probe_all),
+        )
+        libre_hosts = dict(zip(hosts, results[:len(hosts)]))
+        self.snapshot = {
+            "checked_at": time.time(),
+            "pair": f"{self.source}->{self.target}",
+            "libre": {"ok": any(r["ok"] for r in libre_hosts.values()), "hosts": libre_hosts},
+            "mymemory": results[len(hosts)],
+            "argos": results[len(hosts) + 1],
+        }
+        self.logger.info(
+            "health.probe libre_ok=%d/%d mymemory=%s argos=%s",
+            sum(1 for r in libre_hosts.values() if r["ok"]), len(hosts),
+            self.snapshot["mymemory"]["ok"], self.snapshot["argos"]["ok"],
+        )
+        return self.snapshot
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.probe_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning("health.probe.failed err=%s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
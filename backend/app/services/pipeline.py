@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .scheduler import StageOverloaded
+
+
+class ChunkJob:
+    """One audio chunk travelling through a session pipeline; stages fill in fields."""
+
+    def __init__(self, session_id: str, client_ts: int, content: bytes, suffix: str, source_lang: str, target_lang: str):
+        self.session_id = session_id
+        self.client_ts = int(client_ts)
+        self.content = content
+        self.suffix = suffix
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.seq = -1
+        self.pcm = b""
+        self.dur = 0.0
+        # Speech span inside the chunk found by VAD (ms from chunk start); None = whole chunk
+        self.speech_start_ms: Optional[int] = None
+        self.speech_end_ms: Optional[int] = None
+        self.text = ""
+        self.translated = ""
+        self.audio_bytes = b""
+        self.audio_path = ""
+        # TTS pieces (MP3 bytes) as they are synthesized, for progressive delivery; None ends it
+        self.pieces: Optional[asyncio.Queue] = None
+        self.start_ms = 0
+        self.end_ms = 0
+        self.failed_stage = ""
+        self.error: Optional[BaseException] = None
+        self.future: Optional[asyncio.Future] = None
+
+
+Step = Tuple[str, Callable[[ChunkJob], Awaitable[None]]]
+
+
+class SessionPipeline:
+    """
+    Per-session chain of stages connected by asyncio queues.
+
+    Each stage has a single worker, so chunk N+1 can be in ASR while chunk N
+    is in TTS, yet every stage sees chunks in the same order. The intake
+    queue is ordered by (client_ts, arrival) so near-simultaneous uploads are
+    timed and delivered in client order. `deliver` (plain or async) runs
+    after the last stage, in order, and the submitting request is resolved
+    right after it.
+    """
+
+    def __init__(self, session_id: str, steps: List[Step], deliver: Callable[[ChunkJob], Any], max_pending: int = 16):
+        if not steps:
+            raise ValueError("pipeline needs at least one step")
+        self.session_id = session_id
+        self.steps = steps
+        self.deliver = deliver
+        self.max_pending = max(1, int(max_pending))
+        self.logger = logging.getLogger("rt_dub")
+        self.last_used = time.monotonic()
+        self._seq = 0
+        self._pending = 0
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: Dict[int, ChunkJob] = {}
+
+    def _ensure_started(self) -> None:
+        if self._tasks:
+            return
+        self._queues = [asyncio.PriorityQueue()] + [asyncio.Queue() for _ in self.steps[1:]]
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"pipeline-{self.session_id[:8]}-{name}")
+            for i, (name, _) in enumerate(self.steps)
+        ]
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def submit(self, job: ChunkJob) -> ChunkJob:
+        """Enqueue a chunk and wait until it has been delivered (or failed)."""
+        if self._pending >= self.max_pending:
+            raise StageOverloaded("pipeline", 1.0)
+        self._ensure_started()
+        self.last_used = time.monotonic()
+        job.seq = self._seq
+        self._seq += 1
+        job.future = asyncio.get_running_loop().create_future()
+        self._pending += 1
+        self._inflight[job.seq] = job
+        self._queues[0].put_nowait((job.client_ts, job.seq, job))
+        # Shield: a disconnecting client must not cancel a job that already owns a timeline slot
+        return await asyncio.shield(job.future)
+
+    async def _worker(self, idx: int) -> None:
+        name, fn = self.steps[idx]
+        queue = self._queues[idx]
+        last = idx == len(self.steps) - 1
+        while True:
+            item = await queue.get()
+            job: ChunkJob = item[2] if idx == 0 else item
+            if job.error is None:
+                try:
+                    await fn(job)
+                except asyncio.CancelledError:
+                    raise
+                except BaseException as e:
+                    job.error = e
+                    job.failed_stage = name
+            if not last:
+                self._queues[idx + 1].put_nowait(job)
+                continue
+            try:
+                if job.error is None:
+                    res = self.deliver(job)
+                    if asyncio.iscoroutine(res):
+                        await res
+            except Exception as e:
+                self.logger.warning("pipeline.deliver.failed sid=%s seq=%d err=%s", self.session_id, job.seq, e)
+            finally:
+                self._pending -= 1
+                self._inflight.pop(job.seq, None)
+                self.last_used = time.monotonic()
+                if job.future and not job.future.done():
+                    job.future.set_result(job)
+
+    def close(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        for job in self._inflight.values():
+            if job.future and not job.future.done():
+                job.future.set_exception(RuntimeError("session closed"))
+        self._inflight.clear()
+        self._pending = 0
+        self._tasks = []
+        self._queues = []
+
+
+class PipelineRegistry:
+    """Lazily creates one SessionPipeline per session and drops idle ones."""
+
+    def __init__(self, factory: Callable[[str], SessionPipeline], idle_timeout: float = 300.0):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self._pipelines: Dict[str, SessionPipeline] = {}
+
+    def get(self, session_id: str) -> SessionPipeline:
+        p = self._pipelines.get(session_id)
+        if p is None:
+            p = self.factory(session_id)
+            self._pipelines[session_id] = p
+        return p
+
+    def close(self, session_id: str) -> None:
+        p = self._pipelines.pop(session_id, None)
+        if p:
+            p.close()
+
+    def sessions(self) -> List[str]:
+        return list(self._pipelines)
+
+    def reap_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [sid for sid, p in self._pipelines.items() if p.pending == 0 and p.last_used < cutoff]
+        for sid in idle:
+            self.close(sid)
+        return len(idle)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self._pipelines),
+            "pending": sum(p.pending for p in self._pipelines.values()),
+        }
@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """Rolling health of one provider endpoint (a Libre host, MyMemory, Argos, ...)."""
+
+    def __init__(self, key: str, window: int = 128):
+        self.key = key
+        self.ewma_ms: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_inflight = False
+        self.successes = 0
+        self.failures = 0
+        self.last_error = ""
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def percentile_ms(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "ewma_ms": int(self.ewma_ms) if self.ewma_ms is not None else None,
+            "p95_ms": int(self.percentile_ms(95)) if self.samples else None,
+            "error_rate": round(self.error_rate, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class ProviderRouter:
+    """
+    Orders providers by observed latency and trips circuit breakers.
+
+    Every call reports back through record_success/record_failure. After
+    `failure_threshold` consecutive failures a provider's circuit opens and it
+    is skipped; after `open_seconds` one trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 3, open_seconds: float = 30.0, alpha: float = 0.3):
+        self.logger = logging.getLogger("rt_dub")
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.open_seconds = float(open_seconds)
+        self.alpha = float(alpha)
+        self._lock = threading.Lock()
+        self._health: Dict[str, ProviderHealth] = {}
+
+    def _get(self, key: str) -> ProviderHealth:
+        h = self._health.get(key)
+        if h is None:
+            h = ProviderHealth(key)
+            self._health[key] = h
+        return h
+
+    def health(self, key: str) -> ProviderHealth:
+        with self._lock:
+            return self._get(key)
+
+    def allow(self, key: str) -> bool:
+        """True when a request to `key` may be sent now (claims the half-open trial slot)."""
+        with self._lock:
+            h = self._get(key)
+            if h.state == CLOSED:
+                return True
+            if h.state == OPEN and time.monotonic() - h.opened_at >= self.open_seconds:
+                h.state = HALF_OPEN
+                h.trial_inflight = False
+            if h.state == HALF_OPEN and not h.trial_inflight:
+                h.trial_inflight = True
+                return True
+            return False
+
+    def release(self, key: str) -> None:
+        """Give back a trial slot claimed by allow() for a call that was never sent."""
+        with self._lock:
+            h = self._get(key)
+            if h.state == HALF_OPEN:
+                h.trial_inflight = False
+
+    def record_success(self, key: str, latency_s: float) -> None:
+        ms = latency_s * 1000.0
+        with self._lock:
+            h = self._get(key)
+            h.ewma_ms = ms if h.ewma_ms is None else (1 - self.alpha) * h.ewma_ms + self.alpha * ms
+            h.error_rate = (1 - self.alpha) * h.error_rate
+            h.samples.append(ms)
+            h.successes += 1
+            h.consecutive_failures = 0
+            if h.state != CLOSED:
+                self.logger.info("router.circuit.closed key=%s", key)
+            h.state = CLOSED
+            h.trial_inflight = False
+
+    def record_failure(self, key: str, err: Any = "", latency_s: Optional[float] = None) -> None:
+        with self._lock:
+            h = self._get(key)
+            h.error_rate = (1 - self.alpha) * h.error_rate + self.alpha
+            if latency_s is not None:
+                ms = latency_s * 1000.0
+                h.ewma_ms = ms if h.ewma_ms is None else (1 - self.alpha) * h.ewma_ms + self.alpha * ms
+            h.failures += 1
+            h.consecutive_failures += 1
+            h.last_error = str(err)[:200]
+            h.trial_inflight = False
+            if h.state == HALF_OPEN or (h.state == CLOSED and h.consecutive_failures >= self.failure_threshold):
+                h.state = OPEN
+                h.opened_at = time.monotonic()
+                self.logger.warning("router.circuit.open key=%s failures=%d err=%s", key, h.consecutive_failures, h.last_error)
+
+    def _score(self, h: ProviderHealth) -> float:
+        # Unmeasured providers sort first so they get measured; errors inflate latency
+        base = h.ewma_ms if h.ewma_ms is not None else 0.0
+        return base * (1.0 + 4.0 * h.error_rate)
+
+    def order(self, keys: Iterable[str]) -> List[str]:
+        """Keys with a closed circuit, fastest first, followed by open ones (callers still check allow())."""
+        with self._lock:
+            hs = [self._get(k) for k in keys]
+        closed = sorted((h for h in hs if h.state == CLOSED), key=self._score)
+        others = [h for h in hs if h.state != CLOSED]
+        return [h.key for h in closed + others]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {k: h.as_dict() for k, h in self._health.items()}
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bump when render commands change in a way that alters the output bytes
+RENDER_FORMAT = "1"
+
+
+def digest(*parts: Any) -> str:
+    """Stable sha256 over JSON-encoded parts."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class RenderCache:
+    """
+    Content-addressed store for render artifacts (SRT, dubbed audio, video parts, final MP4).
+
+    Artifacts live at <root>/<k[:2]>/<k><suffix>. Keys are built from content
+    hashes: the source video, each segment's timing and text, each TTS
+    clip's bytes and the render options, so an unchanged input maps to the
+    same key across renders and sessions. Files are stored and handed out as
+    hard links, so a hit costs no copy and evicting an entry (LRU, under
+    `max_bytes`) never breaks a session output that still references it.
+    File hashes are memoized by (device, inode, size, mtime).
+    """
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.logger = logging.getLogger("rt_dub")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, LRU order
+        self._bytes = 0
+        self._file_hashes: Dict[Tuple[int, int, int, int], str] = {}
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        for p in self.root.glob("*/*"):
+            try:
+                if p.suffix == ".tmp":
+                    # Left by a store() that died before its rename
+                    p.unlink()
+                    continue
+                st = p.stat()
+            except OSError:
+                continue
+            if p.is_file():
+                entries.append((st.st_mtime, p.name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            self._bytes += size
+        if entries:
+            self.logger.info("render.cache.loaded artifacts=%d bytes=%d", len(entries), self._bytes)
+        # The budget may have been lowered since the last run
+        self._evict()
+
+    def file_hash(self, path: str) -> str:
+        """sha256 of a file's bytes, memoized while the file is unchanged."""
+        st = os.stat(path)
+        memo = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._file_hashes.get(memo)
+        if cached:
+            return cached
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        value = h.hexdigest()
+        with self._lock:
+            if len(self._file_hashes) > 4096:
+                self._file_hashes.clear()
+            self._file_hashes[memo] = value
+        return value
+
+    # Keys -------------------------------------------------------------------
+
+    @staticmethod
+    def srt_key(segments: List[Dict], use_translated: bool) -> str:
+        lines = [
+            (int(s.get("start_ms", 0)), int(s.get("end_ms", 0)), ((s.get("translated_text") if use_translated else s.get("text")) or "").strip())
+            for s in segments
+        ]
+        return digest("srt", RENDER_FORMAT, [line for line in lines if line[2]])
+
+    def audio_key(self, segments: List[Dict], sample_rate: int) -> str:
+        clips = sorted(
+            (int(s.get("start_ms", 0)), self.file_hash(s["audio_path"]))
+            for s in segments if s.get("audio_path") and Path(s["audio_path"]).exists()
+        )
+        return digest("audio", RENDER_FORMAT, sample_rate, clips)
+
+    def final_key(self, video_hash: str, srt_key: str, audio_key: str, options: Dict[str, Any]) -> str:
+        return digest("final", RENDER_FORMAT, video_hash, srt_key, audio_key, options)
+
+    # Artifacts --------------------------------------------------------------
+
+    def path_for(self, key: str, suffix: str) -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def lookup(self, key: str, suffix: str) -> Optional[str]:
+        name = f"{key}{suffix}"
+        path = self.path_for(key, suffix)
+        with self._lock:
+            known = name in self._entries
+            if known:
+                self._entries.move_to_end(name)
+        if known and path.exists():
+            with self._lock:
+                self.counters["hits"] += 1
+            return str(path)
+        with self._lock:
+            if known:
+                self._bytes -= self._entries.pop(name, 0)
+            self.counters["misses"] += 1
+        return None
+
+    def store(self, key: str, suffix: str, src: str) -> str:
+        """Add `src` under `key` (hard link, copy across filesystems); returns the cache path."""
+        path = self.path_for(key, suffix)
+        name = path.name
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Already the same file (e.g. a materialized hit stored again): just record it
+            if not (path.exists() and os.path.samefile(src, path)):
+                tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                try:
+                    os.link(src, tmp)
+                except OSError:
+                    shutil.copyfile(src, tmp)
+                os.replace(tmp, path)
+            size = path.stat().st_size
+        except OSError as e:
+            self.logger.warning("render.cache.store_failed key=%s err=%s", key[:12], e)
+            return src
+        with self._lock:
+            self._bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self.counters["stores"] += 1
+            self._evict()
+        return str(path)
+
+    def materialize(self, cached: str, dest: str) -> str:
+        """Expose a cached artifact at `dest` (replacing it) and return `dest`."""
+        try:
+            if os.path.samefile(cached, dest):
+                # rename() between two links of one file is a no-op that would leave tmp behind
+                return dest
+        except OSError:
+            pass
+        tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(cached, tmp)
+        except OSError:
+            shutil.copyfile(cached, tmp)
+        os.replace(tmp, dest)
+        return dest
+
+    def fetch(self, key: str, suffix: str, dest: str) -> Optional[str]:
+        """Materialize the artifact under `key` at `dest`; None on a miss, including one evicted since the lookup."""
+        cached = self.lookup(key, suffix)
+        if not cached:
+            return None
+        try:
+            return self.materialize(cached, dest)
+        except OSError:
+            with self._lock:
+                self._bytes -= self._entries.pop(Path(cached).name, 0)
+                self.counters["hits"] -= 1
+                self.counters["misses"] += 1
+            return None
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            try:
+                (self.root / name[:2] / name).unlink()
+            except OSError:
+                pass
+            self.counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.counters)
+            out.update({"artifacts": len(self._entries), "disk_bytes": self._bytes})
+        return out
@@ -3,63 +3,148 @@ import shlex
 import subprocess
 import tempfile
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Set, Tuple
 
 from .subtitle_builder import write_srt_from_chunks
+from .audio_mixer import MIX_SAMPLE_RATE, MixError, mix_segments
+
+if TYPE_CHECKING:
+    from .render_cache import RenderCache
+
+SUBS_STYLE = "Fontsize=24,Outline=1,MarginV=30"
 
 
 class RenderError(Exception):
     pass
 
 
-def _run(cmd: List[str]) -> None:
-    res = subprocess.run(cmd, capture_output=True, text=True)
-    if res.returncode != 0:
-        raise RenderError(f"Command failed ({res.returncode}): {' '.join(shlex.quote(c) for c in cmd)}\nSTDERR:\n{res.stderr[:1000]}")
+class RenderCancelled(RenderError):
+    pass
 
 
-def _make_dubbed_audio(segments: List[Dict], out_audio_path: str) -> None:
+class RenderControl:
     """
-    Build a single dubbed audio track by delaying each TTS chunk to its start time and mixing.
-    Segments must contain: start_ms, audio_path.
+    Progress and cancellation hooks for one render.
+
+    `report(stage, fraction)` maps a step's own 0..1 progress into the
+    overall range the render assigned to that step and forwards it to
+    `on_progress(stage, overall)`. `cancel()` kills every running ffmpeg.
+    """
+
+    def __init__(self, on_progress: Optional[Callable[[str, float], None]] = None, nice: int = 0, threads: int = 0):
+        self.on_progress = on_progress
+        self.nice = int(nice)
+        self.threads = int(threads)
+        self.cancelled = False
+        self._procs: Set[subprocess.Popen] = set()
+        self._span = (0.0, 1.0)
+
+    def span(self, start: float, end: float) -> None:
+        self._span = (start, end)
+
+    def report(self, stage: str, fraction: float) -> None:
+        if self.cancelled:
+            raise RenderCancelled("render cancelled")
+        if self.on_progress:
+            lo, hi = self._span
+            self.on_progress(stage, lo + (hi - lo) * max(0.0, min(1.0, fraction)))
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self.kill_running()
+
+    def kill_running(self) -> None:
+        for proc in list(self._procs):
+            if proc.poll() is None:
+                try:
+                    proc.kill()
+                except Exception:
+                    pass
+
+
+def _run(cmd: List[str], control: Optional[RenderControl] = None, stage: str = "", duration_ms: int = 0, on_fraction: Optional[Callable[[float], None]] = None) -> None:
+    """Run ffmpeg; with a control, parse -progress output (to `on_fraction` if given, else control.report)."""
+    if control is None:
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        if res.returncode != 0:
+            raise RenderError(f"Command failed ({res.returncode}): {' '.join(shlex.quote(c) for c in cmd)}\nSTDERR:\n{res.stderr[:1000]}")
+        return
+    if control.cancelled:
+        raise RenderCancelled("render cancelled")
+    # Machine-readable progress on stdout ("out_time_us=...", "progress=end")
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    stderr = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True)
+    control._procs.add(proc)
+    report = on_fraction or (lambda frac: control.report(stage, frac))
+    try:
+        if control.nice and hasattr(os, "setpriority"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, proc.pid, control.nice)
+            except OSError:
+                pass
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            if key in ("out_time_us", "out_time_ms") and duration_ms > 0 and value.isdigit():
+                # Both keys are microseconds in current ffmpeg builds
+                report(int(value) / 1000.0 / duration_ms)
+        rc = proc.wait()
+    except RenderCancelled:
+        control.cancel()
+        proc.wait()
+        raise
+    finally:
+        control._procs.discard(proc)
+    if control.cancelled:
+        stderr.close()
+        raise RenderCancelled("render cancelled")
+    if rc != 0:
+        stderr.seek(0)
+        err = stderr.read().decode("utf-8", "ignore")
+        stderr.close()
+        raise RenderError(f"Command failed ({rc}): {' '.join(shlex.quote(c) for c in cmd)}\nSTDERR:\n{err[:1000]}")
+    stderr.close()
+    report(1.0)
+
+
+def _make_dubbed_audio(segments: List[Dict], out_audio_path: str, control: Optional[RenderControl] = None, sample_rate: int = MIX_SAMPLE_RATE) -> None:
+    """
+    Build a single dubbed audio track by placing each TTS chunk at its start time.
+    Segments must contain: start_ms, audio_path. Clips are mixed in-process
+    and streamed to one AAC encoder (see audio_mixer.ClipMixer).
     """
     if not segments:
         raise RenderError("No segments to render")
-    FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+    try:
+        on_clip = (lambda done, total: control.report("mix", done / total)) if control else None
+        mix_segments(segments, out_audio_path, sample_rate=sample_rate, on_clip=on_clip)
+    except MixError as e:
+        raise RenderError(str(e))
+
+
+def _unlink(path: str) -> None:
+    # Outputs may be hard links into the render cache: replace, never truncate in place
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
 
-    # Inputs
-    inputs: List[str] = []
-    filter_entries: List[str] = []
-    map_labels: List[str] = []
-    input_idx = 0
-
-    for seg in segments:
-        apath = seg.get("audio_path")
-        if not apath or not Path(apath).exists():
-            # Skip missing audio
-            continue
-        delay = max(0, int(seg.get("start_ms", 0)))
-        inputs.extend(["-i", apath])
-        # Each input is addressable by its positional index in the cmd list (0..N-1)
-        label = f"a{input_idx}"
-        # Use adelay in ms and apply to all channels to avoid channel mismatch
-        filter_entries.append(f"[{input_idx}:a]adelay={delay}:all=1,volume=1[{label}]")
-        map_labels.append(f"[{label}]")
-        input_idx += 1
-
-    if not map_labels:
-        raise RenderError("No audio streams available from segments")
-
-    filter_graph_parts = filter_entries + [f"{''.join(map_labels)}amix=inputs={len(map_labels)}:normalize=0[aout]"]
-    filter_complex = ";".join(filter_graph_parts)
-
-    cmd = [FFMPEG_BIN, "-y", *inputs, "-filter_complex", filter_complex, "-map", "[aout]", "-c:a", "aac", out_audio_path]
-    _run(cmd)
-
-
-def render_final_video(video_path: str, segments: List[Dict], out_dir: str, use_translated: bool = True, burn_subs: bool = True) -> Tuple[str, str]:
+
+def render_final_video(video_path: str, segments: List[Dict], out_dir: str, use_translated: bool = True, burn_subs: bool = True, dubbed_audio_path: Optional[str] = None, control: Optional[RenderControl] = None, parallel_parts: int = 1, cache: Optional["RenderCache"] = None, subs_mode: str = "", container: str = "auto", original_tracks: bool = False, mix_sample_rate: int = MIX_SAMPLE_RATE) -> Tuple[str, str]:
     """
     Returns (final_video_path, srt_path)
+    `subs_mode` is "burn" (re-encode with burned-in subtitles), "soft"
+    (stream-copy the video and embed selectable subtitle tracks, see
+    render_soft) or "none"; empty means burn/none from `burn_subs`. Soft
+    renders pick mp4/webm from the source codec unless `container` is given
+    and, with `original_tracks`, also carry the source audio and subtitles.
+    With `dubbed_audio_path` (an AAC track built during the session) the
+    audio is stream-copied and no mixing happens here. `control` receives
+    progress and can cancel the render. With `parallel_parts` > 1 subtitles
+    are burned in that many ranges at once (see render_segmented). With a
+    `cache`, the SRT, dubbed audio and final video are reused whenever their
+    inputs hash the same as a previous render. A dubbed track mixed here
+    uses `mix_sample_rate`.
     """
     video_path = str(video_path)
     out_dir_p = Path(out_dir)
@@ -72,24 +157,115 @@ def render_final_video(video_path: str, segments: List[Dict], out_dir: str, use_
     except Exception:
         sid = "session"
 
+    prebuilt_audio = dubbed_audio_path
+    subs_mode = subs_mode or ("burn" if burn_subs else "none")
+    burn_subs = subs_mode == "burn"
+    soft = subs_mode == "soft"
+    ext = ".mp4"
+    if soft:
+        from .render_soft import dominant, pick_container, probe_streams, soft_mux
+        source_info = probe_streams(video_path)
+        container = pick_container(source_info["video_codec"], container, source_info["audio_codec"])
+        ext = f".{container}"
+
     # Paths
     srt_path = str(out_dir_p / f"{sid}_subs.srt")
+    orig_srt_path = str(out_dir_p / f"{sid}_subs_orig.srt")
     dubbed_audio_path = str(out_dir_p / f"{sid}_dubbed.m4a")
-    final_path = str(out_dir_p / f"{sid}_final.mp4")
+    final_path = str(out_dir_p / f"{sid}_final{ext}")
+
+    # 0) Cache keys: a hit on the final video skips everything below
+    srt_key = audio_key = final_key = ""
+    if cache is not None:
+        srt_key = cache.srt_key(segments, use_translated)
+        audio_key = cache.audio_key(segments, mix_sample_rate)
+        options = {"subs_mode": subs_mode}
+        if burn_subs:
+            options["subs_style"] = SUBS_STYLE
+        if soft:
+            options.update(container=container, original_tracks=bool(original_tracks))
+            if original_tracks:
+                options["original_srt"] = cache.srt_key(segments, not use_translated)
+        final_key = cache.final_key(
+            cache.file_hash(video_path), srt_key if subs_mode != "none" else "", audio_key, options,
+        )
+        if cache.fetch(final_key, ext, final_path):
+            if not cache.fetch(srt_key, ".srt", srt_path):
+                _unlink(srt_path)
+                write_srt_from_chunks(segments, srt_path, use_translated=use_translated)
+            if control:
+                control.report("cached", 1.0)
+            return final_path, srt_path
 
     # 1) Write SRT from segments
-    write_srt_from_chunks(segments, srt_path, use_translated=use_translated)
+    if cache is None or not cache.fetch(srt_key, ".srt", srt_path):
+        _unlink(srt_path)
+        write_srt_from_chunks(segments, srt_path, use_translated=use_translated)
+        if cache is not None:
+            cache.store(srt_key, ".srt", srt_path)
 
-    # 2) Build dubbed audio track
-    _make_dubbed_audio(segments, dubbed_audio_path)
+    # 2) Build dubbed audio track (unless it was built incrementally or is cached)
+    # Either way the track is already AAC, so the mux stream-copies it
+    mux_start = 0.0
+    cached_audio = None
+    if cache is not None:
+        # Linked next to the render, so evicting the cache entry mid-mux cannot pull it away
+        cached_audio = cache.fetch(audio_key, ".m4a", dubbed_audio_path) or cache.fetch(audio_key, ".aac", str(out_dir_p / f"{sid}_dubbed.aac"))
+    if cached_audio:
+        dubbed_audio_path = cached_audio
+        audio_codec = ['-c:a', 'copy', '-bsf:a', 'aac_adtstoasc'] if cached_audio.endswith(".aac") else ['-c:a', 'copy']
+    elif prebuilt_audio and Path(prebuilt_audio).exists():
+        dubbed_audio_path = prebuilt_audio
+        audio_codec = ['-c:a', 'copy', '-bsf:a', 'aac_adtstoasc']
+        if cache is not None:
+            cache.store(audio_key, ".aac", prebuilt_audio)
+    else:
+        if control:
+            control.span(0.0, 0.3)
+        _unlink(dubbed_audio_path)
+        _make_dubbed_audio(segments, dubbed_audio_path, control, sample_rate=mix_sample_rate)
+        audio_codec = ['-c:a', 'copy']
+        mux_start = 0.3
+        if cache is not None:
+            cache.store(audio_key, ".m4a", dubbed_audio_path)
+    if control:
+        control.span(mux_start, 1.0)
 
     # 3) Mux with original video, burn subtitles if requested
     FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+    _unlink(final_path)
+
+    if soft:
+        target_lang = dominant(segments, "target_lang")
+        source_lang = dominant(segments, "source_lang")
+        tracks = [{"path": srt_path, "lang": target_lang if use_translated else source_lang, "title": "Translated" if use_translated else "Original"}]
+        if original_tracks:
+            _unlink(orig_srt_path)
+            write_srt_from_chunks(segments, orig_srt_path, use_translated=not use_translated)
+            tracks.append({"path": orig_srt_path, "lang": source_lang if use_translated else target_lang, "title": "Original" if use_translated else "Translated"})
+        # Emulates -shortest between the video and the dubbed track
+        durations = [d for d in (source_info["duration_ms"], probe_streams(dubbed_audio_path)["duration_ms"]) if d > 0]
+        soft_mux(
+            video_path, dubbed_audio_path, "-bsf:a" in audio_codec, tracks, final_path, container,
+            target_lang=target_lang, source_lang=source_lang,
+            original_audio=bool(original_tracks) and source_info["has_audio"],
+            duration_ms=min(durations) if durations else 0, control=control,
+        )
+        if cache is not None:
+            cache.store(final_key, ext, final_path)
+        return final_path, srt_path
+
+    if burn_subs and parallel_parts > 1:
+        from .render_segmented import burn_segmented
+        if burn_segmented(video_path, segments, dubbed_audio_path, audio_codec, final_path, parallel_parts, use_translated, control, cache):
+            if cache is not None:
+                cache.store(final_key, ".mp4", final_path)
+            return final_path, srt_path
 
     if burn_subs:
         # On Windows, escaping backslashes in the subtitles filter is needed
         srt_escaped = srt_path.replace('\\', '\\\\')
-        vf = f"subtitles='{srt_escaped}':force_style='Fontsize=24,Outline=1,MarginV=30'"
+        vf = f"subtitles='{srt_escaped}':force_style='{SUBS_STYLE}'"
         cmd = [
             FFMPEG_BIN, '-y',
             '-i', video_path,
@@ -98,7 +274,8 @@ def render_final_video(video_path: str, segments: List[Dict], out_dir: str, use_
             '-map', '1:a:0',
             '-vf', vf,
             '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '22',
-            '-c:a', 'aac',
+            *(['-threads', str(control.threads)] if control and control.threads else []),
+            *audio_codec,
             '-shortest',
             final_path
         ]
@@ -110,10 +287,13 @@ def render_final_video(video_path: str, segments: List[Dict], out_dir: str, use_
             '-map', '0:v:0',
             '-map', '1:a:0',
             '-c:v', 'copy',
-            '-c:a', 'aac',
+            *audio_codec,
             '-shortest',
             final_path
         ]
 
-    _run(cmd)
+    timeline_ms = max((int(s.get("end_ms", 0)) for s in segments), default=0)
+    _run(cmd, control, stage="encode" if burn_subs else "mux", duration_ms=timeline_ms)
+    if cache is not None:
+        cache.store(final_key, ".mp4", final_path)
     return final_path, srt_path
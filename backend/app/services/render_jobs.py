@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .render_ffmpeg import RenderCancelled, RenderControl
+from .scheduler import StageOverloaded
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class RenderJob:
+    def __init__(self, job_id: str, session_id: str, options: Optional[Dict[str, Any]] = None):
+        self.id = job_id
+        self.session_id = session_id
+        self.options = dict(options or {})
+        self.status = QUEUED
+        self.stage = ""
+        self.progress = 0.0
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Dict[str, Any] = {}
+        self.error = ""
+        self.control: Optional[RenderControl] = None
+        self.context: Any = None  # runner inputs (segments, paths); not persisted
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "options": self.options,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RenderJob":
+        job = cls(d["job_id"], d.get("session_id", ""), d.get("options"))
+        for key in ("status", "stage", "progress", "created", "started", "finished", "result", "error"):
+            if key in d:
+                setattr(job, key, d[key])
+        return job
+
+
+class RenderJobManager:
+    """
+    Runs final-video renders as background jobs.
+
+    Jobs go to a small dedicated pool (`workers`) with at most `max_queued`
+    waiting, so renders never take threads from the real-time stages; their
+    ffmpeg processes are re-niced and optionally thread-capped. Each job is
+    persisted as JSON under `jobs_dir` on every state change (progress at
+    most once per second), so finished jobs survive restarts; jobs that were
+    in flight when the process stopped are reloaded as failed. A job
+    cancelled before it started never reaches `runner`; its context goes to
+    `discard` instead, so the caller can release what it holds.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: str,
+        runner: Callable[[RenderJob, RenderControl], Dict[str, Any]],
+        workers: int = 1,
+        max_queued: int = 8,
+        nice: int = 10,
+        ffmpeg_threads: int = 0,
+        keep: int = 500,
+        discard: Optional[Callable[[Any], None]] = None,
+    ):
+        self.logger = logging.getLogger("rt_dub")
+        self.dir = Path(jobs_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.runner = runner
+        self.workers = max(1, int(workers))
+        self.max_queued = max(0, int(max_queued))
+        self.nice = int(nice)
+        self.ffmpeg_threads = int(ffmpeg_threads)
+        self.keep = max(1, int(keep))
+        self.discard = discard
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, RenderJob] = {}
+        self._ewma_s = 0.0
+        self._load()
+
+    def _path(self, job_id: str) -> Path:
+        return self.dir / f"{job_id}.json"
+
+    def _persist(self, job: RenderJob) -> None:
+        tmp = self._path(job.id).with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(job.as_dict()), encoding="utf-8")
+            os.replace(tmp, self._path(job.id))
+        except Exception as e:
+            self.logger.warning("render.job.persist_failed job=%s err=%s", job.id, e)
+
+    def _load(self) -> None:
+        for p in sorted(self.dir.glob("*.json")):
+            try:
+                job = RenderJob.from_dict(json.loads(p.read_text(encoding="utf-8")))
+            except Exception as e:
+                self.logger.warning("render.job.load_failed path=%s err=%s", p, e)
+                continue
+            if job.status not in FINISHED:
+                job.status = FAILED
+                job.error = "interrupted by server restart"
+                job.finished = time.time()
+                self._persist(job)
+            self._jobs[job.id] = job
+        self._prune()
+
+    def _prune(self) -> None:
+        finished = sorted((j for j in self._jobs.values() if j.status in FINISHED), key=lambda j: j.finished or j.created)
+        for job in finished[: max(0, len(finished) - self.keep)]:
+            self._jobs.pop(job.id, None)
+            try:
+                self._path(job.id).unlink()
+            except OSError:
+                pass
+
+    def _queued(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status == QUEUED)
+
+    def submit(self, session_id: str, options: Optional[Dict[str, Any]] = None, context: Any = None) -> RenderJob:
+        """Queue a render; `context` stays on the job for the runner and is not persisted."""
+        with self._lock:
+            if self._queued() >= self.max_queued:
+                per_job = self._ewma_s or 30.0
+                raise StageOverloaded("render", round(per_job * (self._queued() + 1) / self.workers, 1))
+            job = RenderJob(uuid.uuid4().hex, session_id, options)
+            self._jobs[job.id] = job
+        job.context = context
+        self._persist(job)
+        self._pool.submit(self._execute, job)
+        self.logger.info("render.job.queued job=%s sid=%s options=%s", job.id, session_id, job.options)
+        return job
+
+    def _execute(self, job: RenderJob) -> None:
+        last_persist = [0.0]
+
+        def on_progress(stage: str, overall: float) -> None:
+            job.stage = stage
+            job.progress = max(job.progress, min(0.99, overall))
+            now = time.monotonic()
+            if now - last_persist[0] >= 1.0:
+                last_persist[0] = now
+                self._persist(job)
+
+        with self._lock:
+            # Same lock as cancel(): a cancel either lands before this (skip) or sees the control
+            skipped = job.status != QUEUED
+            if not skipped:
+                job.control = RenderControl(on_progress, nice=self.nice, threads=self.ffmpeg_threads)
+                job.status = RUNNING
+                job.started = time.time()
+        if skipped:
+            context, job.context = job.context, None
+            if self.discard and context is not None:
+                self.discard(context)
+            return
+        self._persist(job)
+        t0 = time.monotonic()
+        try:
+            job.result = self.runner(job, job.control) or {}
+            job.status = DONE
+            job.progress = 1.0
+            job.stage = "done"
+            elapsed = time.monotonic() - t0
+            self._ewma_s = elapsed if not self._ewma_s else 0.8 * self._ewma_s + 0.2 * elapsed
+        except RenderCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)[:2000]
+            self.logger.exception("render.job.failed job=%s sid=%s err=%s", job.id, job.session_id, e)
+        finally:
+            job.finished = time.time()
+            job.control = None
+            job.context = None
+            self._persist(job)
+            with self._lock:
+                self._prune()
+        self.logger.info("render.job.%s job=%s sid=%s secs=%.1f", job.status, job.id, job.session_id, time.monotonic() - t0)
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, session_id: str = "") -> List[RenderJob]:
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if not session_id or j.session_id == session_id]
+        return sorted(jobs, key=lambda j: j.created)
+
+    def busy_sessions(self) -> Set[str]:
+        """Sessions with a queued or running job (their files must stay)."""
+        with self._lock:
+            return {j.session_id for j in self._jobs.values() if j.status not in FINISHED}
+
+    def cancel(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            queued = job.status == QUEUED
+            if queued:
+                job.status = CANCELLED
+                job.finished = time.time()
+            elif job.control is not None:
+                job.control.cancel()
+        if queued:
+            self._persist(job)
+        self.logger.info("render.job.cancel job=%s", job_id)
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts: Dict[str, int] = {}
+        for j in jobs:
+            counts[j.status] = counts.get(j.status, 0) + 1
+        return {"workers": self.workers, "max_queued": self.max_queued, "avg_s": round(self._ewma_s, 1), "jobs": counts}
+
+    def shutdown(self) -> None:
+        for job in self.list():
+            if job.status == RUNNING and job.control is not None:
+                job.control.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,240 @@
+import bisect
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .render_cache import RENDER_FORMAT, RenderCache, digest
+from .render_ffmpeg import SUBS_STYLE, RenderControl, RenderError, _run
+from .subtitle_builder import write_srt_from_chunks
+from .timeline import SegmentTimeline
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+
+logger = logging.getLogger("rt_dub")
+
+
+def resolve_parts(parts: int) -> int:
+    """RENDER_PARALLEL_PARTS: 0 = auto (half the cores, at most 8), 1 = single encode."""
+    if parts > 0:
+        return parts
+    return max(1, min(8, (os.cpu_count() or 1) // 2))
+
+
+def probe_frames(video_path: str) -> Tuple[int, List[int], List[int]]:
+    """
+    Returns (duration_ms, frame_pts_ms, keyframe_pts_ms) of the first video
+    stream, from ffprobe's packet list (no decoding). Raises RenderError.
+    """
+    cmd = [
+        FFPROBE_BIN, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video_path,
+    ]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise RenderError(f"ffprobe failed: {res.stderr[:300]}")
+    frames: List[int] = []
+    keys: List[int] = []
+    for line in res.stdout.splitlines():
+        pts, _, flags = line.strip().partition(",")
+        try:
+            ms = int(round(float(pts) * 1000))
+        except ValueError:
+            continue
+        frames.append(ms)
+        if "K" in flags:
+            keys.append(ms)
+    frames.sort()
+    keys.sort()
+    # Input -ss is relative to the stream start, which need not be 0
+    origin = frames[0] if frames else 0
+    frames = [f - origin for f in frames]
+    keys = [k - origin for k in keys]
+    cmd = [FFPROBE_BIN, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", video_path]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        duration_ms = int(float(res.stdout.strip()) * 1000)
+    except ValueError:
+        duration_ms = frames[-1] if frames else 0
+    return duration_ms, frames, keys
+
+
+def _nearest(values: List[int], target: int) -> Optional[int]:
+    i = bisect.bisect_left(values, target)
+    best = values[max(0, i - 1): i + 1]
+    return min(best, key=lambda v: abs(v - target)) if best else None
+
+
+def plan_ranges(duration_ms: int, frames: List[int], keys: List[int], parts: int, min_part_ms: int = 10000, snap_ms: int = 2000) -> List[Tuple[int, int]]:
+    """
+    Split [0, duration_ms) into up to `parts` ranges of similar length.
+
+    Each cut is moved to the nearest keyframe within `snap_ms` (cheap seeks,
+    no GOP is split), otherwise to the nearest frame timestamp, so every
+    frame lands in exactly one range. Ranges shorter than `min_part_ms`
+    are not worth a process and reduce the count.
+    """
+    parts = max(1, min(parts, duration_ms // max(1, min_part_ms)))
+    cuts: List[int] = []
+    for k in range(1, parts):
+        target = duration_ms * k // parts
+        cut = _nearest(keys, target)
+        if cut is None or abs(cut - target) > snap_ms:
+            cut = _nearest(frames, target)
+        if cut is not None and 0 < cut < duration_ms and (not cuts or cut > cuts[-1]):
+            cuts.append(cut)
+    bounds = [0, *cuts, duration_ms]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def slice_segments(segments: List[Dict], start_ms: int, end_ms: int) -> List[Dict]:
+    """Segments overlapping [start_ms, end_ms), clipped to it and shifted to start at 0."""
+    if isinstance(segments, SegmentTimeline):
+        # Bisect to the range (200ms of slack for the SRT minimum length) instead of scanning
+        segments = segments.range(start_ms - 200, end_ms)
+    out = []
+    for s in segments:
+        s0 = int(s.get("start_ms", 0))
+        s1 = int(max(s0 + 200, s.get("end_ms", s0 + 800)))  # same minimum as the full SRT
+        if s1 <= start_ms or s0 >= end_ms:
+            continue
+        out.append({
+            **s,
+            "start_ms": max(s0, start_ms) - start_ms,
+            "end_ms": min(s1, end_ms) - start_ms,
+        })
+    return out
+
+
+def _subtitles_filter(srt_path: str) -> str:
+    srt_escaped = srt_path.replace('\\', '\\\\')
+    return f"subtitles='{srt_escaped}':force_style='{SUBS_STYLE}'"
+
+
+def burn_segmented(
+    video_path: str,
+    segments: List[Dict],
+    audio_path: str,
+    audio_codec: List[str],
+    final_path: str,
+    parts: int,
+    use_translated: bool = True,
+    control: Optional[RenderControl] = None,
+    cache: Optional[RenderCache] = None,
+) -> bool:
+    """
+    Burn subtitles with `parts` libx264 processes running side by side.
+
+    The source is cut into keyframe-aligned ranges; each range is decoded
+    from an input seek (frame-accurate, since it is re-encoded), gets its
+    own time-shifted SRT slice and is encoded to a video-only part with a
+    common timescale. The parts are joined with the concat demuxer while
+    the dubbed audio is muxed in, both stream-copied. Returns False when
+    the source cannot be probed or is too short to split; the caller then
+    runs the single-process encode. With a `cache`, each encoded part is
+    keyed by the video, its range and its SRT slice, so a re-render after
+    an edit only re-encodes the ranges whose subtitles changed.
+    """
+    try:
+        duration_ms, frames, keys = probe_frames(video_path)
+    except (RenderError, OSError) as e:
+        logger.warning("render.segmented.probe_failed path=%s err=%s", video_path, e)
+        return False
+    ranges = plan_ranges(duration_ms, frames, keys, parts)
+    if len(ranges) < 2:
+        return False
+    video_hash = cache.file_hash(video_path) if cache is not None else ""
+
+    control = control or RenderControl()
+    threads = control.threads or max(1, (os.cpu_count() or 1) // len(ranges))
+    work_dir = tempfile.mkdtemp(prefix=".parts_", dir=str(Path(final_path).parent))
+    total_ms = max(1, sum(b - a for a, b in ranges))
+    done = [0.0] * len(ranges)
+    lock = threading.Lock()
+    failed = threading.Event()
+    logger.info("render.segmented.start path=%s parts=%d threads=%d", video_path, len(ranges), threads)
+
+    def encode_part(i: int, start_ms: int, end_ms: int) -> str:
+        srt = os.path.join(work_dir, f"part{i:03d}.srt")
+        write_srt_from_chunks(slice_segments(segments, start_ms, end_ms), srt, use_translated=use_translated)
+        out = os.path.join(work_dir, f"part{i:03d}.mp4")
+        part_key = ""
+        if cache is not None:
+            with open(srt, encoding="utf-8") as f:
+                part_key = digest("part", RENDER_FORMAT, video_hash, start_ms, end_ms, i == len(ranges) - 1, SUBS_STYLE, f.read())
+            # Link the hit into work_dir: the concat reads it after every part is done,
+            # by which time a concurrent store may have evicted the cache path
+            if cache.fetch(part_key, ".mp4", out):
+                with lock:
+                    done[i] = end_ms - start_ms
+                return out
+        if failed.is_set():
+            raise RenderError("render part aborted")
+        cmd = [
+            FFMPEG_BIN, '-y',
+            '-ss', f"{start_ms / 1000:.3f}",
+            '-i', video_path,
+            *(['-t', f"{(end_ms - start_ms) / 1000:.3f}"] if i < len(ranges) - 1 else []),
+            '-map', '0:v:0', '-an', '-sn',
+            '-vf', _subtitles_filter(srt),
+            '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '22',
+            '-threads', str(threads),
+            '-video_track_timescale', '90000',
+            out,
+        ]
+
+        def on_fraction(frac: float) -> None:
+            if failed.is_set():
+                # Started after the failing part's kill_running(): stop this one too
+                control.kill_running()
+                return
+            with lock:
+                done[i] = (end_ms - start_ms) * max(0.0, min(1.0, frac))
+                overall = sum(done) / total_ms
+            control.report("encode", 0.9 * overall)
+
+        _run(cmd, control, stage="encode", duration_ms=end_ms - start_ms, on_fraction=on_fraction)
+        if cache is not None:
+            cache.store(part_key, ".mp4", out)
+        return out
+
+    try:
+        outputs: List[Optional[str]] = [None] * len(ranges)
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="render-part") as pool:
+            futures = {pool.submit(encode_part, i, a, b): i for i, (a, b) in enumerate(ranges)}
+            for fut in as_completed(futures):
+                try:
+                    outputs[futures[fut]] = fut.result()
+                except Exception:
+                    # One part failed: stop the others instead of waiting for them
+                    failed.set()
+                    control.kill_running()
+                    raise
+
+        concat_list = os.path.join(work_dir, "parts.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for p in outputs:
+                escaped = os.path.abspath(p).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        cmd = [
+            FFMPEG_BIN, '-y',
+            '-f', 'concat', '-safe', '0', '-i', concat_list,
+            '-i', audio_path,
+            '-map', '0:v:0',
+            '-map', '1:a:0',
+            '-c:v', 'copy',
+            *audio_codec,
+            '-shortest',
+            final_path,
+        ]
+        _run(cmd, control, stage="mux", duration_ms=duration_ms, on_fraction=lambda frac: control.report("mux", 0.9 + 0.1 * frac))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    logger.info("render.segmented.done path=%s parts=%d", final_path, len(ranges))
+    return True
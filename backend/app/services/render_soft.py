@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+from collections import Counter
+from typing import Dict, List, Optional
+
+from .render_ffmpeg import RenderControl, _run
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+
+# Video codecs each container can carry without re-encoding
+MP4_VIDEO = ("h264", "hevc", "vp9", "av1", "mpeg4")
+WEBM_VIDEO = ("vp8", "vp9", "av1")
+WEBM_AUDIO = ("opus", "vorbis")
+
+
+def probe_streams(path: str) -> Dict:
+    """{video_codec, audio_codec, has_audio, duration_ms} from one ffprobe call; empty values when unknown."""
+    cmd = [FFPROBE_BIN, "-v", "error", "-show_entries", "stream=codec_type,codec_name:format=duration", "-of", "json", path]
+    info = {"video_codec": "", "audio_codec": "", "has_audio": False, "duration_ms": 0}
+    try:
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        data = json.loads(res.stdout or "{}")
+    except (OSError, ValueError):
+        return info
+    for st in data.get("streams", []):
+        if st.get("codec_type") == "video" and not info["video_codec"]:
+            info["video_codec"] = st.get("codec_name", "")
+        elif st.get("codec_type") == "audio" and not info["has_audio"]:
+            info["has_audio"] = True
+            info["audio_codec"] = st.get("codec_name", "")
+    try:
+        info["duration_ms"] = int(float(data.get("format", {}).get("duration", 0)) * 1000)
+    except (TypeError, ValueError):
+        pass
+    return info
+
+
+def pick_container(video_codec: str, requested: str = "auto", audio_codec: str = "") -> str:
+    """
+    mp4 (fragmented, mov_text subtitles) or webm (WebVTT subtitles) that can
+    stream-copy `video_codec`. VP8/VP9 sources, and AV1 with Opus/Vorbis
+    audio, stay WebM (what browsers record); fMP4 is for H.264/HEVC with
+    AAC. A requested container that cannot carry the video is ignored.
+    """
+    fits = {"mp4": video_codec in MP4_VIDEO, "webm": video_codec in WEBM_VIDEO}
+    if requested in fits and (fits[requested] or not video_codec):
+        return requested
+    if video_codec in ("vp8", "vp9") or (video_codec == "av1" and audio_codec in WEBM_AUDIO):
+        return "webm"
+    return "mp4"
+
+
+def dominant(segments: List[Dict], key: str, default: str = "") -> str:
+    """Most common value of `key` across segments (e.g. the session's target language)."""
+    counts = Counter(s.get(key) for s in segments if s.get(key))
+    return counts.most_common(1)[0][0] if counts else default
+
+
+def soft_mux(
+    video_path: str,
+    dubbed_audio_path: str,
+    dubbed_is_adts: bool,
+    subtitle_tracks: List[Dict],
+    final_path: str,
+    container: str,
+    target_lang: str = "",
+    source_lang: str = "",
+    original_audio: bool = False,
+    duration_ms: int = 0,
+    control: Optional[RenderControl] = None,
+) -> None:
+    """
+    Remux without touching the video: the source video is stream-copied,
+    the dubbed track becomes the default audio stream and each entry of
+    `subtitle_tracks` ({path, lang, title}; the first is the default) a
+    selectable subtitle stream. With `original_audio` the source audio is
+    kept as a second, non-default track. MP4 output is fragmented
+    (empty moov, a fragment per keyframe) so players can start before the
+    file is complete; WebM carries WebVTT subtitles and Opus audio.
+    """
+    mp4 = container == "mp4"
+    cmd = [FFMPEG_BIN, '-y', '-i', video_path, '-i', dubbed_audio_path]
+    for track in subtitle_tracks:
+        cmd += ['-i', track["path"]]
+    cmd += ['-map', '0:v:0', '-map', '1:a:0']
+    if original_audio:
+        cmd += ['-map', '0:a:0?']
+    for i in range(len(subtitle_tracks)):
+        cmd += ['-map', f'{i + 2}:s:0']
+
+    cmd += ['-c:v', 'copy']
+    if mp4:
+        cmd += ['-c:a:0', 'copy']
+        if dubbed_is_adts:
+            cmd += ['-bsf:a:0', 'aac_adtstoasc']
+        if original_audio:
+            cmd += ['-c:a:1', 'aac', '-b:a:1', '128k']
+        cmd += ['-c:s', 'mov_text']
+    else:
+        # Audio transcodes are cheap next to video; WebM only takes Opus/Vorbis
+        cmd += ['-c:a', 'libopus', '-b:a', '96k', '-c:s', 'webvtt']
+
+    cmd += ['-metadata:s:a:0', f'title=Dubbed ({target_lang})' if target_lang else 'title=Dubbed', '-disposition:a:0', 'default']
+    if target_lang:
+        cmd += ['-metadata:s:a:0', f'language={target_lang}']
+    if original_audio:
+        cmd += ['-metadata:s:a:1', 'title=Original', '-disposition:a:1', '0']
+        if source_lang:
+            cmd += ['-metadata:s:a:1', f'language={source_lang}']
+    for i, track in enumerate(subtitle_tracks):
+        cmd += [f'-metadata:s:s:{i}', f'title={track["title"]}', f'-disposition:s:{i}', 'default' if i == 0 else '0']
+        if track.get("lang"):
+            cmd += [f'-metadata:s:s:{i}', f'language={track["lang"]}']
+
+    if mp4:
+        cmd += ['-movflags', '+frag_keyframe+empty_moov+default_base_moof']
+    # -shortest would also stop at the last subtitle cue, so trim to the known length instead
+    cmd += ['-t', f'{duration_ms / 1000:.3f}'] if duration_ms > 0 else ['-shortest']
+    cmd.append(final_path)
+    _run(cmd, control, stage="mux", duration_ms=duration_ms)
@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict
+
+
+class StageOverloaded(Exception):
+    """Raised when a stage's queue is full; carries a retry hint in seconds."""
+
+    def __init__(self, stage: str, retry_after: float):
+        super().__init__(f"stage '{stage}' is overloaded, retry after {retry_after:.1f}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class Stage:
+    """
+    One pipeline stage backed by an executor.
+
+    At most `max_concurrency` calls run at once; up to `max_queue` more may
+    wait for a slot. Beyond that `run` raises StageOverloaded immediately so
+    callers can shed load instead of piling up on the event loop.
+    """
+
+    def __init__(self, name: str, executor: Executor, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.executor = executor
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+        self._running = 0
+        self._ewma_s = 0.0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def retry_after(self) -> float:
+        # Time until the current backlog drains, based on observed service time
+        per_call = self._ewma_s or 1.0
+        backlog = self._waiting + self._running + 1
+        return round(max(0.5, per_call * backlog / self.max_concurrency), 1)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, reject: bool = True, **kwargs: Any) -> Any:
+        """Run `fn(*args, **kwargs)` on the stage executor. With reject=False the caller waits instead of failing fast."""
+        if reject and self._running >= self.max_concurrency and self._waiting >= self.max_queue:
+            self.rejected += 1
+            raise StageOverloaded(self.name, self.retry_after())
+        self._waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self._waiting -= 1
+        self._running += 1
+        t0 = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - t0
+            self._ewma_s = elapsed if not self._ewma_s else 0.8 * self._ewma_s + 0.2 * elapsed
+            self.completed += 1
+            self._running -= 1
+            self._sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "queued": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "avg_ms": int(self._ewma_s * 1000),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+
+class Scheduler:
+    """Named stages sharing the event loop; blocking work never runs on it directly."""
+
+    def __init__(self):
+        self.logger = logging.getLogger("rt_dub")
+        self.stages: Dict[str, Stage] = {}
+        self._executors = []
+
+    def add_stage(self, name: str, executor: Executor, max_concurrency: int, max_queue: int) -> Stage:
+        stage = Stage(name, executor, max_concurrency, max_queue)
+        self.stages[name] = stage
+        if executor not in self._executors:
+            self._executors.append(executor)
+        self.logger.info(
+            "scheduler.stage name=%s executor=%s concurrency=%d queue=%d",
+            name, type(executor).__name__, stage.max_concurrency, stage.max_queue,
+        )
+        return stage
+
+    async def run(self, stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.stages[stage].run(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: st.stats() for name, st in self.stages.items()}
+
+    def shutdown(self) -> None:
+        for ex in self._executors:
+            try:
+                ex.shutdown(wait=False, cancel_futures=True)
+            except Exception:
+                pass
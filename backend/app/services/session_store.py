@@ -0,0 +1,625 @@
+import json
+import logging
+import select
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from .timeline import SegmentTimeline
+
+# Session fields besides the segment list; video_path is the only one callers update
+FIELDS = ("created", "last_seen", "timeline_ms", "chunks", "video_path", "node")
+
+
+class SessionStoreError(Exception):
+    pass
+
+
+class MemorySessionStore:
+    """
+    Process-local sessions (single worker). Same interface as the shared
+    stores: every mutation is atomic and refreshes the idle clock, and
+    `expire()` drops sessions idle longer than `ttl` seconds.
+
+    Segments are kept in a SegmentTimeline per session. With `journal_dir`
+    each timeline journals to <journal_dir>/<session_id>.jsonl, and sessions
+    found there are restored at startup.
+    """
+
+    blocking = False  # calls are cheap enough for the event loop
+
+    def __init__(self, ttl: float = 3600.0, journal_dir: str = ""):
+        self.logger = logging.getLogger("rt_dub")
+        self.ttl = float(ttl)
+        self.journal_dir = Path(journal_dir) if journal_dir else None
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self.expired = 0
+        if self.journal_dir:
+            self._restore()
+
+    def _restore(self) -> None:
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        for p in self.journal_dir.glob("*.jsonl"):
+            try:
+                timeline = SegmentTimeline.load(str(p))
+                seen = p.stat().st_mtime
+            except OSError as e:
+                self.logger.warning("session.restore_failed path=%s err=%s", p, e)
+                continue
+            meta = timeline.meta
+            self._sessions[p.stem] = {
+                "created": meta.get("created", seen),
+                "last_seen": seen,
+                "timeline_ms": max(int(meta.get("timeline_ms", 0)), timeline.end_ms),
+                "chunks": int(meta.get("chunks", 0)),
+                "video_path": meta.get("video_path", ""),
+                "node": meta.get("node", ""),
+                "segments": timeline,
+            }
+        if self._sessions:
+            self.logger.info("session.restored count=%d dir=%s", len(self._sessions), self.journal_dir)
+
+    def create(self, session_id: str, node: str = "") -> Dict[str, Any]:
+        now = time.time()
+        journal = str(self.journal_dir / f"{session_id}.jsonl") if self.journal_dir else None
+        sess = {"created": now, "last_seen": now, "timeline_ms": 0, "chunks": 0, "video_path": "", "node": node, "segments": SegmentTimeline(journal)}
+        sess["segments"].set_meta(created=now, node=node)
+        with self._lock:
+            old = self._sessions.get(session_id)
+            self._sessions[session_id] = sess
+        if old is not None:
+            old["segments"].close()
+        return self._view(sess, False)
+
+    @staticmethod
+    def _view(sess: Dict[str, Any], with_segments: bool) -> Dict[str, Any]:
+        out = {k: sess[k] for k in FIELDS}
+        out["segment_count"] = len(sess["segments"])
+        if with_segments:
+            out["segments"] = sess["segments"].snapshot()
+        return out
+
+    def touch(self, session_id: str) -> Optional[str]:
+        """Refresh the idle clock; returns the owning node ("" if unset) or None if unknown."""
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            if sess is None:
+                return None
+            sess["last_seen"] = time.time()
+            return sess["node"]
+
+    def get(self, session_id: str, with_segments: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            return self._view(sess, with_segments) if sess is not None else None
+
+    def advance_timeline(self, session_id: str, add_ms: int) -> Optional[int]:
+        """Reserve `add_ms` on the session timeline; returns the reserved slot's start."""
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            if sess is None:
+                return None
+            start = sess["timeline_ms"]
+            sess["timeline_ms"] = start + int(add_ms)
+            sess["last_seen"] = time.time()
+            return start
+
+    def record_chunk(self, session_id: str, segment: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """Count a finished chunk and append its segment (if any); returns the chunk count."""
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            if sess is None:
+                return None
+            timeline = sess["segments"]
+            if segment is not None:
+                timeline.append(segment)
+            sess["chunks"] += 1
+            sess["last_seen"] = time.time()
+            timeline.set_meta(chunks=sess["chunks"], timeline_ms=sess["timeline_ms"])
+            return sess["chunks"]
+
+    def segments(self, session_id: str, start_ms: int = 0, end_ms: int = 2 ** 62) -> Optional[List[Dict[str, Any]]]:
+        """Segments overlapping [start_ms, end_ms) (bisected, no full scan)."""
+        with self._lock:
+            sess = self._sessions.get(session_id)
+        return sess["segments"].range(start_ms, end_ms) if sess is not None else None
+
+    def update(self, session_id: str, **fields: Any) -> bool:
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            if sess is None:
+                return False
+            fields = {k: v for k, v in fields.items() if k in FIELDS}
+            sess.update(fields)
+            sess["last_seen"] = time.time()
+            sess["segments"].set_meta(**fields)
+            return True
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            sess = self._sessions.pop(session_id, None)
+        if sess is None:
+            return False
+        sess["segments"].close(delete=True)
+        return True
+
+    def expire(self) -> List[str]:
+        """Drop sessions idle longer than the TTL; returns their ids."""
+        if self.ttl <= 0:
+            return []
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            gone = [sid for sid, s in self._sessions.items() if s["last_seen"] < cutoff]
+            dropped = [self._sessions.pop(sid) for sid in gone]
+        for sess in dropped:
+            sess["segments"].close(delete=True)
+        self.expired += len(gone)
+        return gone
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            timelines = [s["segments"].stats() for s in self._sessions.values()]
+        return {
+            "backend": "memory",
+            "sessions": len(timelines),
+            "ttl_s": self.ttl,
+            "expired": self.expired,
+            "journal": str(self.journal_dir) if self.journal_dir else "",
+            "segments": sum(t["segments"] for t in timelines),
+            "segment_bytes": sum(t["column_bytes"] + t["string_bytes"] for t in timelines),
+        }
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a SQLite database in WAL mode, shared by every worker
+    process on the host (or on a shared disk). Timeline reservations run in
+    BEGIN IMMEDIATE transactions, so concurrent workers never hand out
+    overlapping slots; segments are rows in their own table, so appending
+    one does not rewrite the session.
+    """
+
+    blocking = True
+
+    def __init__(self, db_path: str, ttl: float = 3600.0):
+        self.logger = logging.getLogger("rt_dub")
+        self.ttl = float(ttl)
+        self.expired = 0
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                created REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                timeline_ms INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                video_path TEXT NOT NULL DEFAULT '',
+                node TEXT NOT NULL DEFAULT ''
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS segments (
+                session_id TEXT NOT NULL,
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                start_ms INTEGER NOT NULL DEFAULT 0,
+                end_ms INTEGER NOT NULL DEFAULT 0,
+                data TEXT NOT NULL
+            )"""
+        )
+        cols = {r[1] for r in self._db.execute("PRAGMA table_info(segments)")}
+        for col in ("start_ms", "end_ms"):
+            if col not in cols:
+                self._db.execute(f"ALTER TABLE segments ADD COLUMN {col} INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_sessions_seen ON sessions(last_seen)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_segments_session ON segments(session_id, seq)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_segments_start ON segments(session_id, start_ms)")
+
+    def _tx(self, fn):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn()
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return out
+
+    def create(self, session_id: str, node: str = "") -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sessions (id, created, last_seen, node) VALUES (?, ?, ?, ?)", (session_id, now, now, node))
+        return {"created": now, "last_seen": now, "timeline_ms": 0, "chunks": 0, "video_path": "", "node": node, "segment_count": 0}
+
+    def touch(self, session_id: str) -> Optional[str]:
+        def run():
+            if not self._db.execute("UPDATE sessions SET last_seen=? WHERE id=?", (time.time(), session_id)).rowcount:
+                return None
+            return self._db.execute("SELECT node FROM sessions WHERE id=?", (session_id,)).fetchone()[0]
+        return self._tx(run)
+
+    def get(self, session_id: str, with_segments: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(FIELDS)} FROM sessions WHERE id=?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            out = dict(zip(FIELDS, row))
+            if with_segments:
+                rows = self._db.execute("SELECT data FROM segments WHERE session_id=? ORDER BY start_ms, seq", (session_id,)).fetchall()
+                timeline = SegmentTimeline()
+                for r in rows:
+                    timeline.append(json.loads(r[0]))
+                out["segments"] = timeline
+                out["segment_count"] = len(rows)
+            else:
+                out["segment_count"] = self._db.execute("SELECT COUNT(*) FROM segments WHERE session_id=?", (session_id,)).fetchone()[0]
+        return out
+
+    def advance_timeline(self, session_id: str, add_ms: int) -> Optional[int]:
+        def run():
+            cur = self._db.execute(
+                "UPDATE sessions SET timeline_ms = timeline_ms + ?, last_seen=? WHERE id=?",
+                (int(add_ms), time.time(), session_id),
+            )
+            if not cur.rowcount:
+                return None
+            return self._db.execute("SELECT timeline_ms FROM sessions WHERE id=?", (session_id,)).fetchone()[0] - int(add_ms)
+        return self._tx(run)
+
+    def record_chunk(self, session_id: str, segment: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        def run():
+            cur = self._db.execute("UPDATE sessions SET chunks = chunks + 1, last_seen=? WHERE id=?", (time.time(), session_id))
+            if not cur.rowcount:
+                return None
+            if segment is not None:
+                self._db.execute(
+                    "INSERT INTO segments (session_id, start_ms, end_ms, data) VALUES (?, ?, ?, ?)",
+                    (session_id, int(segment.get("start_ms", 0)), int(segment.get("end_ms", 0)), json.dumps(segment)),
+                )
+            return self._db.execute("SELECT chunks FROM sessions WHERE id=?", (session_id,)).fetchone()[0]
+        return self._tx(run)
+
+    def segments(self, session_id: str, start_ms: int = 0, end_ms: int = 2 ** 62) -> Optional[List[Dict[str, Any]]]:
+        """Segments overlapping [start_ms, end_ms), via the (session_id, start_ms) index."""
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM sessions WHERE id=?", (session_id,)).fetchone() is None:
+                return None
+            (max_len,) = self._db.execute("SELECT COALESCE(MAX(end_ms - start_ms), 0) FROM segments WHERE session_id=?", (session_id,)).fetchone()
+            rows = self._db.execute(
+                "SELECT data FROM segments WHERE session_id=? AND start_ms >= ? AND start_ms < ? AND end_ms > ? ORDER BY start_ms, seq",
+                (session_id, start_ms - max_len, end_ms, start_ms),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def update(self, session_id: str, **fields: Any) -> bool:
+        fields = {k: v for k, v in fields.items() if k in FIELDS}
+        if not fields:
+            return False
+        sets = ", ".join(f"{k}=?" for k in fields)
+        with self._lock:
+            cur = self._db.execute(
+                f"UPDATE sessions SET {sets}, last_seen=? WHERE id=?",
+                (*fields.values(), time.time(), session_id),
+            )
+        return bool(cur.rowcount)
+
+    def delete(self, session_id: str) -> bool:
+        def run():
+            self._db.execute("DELETE FROM segments WHERE session_id=?", (session_id,))
+            return bool(self._db.execute("DELETE FROM sessions WHERE id=?", (session_id,)).rowcount)
+        return self._tx(run)
+
+    def expire(self) -> List[str]:
+        if self.ttl <= 0:
+            return []
+        cutoff = time.time() - self.ttl
+
+        def run():
+            gone = [r[0] for r in self._db.execute("SELECT id FROM sessions WHERE last_seen < ?", (cutoff,)).fetchall()]
+            for sid in gone:
+                self._db.execute("DELETE FROM segments WHERE session_id=?", (sid,))
+                self._db.execute("DELETE FROM sessions WHERE id=?", (sid,))
+            return gone
+        gone = self._tx(run)
+        self.expired += len(gone)
+        return gone
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "sqlite", "sessions": self.count(), "ttl_s": self.ttl, "expired": self.expired}
+
+
+class _Resp:
+    """Minimal Redis protocol (RESP2) client: one socket per thread, pipelined commands."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        u = urlparse(url)
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.password = u.password or ""
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @staticmethod
+    def _closed_by_peer(sock) -> bool:
+        """An idle connection should have nothing to read; EOF (or an error) means the server dropped it."""
+        try:
+            if not select.select([sock], [], [], 0)[0]:
+                return False
+            return not sock.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._closed_by_peer(conn[0]):
+            self.close()
+            conn = None
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = (sock, sock.makefile("rb"))
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            if setup:
+                try:
+                    self._send(conn, setup)
+                except Exception:
+                    sock.close()
+                    raise
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+        return b"".join(out)
+
+    def _read(self, f):
+        line = f.readline()
+        if not line:
+            raise ConnectionError("redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return SessionStoreError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = f.read(n + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read(f) for _ in range(n)]
+        raise SessionStoreError(f"bad reply {line[:40]!r}")
+
+    def _send(self, conn, commands):
+        sock, f = conn
+        sock.sendall(b"".join(self._encode(c) for c in commands))
+        return self._replies(f, commands)
+
+    def _replies(self, f, commands):
+        replies = [self._read(f) for _ in commands]
+        for r in replies:
+            if isinstance(r, SessionStoreError):
+                raise r
+        return replies
+
+    def pipeline(self, *commands, retry: bool = True):
+        """
+        Send commands in one round trip; reconnects once on a dropped
+        connection. With retry=False (non-idempotent writes) the commands are
+        resent only if the send itself failed: once they are on the wire the
+        server may have applied them, so a connection lost while waiting for
+        the replies raises instead of applying them twice.
+        """
+        for attempt in (0, 1):
+            sent = False
+            try:
+                sock, f = self._conn()
+                sock.sendall(b"".join(self._encode(c) for c in commands))
+                sent = True
+                return self._replies(f, commands)
+            except (OSError, ConnectionError):
+                self.close()
+                if attempt or (sent and not retry):
+                    raise
+
+    def call(self, *args, retry: bool = True):
+        return self.pipeline(args, retry=retry)[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[0].close()
+            except OSError:
+                pass
+
+
+# Runs the commands packed in ARGV (each as its argument count, then the
+# arguments) only while KEYS[1] exists; a script runs alone on the server, so
+# a session cannot expire between the check and the writes.
+IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return false end
+local out, i = {}, 1
+while i <= #ARGV do
+  local n = tonumber(ARGV[i])
+  out[#out + 1] = redis.call(unpack(ARGV, i + 1, i + n))
+  i = i + n + 1
+end
+return out
+"""
+
+
+class RedisSessionStore:
+    """
+    Sessions in Redis (or anything speaking its protocol), shared across
+    nodes. Each session is a hash plus a list of JSON segments, both with an
+    idle TTL that every mutation refreshes, so abandoned sessions free
+    themselves. Mutations of an existing session run as one Lua script
+    (IF_EXISTS_SCRIPT), so a write racing the TTL never recreates a hash or
+    segment list without one. Timeline reservations use HINCRBY inside it;
+    like chunk appends they are not idempotent, so they are never resent once
+    they reached the server (a lost reply surfaces as an error instead).
+    A sorted set of last-seen times backs `count()` and `expire()`.
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, ttl: float = 3600.0, prefix: str = "rtdub:"):
+        self.ttl = float(ttl)
+        self.prefix = prefix
+        self.expired = 0
+        self._r = _Resp(url)
+        self._index = f"{prefix}sessions"
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}s:{session_id}"
+
+    def _refresh(self, session_id: str) -> List[tuple]:
+        key = self._key(session_id)
+        cmds = [("ZADD", self._index, f"{time.time():.3f}", session_id)]
+        if self.ttl > 0:
+            ttl = int(self.ttl) + 1
+            cmds += [("EXPIRE", key, ttl), ("EXPIRE", f"{key}:segs", ttl)]
+        return cmds
+
+    def create(self, session_id: str, node: str = "") -> Dict[str, Any]:
+        now = time.time()
+        sess = {"created": now, "last_seen": now, "timeline_ms": 0, "chunks": 0, "video_path": "", "node": node}
+        key = self._key(session_id)
+        flat = [x for kv in sess.items() for x in kv]
+        self._r.pipeline(("DEL", key, f"{key}:segs"), ("HSET", key, *flat), *self._refresh(session_id))
+        return {**sess, "segment_count": 0}
+
+    def _if_exists(self, session_id: str, *commands: tuple, retry: bool = True) -> Optional[List[Any]]:
+        """
+        Replies to `commands` (then the TTL refresh), or None without running
+        them when the session is gone. Pass retry=False when the commands are
+        not idempotent (HINCRBY, RPUSH).
+        """
+        argv: List[Any] = []
+        for cmd in (*commands, *self._refresh(session_id)):
+            argv += [len(cmd), *cmd]
+        return self._r.call("EVAL", IF_EXISTS_SCRIPT, 1, self._key(session_id), *argv, retry=retry)
+
+    def touch(self, session_id: str) -> Optional[str]:
+        key = self._key(session_id)
+        replies = self._if_exists(session_id, ("HGET", key, "node"), ("HSET", key, "last_seen", time.time()))
+        return None if replies is None else replies[0] or ""
+
+    def get(self, session_id: str, with_segments: bool = False) -> Optional[Dict[str, Any]]:
+        key = self._key(session_id)
+        segs = ("LRANGE", f"{key}:segs", 0, -1) if with_segments else ("LLEN", f"{key}:segs")
+        raw, seg_reply = self._r.pipeline(("HGETALL", key), segs)
+        if not raw:
+            return None
+        h = dict(zip(raw[0::2], raw[1::2]))
+        out: Dict[str, Any] = {
+            "created": float(h.get("created", 0)),
+            "last_seen": float(h.get("last_seen", 0)),
+            "timeline_ms": int(h.get("timeline_ms", 0)),
+            "chunks": int(h.get("chunks", 0)),
+            "video_path": h.get("video_path", ""),
+            "node": h.get("node", ""),
+        }
+        if with_segments:
+            timeline = SegmentTimeline()
+            for s in seg_reply or []:
+                timeline.append(json.loads(s))
+            out["segments"] = timeline
+            out["segment_count"] = len(timeline)
+        else:
+            out["segment_count"] = int(seg_reply or 0)
+        return out
+
+    def advance_timeline(self, session_id: str, add_ms: int) -> Optional[int]:
+        key = self._key(session_id)
+        replies = self._if_exists(session_id, ("HINCRBY", key, "timeline_ms", int(add_ms)), ("HSET", key, "last_seen", time.time()), retry=False)
+        return None if replies is None else int(replies[0]) - int(add_ms)
+
+    def record_chunk(self, session_id: str, segment: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        key = self._key(session_id)
+        cmds = [("HINCRBY", key, "chunks", 1), ("HSET", key, "last_seen", time.time())]
+        if segment is not None:
+            cmds.append(("RPUSH", f"{key}:segs", json.dumps(segment)))
+        replies = self._if_exists(session_id, *cmds, retry=False)
+        return None if replies is None else int(replies[0])
+
+    def segments(self, session_id: str, start_ms: int = 0, end_ms: int = 2 ** 62) -> Optional[List[Dict[str, Any]]]:
+        """Segments overlapping [start_ms, end_ms); the list is filtered client-side."""
+        session = self.get(session_id, with_segments=True)
+        return session["segments"].range(start_ms, end_ms) if session is not None else None
+
+    def update(self, session_id: str, **fields: Any) -> bool:
+        fields = {k: v for k, v in fields.items() if k in FIELDS}
+        if not fields:
+            return False
+        flat = [x for kv in fields.items() for x in kv]
+        return self._if_exists(session_id, ("HSET", self._key(session_id), *flat, "last_seen", time.time())) is not None
+
+    def delete(self, session_id: str) -> bool:
+        key = self._key(session_id)
+        deleted, _ = self._r.pipeline(("DEL", key, f"{key}:segs"), ("ZREM", self._index, session_id))
+        return bool(deleted)
+
+    def expire(self) -> List[str]:
+        """Ids whose keys Redis has expired (or will shortly); only the index needs cleaning."""
+        if self.ttl <= 0:
+            return []
+        cutoff = f"{time.time() - self.ttl:.3f}"
+        gone = self._r.call("ZRANGEBYSCORE", self._index, "-inf", cutoff) or []
+        if gone:
+            self._r.pipeline(("ZREM", self._index, *gone), *[("DEL", self._key(s), f"{self._key(s)}:segs") for s in gone])
+        self.expired += len(gone)
+        return gone
+
+    def count(self) -> int:
+        lo = f"{time.time() - self.ttl:.3f}" if self.ttl > 0 else "-inf"
+        return int(self._r.call("ZCOUNT", self._index, lo, "+inf"))
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            sessions: Any = self.count()
+        except (OSError, ConnectionError, SessionStoreError) as e:
+            sessions = f"unavailable: {e}"
+        return {"backend": "redis", "sessions": sessions, "ttl_s": self.ttl, "expired": self.expired}
+
+
+def make_session_store(kind: str, ttl: float, path: str = "", url: str = "", journal_dir: str = ""):
+    """SESSION_STORE: memory (journaled to SESSION_JOURNAL_DIR) | sqlite (SESSION_STORE_PATH) | redis (SESSION_STORE_URL)."""
+    kind = (kind or "memory").lower()
+    if kind == "sqlite":
+        return SQLiteSessionStore(path, ttl=ttl)
+    if kind == "redis":
+        return RedisSessionStore(url, ttl=ttl)
+    return MemorySessionStore(ttl=ttl, journal_dir=journal_dir)
@@ -0,0 +1,333 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# Artifact classes; inputs (audio, upload) are never removed while their session is live
+AUDIO, UPLOAD, RENDER = "audio", "upload", "render"
+CLASSES = (AUDIO, UPLOAD, RENDER)
+
+# Files render_final_video writes next to the upload (all rebuildable from the session)
+RENDER_SUFFIXES = ("_subs.srt", "_subs_orig.srt", "_dubbed.m4a", "_dubbed.aac", "_final.mp4", "_final.webm")
+# The live dub track (with its part and render snapshot files) is an input to renders while the session runs
+LIVE_TRACK_MARK = "_dub_live."
+
+# Files touched this recently may still be written to
+WRITE_GRACE_S = 60.0
+
+
+class StorageJanitor:
+    """
+    Keeps session artifacts under STORAGE_AUDIO / STORAGE_VIDEO bounded.
+
+    Files are laid out per session as <root>/<sid[:2]>/<sid>/<sid>_<name>
+    (with `sharded`), so no directory grows with traffic and a session's
+    files are one listing; flat files from older layouts are attributed by
+    their "<sid>_" prefix. A background sweep (every `interval` seconds)
+    applies, in order:
+
+    - inputs (chunk clips, live dub track, upload) of sessions that are no
+      longer live once older than their class retention; stopped sessions
+      have theirs removed right away (`end_session`),
+    - render outputs older than the render retention,
+    - per-session quota: a session over `session_max_bytes` loses its
+      oldest render outputs and is refused new writes (`over_quota`),
+    - global quota: the oldest removable files go first until the total is
+      under `max_bytes`; inputs of live sessions are never picked.
+
+    Nothing of a session is deleted while it holds a lease (`lease`, taken
+    around render submission) or `busy()` reports it (queued or running
+    render jobs). Deletion happens under the janitor lock, so a lease taken
+    afterwards sees the files gone rather than half removed. Hard-linked
+    files (cache entries) count their size divided by the link count.
+    """
+
+    def __init__(
+        self,
+        audio_root: str,
+        video_root: str,
+        is_live: Callable[[str], bool],
+        busy: Optional[Callable[[], Set[str]]] = None,
+        sharded: bool = True,
+        max_bytes: int = 0,
+        session_max_bytes: int = 0,
+        retention_s: Optional[Dict[str, float]] = None,
+        interval: float = 60.0,
+    ):
+        self.logger = logging.getLogger("rt_dub")
+        self.audio_root = Path(audio_root)
+        self.video_root = Path(video_root)
+        self.is_live = is_live
+        self.busy = busy or (lambda: set())
+        self.sharded = sharded
+        self.max_bytes = int(max_bytes)
+        self.session_max_bytes = int(session_max_bytes)
+        self.retention_s = {AUDIO: 6 * 3600.0, UPLOAD: 6 * 3600.0, RENDER: 48 * 3600.0, **(retention_s or {})}
+        self.interval = float(interval)
+        self._lock = threading.Lock()
+        self._leases: Dict[str, int] = {}
+        self._session_bytes: Dict[str, int] = {}
+        self._usage: Dict[str, Any] = {"files": 0, "bytes": 0, "classes": {}, "swept_at": None, "sweep_ms": 0}
+        self.counters: Dict[str, int] = {"deleted_files": 0, "deleted_bytes": 0, "sweeps": 0, "quota_refusals": 0}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # Layout -----------------------------------------------------------------
+
+    def session_dir(self, root: str, session_id: str) -> Path:
+        """Directory for one session's files under `root`."""
+        if session_id and (Path(session_id).name != session_id or session_id.startswith(".")):
+            raise ValueError(f"invalid session id {session_id!r}")
+        d = Path(root) / session_id[:2] / session_id if self.sharded and session_id else Path(root)
+        d.mkdir(parents=True, exist_ok=True)
+        return d
+
+    def path(self, root: str, session_id: str, name: str) -> Path:
+        """<session dir>/<sid>_<name>; the prefix keeps render_final_video's session naming."""
+        return self.session_dir(root, session_id) / f"{session_id}_{name}"
+
+    @staticmethod
+    def classify(root_is_audio: bool, name: str) -> str:
+        if root_is_audio or LIVE_TRACK_MARK in name:
+            return AUDIO
+        if name.endswith(RENDER_SUFFIXES):
+            return RENDER
+        return UPLOAD
+
+    def _scan(self) -> Iterator[Tuple[str, str, str, float, int]]:
+        """Yields (session_id, class, path, mtime, bytes) for every artifact, both layouts."""
+        for root, is_audio in ((self.audio_root, True), (self.video_root, False)):
+            stack = [(root, 0)]
+            while stack:
+                d, depth = stack.pop()
+                try:
+                    entries = list(os.scandir(d))
+                except OSError:
+                    continue
+                for e in entries:
+                    if e.name.startswith("."):
+                        continue  # in-progress work dirs and temp files
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            if depth < 2:
+                                stack.append((e.path, depth + 1))
+                            continue
+                        st = e.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    sid = e.name.split("_", 1)[0]
+                    yield sid, self.classify(is_audio, e.name), e.path, st.st_mtime, st.st_size // max(1, st.st_nlink)
+
+    # Leases -----------------------------------------------------------------
+
+    @contextmanager
+    def lease(self, session_id: str):
+        """Keep a session's files while the block runs (e.g. checking inputs and queueing a render)."""
+        with self._lock:
+            self._leases[session_id] = self._leases.get(session_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                n = self._leases.get(session_id, 1) - 1
+                if n > 0:
+                    self._leases[session_id] = n
+                else:
+                    self._leases.pop(session_id, None)
+
+    def _held(self) -> Set[str]:
+        return set(self._leases) | set(self.busy())
+
+    # Writes -----------------------------------------------------------------
+
+    def record(self, session_id: str, nbytes: int) -> None:
+        """Account a new file between sweeps."""
+        with self._lock:
+            self._session_bytes[session_id] = self._session_bytes.get(session_id, 0) + int(nbytes)
+
+    def over_quota(self, session_id: str) -> bool:
+        if self.session_max_bytes <= 0:
+            return False
+        with self._lock:
+            over = self._session_bytes.get(session_id, 0) > self.session_max_bytes
+            if over:
+                self.counters["quota_refusals"] += 1
+        return over
+
+    # Deletion ---------------------------------------------------------------
+
+    def _delete(self, files: List[Tuple[str, str, str, float, int]], held: Set[str], reason: str) -> int:
+        """Remove files whose session is not held; caller holds the lock. Returns bytes freed."""
+        freed = 0
+        for sid, _, path, _, size in files:
+            if sid in held:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning("storage.delete_failed path=%s err=%s", path, e)
+                continue
+            freed += size
+            self._session_bytes[sid] = max(0, self._session_bytes.get(sid, 0) - size)
+            self.counters["deleted_files"] += 1
+            self.counters["deleted_bytes"] += size
+            try:
+                os.rmdir(os.path.dirname(path))  # empty session dir
+            except OSError:
+                pass
+        if freed:
+            self.logger.info("storage.deleted reason=%s bytes=%d", reason, freed)
+        return freed
+
+    def end_session(self, session_id: str) -> None:
+        """Session stopped or expired: drop its inputs now unless a render still needs them."""
+        if not session_id:
+            return
+        files = [f for f in self._session_files(session_id) if f[1] != RENDER]
+        with self._lock:
+            self._delete(files, self._held(), "session_end")
+
+    def _session_files(self, session_id: str) -> List[Tuple[str, str, str, float, int]]:
+        out = []
+        dirs = [(self.audio_root, True), (self.video_root, False)]
+        for root, is_audio in dirs:
+            for d in {Path(root) / session_id[:2] / session_id, Path(root)} if self.sharded else {Path(root)}:
+                try:
+                    entries = list(os.scandir(d))
+                except OSError:
+                    continue
+                for e in entries:
+                    if not e.name.startswith(f"{session_id}_"):
+                        continue
+                    try:
+                        if not e.is_file(follow_symlinks=False):
+                            continue
+                        st = e.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    out.append((session_id, self.classify(is_audio, e.name), e.path, st.st_mtime, st.st_size // max(1, st.st_nlink)))
+        return out
+
+    # Sweep ------------------------------------------------------------------
+
+    def sweep(self) -> Dict[str, Any]:
+        t0 = time.monotonic()
+        now = time.time()
+        files = sorted(self._scan(), key=lambda f: f[3])  # oldest first
+        live: Dict[str, bool] = {}
+        for sid in {f[0] for f in files}:
+            try:
+                live[sid] = bool(self.is_live(sid))
+            except Exception as e:
+                # Unknown means keep: never delete inputs on a store error
+                self.logger.warning("storage.live_check_failed sid=%s err=%s", sid, e)
+                live[sid] = True
+
+        with self._lock:
+            held = self._held()
+            fresh = now - WRITE_GRACE_S
+            gone: Set[str] = set()
+
+            # 1) Retention per class (inputs only once the session is gone)
+            expired = [
+                f for f in files
+                if f[3] < min(fresh, now - self.retention_s[f[1]]) and (f[1] == RENDER or not live[f[0]])
+            ]
+            self._delete(expired, held, "retention")
+            gone.update(f[2] for f in expired if f[0] not in held)
+            files = [f for f in files if f[2] not in gone]
+
+            # 2) Per-session quota: renders are rebuildable, so they go first
+            per_session: Dict[str, int] = {}
+            for f in files:
+                per_session[f[0]] = per_session.get(f[0], 0) + f[4]
+            if self.session_max_bytes > 0:
+                for sid, total in per_session.items():
+                    if total <= self.session_max_bytes or sid in held:
+                        continue
+                    victims = []
+                    for f in files:
+                        if f[0] == sid and f[1] == RENDER and f[3] < fresh and total > self.session_max_bytes:
+                            victims.append(f)
+                            total -= f[4]
+                    self._delete(victims, held, "session_quota")
+                    gone.update(f[2] for f in victims)
+                    per_session[sid] = total
+                files = [f for f in files if f[2] not in gone]
+            self._session_bytes = per_session
+
+            # 3) Global quota, oldest removable first
+            total = sum(f[4] for f in files)
+            if self.max_bytes > 0 and total > self.max_bytes:
+                victims = []
+                excess = total - self.max_bytes
+                for f in files:
+                    if excess <= 0:
+                        break
+                    if f[0] in held or f[3] >= fresh or (f[1] != RENDER and live[f[0]]):
+                        continue
+                    victims.append(f)
+                    excess -= f[4]
+                total -= self._delete(victims, held, "global_quota")
+                gone.update(f[2] for f in victims)
+                files = [f for f in files if f[2] not in gone]
+                if total > self.max_bytes:
+                    self.logger.warning("storage.over_quota bytes=%d max=%d (live session inputs are kept)", total, self.max_bytes)
+
+            classes = {c: {"files": 0, "bytes": 0} for c in CLASSES}
+            for f in files:
+                classes[f[1]]["files"] += 1
+                classes[f[1]]["bytes"] += f[4]
+            self._usage = {
+                "files": len(files),
+                "bytes": total,
+                "sessions": len(per_session),
+                "classes": classes,
+                "swept_at": now,
+                "sweep_ms": int((time.monotonic() - t0) * 1000),
+            }
+            self.counters["sweeps"] += 1
+        return self.usage()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                self.logger.warning("storage.sweep_failed err=%s", e)
+
+    def start(self) -> None:
+        """Run sweeps in a daemon thread (no-op when `interval` <= 0)."""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="storage-janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # Metrics ----------------------------------------------------------------
+
+    def usage(self, session_id: str = "") -> Dict[str, Any]:
+        with self._lock:
+            if session_id:
+                return {
+                    "session_id": session_id,
+                    "bytes": self._session_bytes.get(session_id, 0),
+                    "max_bytes": self.session_max_bytes,
+                    "leased": session_id in self._leases,
+                }
+            out = dict(self._usage)
+            out.update({
+                "max_bytes": self.max_bytes,
+                "session_max_bytes": self.session_max_bytes,
+                "retention_s": dict(self.retention_s),
+                "sharded": self.sharded,
+                **self.counters,
+            })
+        return out
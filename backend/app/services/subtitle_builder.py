@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import Dict, Iterable, List
 import math
 
 
@@ -68,9 +68,10 @@ def write_srt(segments: List[Dict], srt_path: str) -> None:
             f.write(f"{i}\n{start} --> {end}\n{text}\n\n")
 
 
-def write_srt_from_chunks(chunks: List[Dict], srt_path: str, use_translated: bool = True) -> None:
+def write_srt_from_chunks(chunks: Iterable[Dict], srt_path: str, use_translated: bool = True) -> None:
     """
-    Write SRT from chunk-based segments collected during a session.
+    Write SRT from chunk-based segments collected during a session
+    (a list of dicts or a SegmentTimeline, read in place).
 
     Each chunk is expected to have keys:
       - start_ms: int
@@ -0,0 +1,212 @@
+import bisect
+import json
+import logging
+import os
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# String columns of a segment; everything else about a segment is its two timings
+TEXT_FIELDS = ("text", "translated_text", "audio_path", "source_lang", "target_lang")
+
+
+class StringTable:
+    """Append-only interned strings; id 0 is the empty string."""
+
+    def __init__(self):
+        self.values: List[str] = [""]
+        self._ids: Dict[str, int] = {"": 0}
+        self.bytes = 0
+
+    def intern(self, value: Optional[str]) -> Tuple[int, bool]:
+        """Returns (id, is_new)."""
+        value = value or ""
+        sid = self._ids.get(value)
+        if sid is not None:
+            return sid, False
+        sid = len(self.values)
+        self.values.append(value)
+        self._ids[value] = sid
+        self.bytes += len(value)
+        return sid, True
+
+
+class SegmentTimeline:
+    """
+    Compact, append-only segment store for one session.
+
+    Timings live in two array('q') columns kept sorted by start, and each
+    string field is an index into a shared interned string table, so a
+    segment costs a few dozen bytes plus its unique text. `range()` finds
+    the segments overlapping a time window by bisecting the start column
+    (the longest segment bounds how far back an overlap can begin), so
+    exporting the last few minutes does not touch the rest of the session.
+
+    With a `journal` path every append is written to a JSON-lines file as
+    it happens (new strings once, then id tuples) and `load()` rebuilds the
+    timeline after a restart; a torn final line is ignored. Iterating yields
+    plain segment dicts, so code that took a list of dicts reads it as is.
+    """
+
+    def __init__(self, journal: Optional[str] = None, strings: Optional[StringTable] = None):
+        self.logger = logging.getLogger("rt_dub")
+        self.strings = strings or StringTable()
+        self.starts = array("q")
+        self.ends = array("q")
+        self.fields = {name: array("i") for name in TEXT_FIELDS}
+        self.max_len = 0
+        self._end_max = 0
+        self.meta: Dict[str, Any] = {}
+        self.journal_path = journal
+        self._journal = None
+        self._lock = threading.Lock()
+        if journal:
+            Path(journal).parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(journal, "a", encoding="utf-8")
+
+    # Journal ----------------------------------------------------------------
+
+    def _write(self, lines: List[Any]) -> None:
+        if self._journal is None or not lines:
+            return
+        try:
+            self._journal.write("".join(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n" for line in lines))
+            self._journal.flush()
+        except (OSError, ValueError) as e:
+            self.logger.warning("timeline.journal.write_failed path=%s err=%s", self.journal_path, e)
+
+    @classmethod
+    def load(cls, journal: str) -> "SegmentTimeline":
+        """Replay a journal and keep appending to it."""
+        tl = cls()
+        good = 0  # byte offset after the last complete record
+        try:
+            with open(journal, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break  # torn write at the end
+                    if not line.endswith(b"\n"):
+                        break
+                    good += len(line)
+                    if rec[0] == "s":
+                        tl.strings.intern(rec[2])
+                    elif rec[0] == "m":
+                        tl.meta.update(rec[1])
+                    elif rec[0] == "g":
+                        tl._insert(rec[1], rec[2], rec[3:])
+            if good < os.path.getsize(journal):
+                # Drop the torn tail so new records do not land on the same line
+                os.truncate(journal, good)
+        except OSError:
+            pass
+        tl.journal_path = journal
+        tl._journal = open(journal, "a", encoding="utf-8")
+        return tl
+
+    # Writes -----------------------------------------------------------------
+
+    def _insert(self, start: int, end: int, ids: List[int]) -> None:
+        # Appends are almost always in start order; the rare late one is inserted in place
+        if not self.starts or start >= self.starts[-1]:
+            i = len(self.starts)
+        else:
+            i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        for name, sid in zip(TEXT_FIELDS, ids):
+            self.fields[name].insert(i, sid)
+        self.max_len = max(self.max_len, end - start)
+        self._end_max = max(self._end_max, end)
+
+    def append(self, segment: Dict[str, Any]) -> None:
+        start = int(segment.get("start_ms", 0))
+        end = int(max(start, segment.get("end_ms", start)))
+        with self._lock:
+            lines: List[Any] = []
+            ids = []
+            for name in TEXT_FIELDS:
+                sid, new = self.strings.intern(segment.get(name))
+                if new:
+                    lines.append(["s", sid, self.strings.values[sid]])
+                ids.append(sid)
+            self._insert(start, end, ids)
+            lines.append(["g", start, end, *ids])
+            self._write(lines)
+
+    def set_meta(self, **values: Any) -> None:
+        """Journal session-level values (chunk count, timeline position...); last write wins on load."""
+        with self._lock:
+            self.meta.update(values)
+            self._write([["m", values]])
+
+    # Reads ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __bool__(self) -> bool:
+        return len(self.starts) > 0
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        values = self.strings.values
+        seg: Dict[str, Any] = {"start_ms": self.starts[i], "end_ms": self.ends[i]}
+        for name in TEXT_FIELDS:
+            seg[name] = values[self.fields[name][i]]
+        return seg
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self.starts)):
+            yield self[i]
+
+    @property
+    def end_ms(self) -> int:
+        return self._end_max
+
+    def range(self, start_ms: int, end_ms: int) -> List[Dict[str, Any]]:
+        """Segments overlapping [start_ms, end_ms), in start order, in O(log n + k)."""
+        with self._lock:
+            lo = bisect.bisect_left(self.starts, start_ms - self.max_len)
+            hi = bisect.bisect_left(self.starts, end_ms)
+            return [self[i] for i in range(lo, hi) if self.ends[i] > start_ms]
+
+    def window(self, last_ms: int) -> List[Dict[str, Any]]:
+        """The trailing `last_ms` of the session (e.g. the last 5 minutes)."""
+        end = self.end_ms
+        return self.range(max(0, end - int(last_ms)), end + 1)
+
+    def snapshot(self) -> "SegmentTimeline":
+        """Frozen copy for a render: copies the columns, shares the append-only string table."""
+        with self._lock:
+            snap = SegmentTimeline(strings=self.strings)
+            snap.starts = array("q", self.starts)
+            snap.ends = array("q", self.ends)
+            snap.fields = {name: array("i", col) for name, col in self.fields.items()}
+            snap.max_len = self.max_len
+            snap._end_max = self._end_max
+            snap.meta = dict(self.meta)
+        return snap
+
+    def close(self, delete: bool = False) -> None:
+        if self._journal is not None:
+            try:
+                self._journal.close()
+            except OSError:
+                pass
+            self._journal = None
+        if delete and self.journal_path:
+            try:
+                os.unlink(self.journal_path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        columns = sum(col.itemsize * len(col) for col in (self.starts, self.ends, *self.fields.values()))
+        return {
+            "segments": len(self),
+            "strings": len(self.strings.values),
+            "string_bytes": self.strings.bytes,
+            "column_bytes": columns,
+        }
@@ -1,78 +1,66 @@
 import logging
-from typing import Optional
+from typing import List, Optional
+
+from .argos_registry import ARGOS_AVAILABLE, ArgosModelRegistry
 
-try:
-    from argostranslate import package as argos_package
-    from argostranslate import translate as argos_translate
-    ARGOS_AVAILABLE = True
-except Exception:
-    ARGOS_AVAILABLE = False
 
 class ArgosTranslate:
     """
     Offline translation using Argos Translate models.
-    Automatically installs the required model for (source -> target) if available.
+    Models are resolved and kept warm by an ArgosModelRegistry; a missing
+    pair is installed in the background and fails fast until it is ready.
     """
-    def __init__(self):
+    def __init__(self, registry: Optional[ArgosModelRegistry] = None):
         self.logger = logging.getLogger("rt_dub")
+        self.registry = registry or ArgosModelRegistry()
         if not ARGOS_AVAILABLE:
             self.logger.warning("argos not available; package not installed")
 
     def ensure_model(self, source: str, target: str) -> bool:
+        """Blocking install of the pair's package (not used on the request path)."""
+        return self.registry.install(source, target)
+
+    def ready(self, source: str, target: str) -> bool:
+        return self.registry.loaded(source, target)
+
+    def _translation(self, source: str, target: str):
         if not ARGOS_AVAILABLE:
-            return False
-        try:
-            # Check if languages are already installed
-            installed_languages = argos_translate.get_installed_languages()
-            for lang in installed_languages:
-                if lang.code == (source or "en"):
-                    for to_lang in lang.translations:
-                        try:
-                            if to_lang.to_language.code == target:
-                                return True
-                        except Exception:
-                            pass
-            # Try to find and install package
-            self.logger.info("argos.update_index")
-            try:
-                argos_package.update_package_index()
-            except Exception as e:
-                self.logger.warning("argos.update_index.failed err=%s", e)
-            available_packages = []
-            try:
-                available_packages = argos_package.get_available_packages()
-            except Exception as e:
-                self.logger.warning("argos.get_available_packages.failed err=%s", e)
-                return False
-            pkg = next((p for p in available_packages if getattr(p, 'from_code', None) == (source or 'en') and getattr(p, 'to_code', None) == target), None)
-            if not pkg:
-                self.logger.warning("argos.package_not_found pair=%s->%s", source, target)
-                return False
-            self.logger.info("argos.installing pair=%s->%s", source, target)
-            try:
-                path = pkg.download()
-                argos_package.install_from_path(path)
-                self.logger.info("argos.install.ok pair=%s->%s", source, target)
-                return True
-            except Exception as e:
-                self.logger.warning("argos.install.failed err=%s", e)
-                return False
-        except Exception as e:
-            self.logger.warning("argos.ensure_model.failed err=%s", e)
-            return False
+            raise RuntimeError("ArgosTranslate not installed")
+        tr = self.registry.get(source, target)
+        if tr is None:
+            raise RuntimeError(f"argos model not installed for {source or 'en'}->{target}")
+        return tr
 
     def translate(self, text: str, source: str, target: str) -> str:
         if not text:
             return ""
-        if not ARGOS_AVAILABLE:
-            raise RuntimeError("ArgosTranslate not installed")
-        ok = self.ensure_model(source, target)
-        if not ok:
-            # Still may translate if language exists already; try anyway
-            self.logger.info("argos.ensure_model.not_ok proceeding to attempt translate")
+        tr = self._translation(source, target)
         try:
-            out = argos_translate.translate(text, (source or 'en'), target)
-            return out or ""
+            return tr.translate(text) or ""
         except Exception as e:
             self.logger.warning("argos.translate.failed err=%s", e)
             raise
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        """
+        Translate a batch through the public ITranslation API, one text at a
+        time (Argos has no public batched call). The model is resolved once
+        for the batch. A text that fails comes back empty so the caller's
+        per-item chain can retry it; if every text fails the error is raised.
+        """
+        tr = self._translation(source, target)
+        out = [""] * len(texts)
+        error: Optional[Exception] = None
+        ok = 0
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            try:
+                out[i] = tr.translate(text) or ""
+                ok += 1
+            except Exception as e:
+                error = e
+                self.logger.warning("argos.translate_batch.item_failed err=%s", e)
+        if error is not None and not ok:
+            raise error
+        return out
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from .translate_orchestrator import TranslatorOrchestrator
+
+
+class _Batch:
+    def __init__(self):
+        self.items: List[Tuple[str, asyncio.Future]] = []
+        self.timer = None
+
+
+class TranslationBatcher:
+    """
+    Coalesces translation requests from all sessions into batched calls.
+
+    Texts are collected per (source, target) pair until `batch_limit` items
+    are waiting or `wait_ms` has passed since the first one, then sent as a
+    single TranslatorOrchestrator.translate_batch call and each caller gets
+    its own result. Both knobs adapt: a batch that fills up before the timer
+    doubles the limit (up to `max_batch`) and stretches the wait, a lone item
+    shrinks the wait so a quiet server adds almost no latency.
+    """
+
+    def __init__(
+        self,
+        orchestrator: TranslatorOrchestrator,
+        run: Callable[..., Awaitable[Any]],
+        max_batch: int = 32,
+        min_wait_ms: float = 1.0,
+        max_wait_ms: float = 15.0,
+    ):
+        self.logger = logging.getLogger("rt_dub")
+        self.orchestrator = orchestrator
+        self.run = run
+        self.max_batch = max(1, int(max_batch))
+        self.min_wait = min_wait_ms / 1000.0
+        self.max_wait = max(self.min_wait, max_wait_ms / 1000.0)
+        self.batch_limit = min(4, self.max_batch)
+        self.wait = self.min_wait
+        self._pending: Dict[Tuple[str, str], _Batch] = {}
+        self.counters: Dict[str, int] = {"requests": 0, "batches": 0, "items": 0, "full_batches": 0}
+
+    async def translate(self, text: str, source: str, target: str) -> str:
+        if not text:
+            return ""
+        loop = asyncio.get_running_loop()
+        key = (source, target)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _Batch()
+            self._pending[key] = batch
+            batch.timer = loop.call_later(self.wait, self._flush_soon, key)
+        fut = loop.create_future()
+        batch.items.append((text, fut))
+        self.counters["requests"] += 1
+        if len(batch.items) >= self.batch_limit:
+            self._flush_soon(key)
+        return await fut
+
+    def _flush_soon(self, key: Tuple[str, str]) -> None:
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+        self._adapt(len(batch.items))
+        asyncio.get_running_loop().create_task(self._flush(key, batch))
+
+    def _adapt(self, size: int) -> None:
+        if size >= self.batch_limit:
+            self.counters["full_batches"] += 1
+            self.batch_limit = min(self.max_batch, self.batch_limit * 2)
+            self.wait = min(self.max_wait, self.wait * 1.5)
+        elif size <= 1:
+            self.batch_limit = min(self.max_batch, max(2, self.batch_limit // 2))
+            self.wait = max(self.min_wait, self.wait * 0.5)
+
+    async def _flush(self, key: Tuple[str, str], batch: _Batch) -> None:
+        source, target = key
+        texts = [t for t, _ in batch.items]
+        unique = list(dict.fromkeys(texts))
+        self.counters["batches"] += 1
+        self.counters["items"] += len(texts)
+        try:
+            outs = await self.run(self.orchestrator.translate_batch, unique, source, target)
+            by_text = dict(zip(unique, outs))
+            for text, fut in batch.items:
+                if not fut.done():
+                    fut.set_result(by_text.get(text, text))
+        except Exception as e:
+            self.logger.warning("translate.batcher.failed pair=%s->%s n=%d err=%s", source, target, len(texts), e)
+            for _, fut in batch.items:
+                if not fut.done():
+                    fut.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        c = dict(self.counters)
+        c["avg_batch"] = round(c["items"] / c["batches"], 2) if c["batches"] else 0.0
+        c["batch_limit"] = self.batch_limit
+        c["wait_ms"] = round(self.wait * 1000, 2)
+        return c
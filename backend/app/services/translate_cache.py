@@ -0,0 +1,133 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Cache key form of a phrase: trimmed, whitespace-collapsed, case-folded."""
+    return " ".join((text or "").split()).casefold()
+
+
+class TranslationCache:
+    """
+    Two-tier translation cache: bounded in-process LRU in front of SQLite.
+
+    Entries are keyed on (normalized text, source, target, provider) where
+    provider is the translator namespace the caller asked for ("chain" for
+    the full orchestrator). Each entry also records which concrete provider
+    produced it. Both tiers honour the TTL; the disk tier is trimmed to
+    `max_entries` by least-recent access.
+    """
+
+    def __init__(self, db_path: str, memory_items: int = 4096, max_entries: int = 200000, ttl_seconds: float = 30 * 86400):
+        self.logger = logging.getLogger("rt_dub")
+        self.memory_items = max(0, int(memory_items))
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self._mem: "OrderedDict[Tuple[str, str, str, str], Tuple[str, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_trim = 0
+        self.stats_counters: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS translations (
+                text_norm TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                translated TEXT NOT NULL,
+                produced_by TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (text_norm, source, target, provider)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_translations_access ON translations(last_access)")
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl > 0 and now - created > self.ttl
+
+    def get(self, text: str, source: str, target: str, provider: str = "chain") -> Optional[Tuple[str, str]]:
+        """Return (translated, produced_by) or None."""
+        key = (normalize_text(text), source or "", target or "", provider)
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if not self._expired(hit[2], now):
+                    self._mem.move_to_end(key)
+                    self.stats_counters["memory_hits"] += 1
+                    return hit[0], hit[1]
+                del self._mem[key]
+            row = self._db.execute(
+                "SELECT translated, produced_by, created FROM translations WHERE text_norm=? AND source=? AND target=? AND provider=?",
+                key,
+            ).fetchone()
+            if row is None or self._expired(row[2], now):
+                self.stats_counters["misses"] += 1
+                return None
+            self._db.execute(
+                "UPDATE translations SET last_access=? WHERE text_norm=? AND source=? AND target=? AND provider=?",
+                (now, *key),
+            )
+            self._remember(key, (row[0], row[1], row[2]))
+            self.stats_counters["disk_hits"] += 1
+            return row[0], row[1]
+
+    def put(self, text: str, source: str, target: str, translated: str, produced_by: str, provider: str = "chain") -> None:
+        if not text or not translated:
+            return
+        key = (normalize_text(text), source or "", target or "", provider)
+        now = time.time()
+        with self._lock:
+            self._remember(key, (translated, produced_by, now))
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, translated, produced_by, now, now),
+            )
+            self.stats_counters["puts"] += 1
+            self._puts_since_trim += 1
+            if self._puts_since_trim >= 256:
+                self._puts_since_trim = 0
+                self._trim(now)
+
+    def _remember(self, key, value) -> None:
+        if not self.memory_items:
+            return
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_items:
+            self._mem.popitem(last=False)
+
+    def _trim(self, now: float) -> None:
+        removed = 0
+        if self.ttl > 0:
+            removed += self._db.execute("DELETE FROM translations WHERE created < ?", (now - self.ttl,)).rowcount
+        (count,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+        if count > self.max_entries:
+            removed += self._db.execute(
+                "DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        if removed:
+            self.stats_counters["evictions"] += removed
+            self.logger.info("translate.cache.trimmed removed=%d", removed)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.stats_counters)
+            out["memory_items"] = len(self._mem)
+            lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+            out["hit_ratio_pct"] = int(100 * (out["memory_hits"] + out["disk_hits"]) / lookups) if lookups else 0
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .provider_router import ProviderRouter
+
+Candidate = Tuple[str, Callable[[], str]]
+
+
+def _pct(samples, pct: float) -> Optional[int]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return int(ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))])
+
+
+class HedgeBudget:
+    """Token bucket: every primary request earns `ratio` tokens, every hedge spends one."""
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5.0):
+        self.ratio = max(0.0, float(ratio))
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class HedgedTranslator:
+    """
+    Fires the primary provider, and if it has not answered within the
+    provider's observed p95 (clamped to [min_delay, max_delay]) launches the
+    next candidate as a backup. The first acceptable answer wins; losers are
+    cancelled if not yet started and otherwise abandoned (their result is
+    ignored and they finish on their own request timeout). Hedges are
+    limited by a HedgeBudget so extra load stays a fixed share of traffic.
+    """
+
+    def __init__(
+        self,
+        router: ProviderRouter,
+        budget: Optional[HedgeBudget] = None,
+        min_delay_ms: float = 150.0,
+        max_delay_ms: float = 2000.0,
+        default_delay_ms: float = 800.0,
+        max_workers: int = 16,
+    ):
+        self.logger = logging.getLogger("rt_dub")
+        self.router = router
+        self.budget = budget or HedgeBudget()
+        self.min_delay = min_delay_ms / 1000.0
+        self.max_delay = max_delay_ms / 1000.0
+        self.default_delay = default_delay_ms / 1000.0
+        self._pool = ThreadPoolExecutor(max_workers=max(2, max_workers), thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"requests": 0, "backups_fired": 0, "backup_wins": 0, "budget_denied": 0, "calls": 0}
+        # End-to-end latency actually served vs. what the primary alone would have taken
+        self._served_ms: Deque[float] = deque(maxlen=1024)
+        self._primary_ms: Deque[float] = deque(maxlen=1024)
+
+    def hedge_delay(self, key: str) -> float:
+        p95 = self.router.health(key).percentile_ms(95)
+        delay = self.default_delay if p95 is None else p95 / 1000.0
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def _watch_primary(self, fut: Future, t0: float) -> None:
+        def _done(f: Future) -> None:
+            if not f.cancelled() and f.exception() is None:
+                with self._lock:
+                    self._primary_ms.append((time.monotonic() - t0) * 1000.0)
+        fut.add_done_callback(_done)
+
+    def run(self, candidates: List[Candidate], accept: Callable[[str], bool]) -> Tuple[str, str]:
+        """
+        Returns (output, provider key) of the first acceptable answer, or ("", "")
+        if all fail. Candidates whose circuit is open are skipped at launch time.
+        """
+        t0 = time.monotonic()
+        self._count("requests")
+        self.budget.earn()
+        pending: Dict[Future, str] = {}
+        hedges = set()
+        queue = list(candidates)
+
+        def launch() -> bool:
+            while queue:
+                key, fn = queue.pop(0)
+                if not self.router.allow(key):
+                    continue
+                pending[self._pool.submit(fn)] = key
+                self._count("calls")
+                return True
+            return False
+
+        if not launch():
+            return "", ""
+        primary_fut, primary_key = next(iter(pending.items()))
+        self._watch_primary(primary_fut, t0)
+        try:
+            while pending:
+                timeout = self.hedge_delay(primary_key) if queue and len(pending) == 1 else None
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Primary is slow: hedge if the budget allows, otherwise keep waiting
+                    if self.budget.try_spend():
+                        if launch():
+                            self._count("backups_fired")
+                            hedges.add(list(pending.values())[-1])
+                    else:
+                        self._count("budget_denied")
+                        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    key = pending.pop(fut)
+                    try:
+                        out = fut.result()
+                    except Exception as e:
+                        self.logger.warning("translate.hedge.candidate_failed key=%s err=%s", key, e)
+                        out = ""
+                    if out and accept(out):
+                        if key in hedges:
+                            self._count("backup_wins")
+                        with self._lock:
+                            self._served_ms.append((time.monotonic() - t0) * 1000.0)
+                        return out, key
+                # Failed outright: move on to the next candidate immediately (plain fallback)
+                if not pending:
+                    launch()
+            return "", ""
+        finally:
+            for fut, key in pending.items():
+                if fut.cancel():
+                    # Never ran, so it reports no outcome: hand back a claimed half-open slot
+                    self.router.release(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counters)
+            served = list(self._served_ms)
+            primary = list(self._primary_ms)
+        req = c["requests"] or 1
+        # Duplicated volume caused by hedging (plain fallbacks after a failure are not counted)
+        c["extra_load_pct"] = round(100.0 * c["backups_fired"] / req, 1)
+        c["served_ms"] = {"p50": _pct(served, 50), "p95": _pct(served, 95), "p99": _pct(served, 99)}
+        c["primary_only_ms"] = {"p50": _pct(primary, 50), "p95": _pct(primary, 95), "p99": _pct(primary, 99)}
+        return c
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
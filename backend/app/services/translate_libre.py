@@ -1,12 +1,26 @@
-import requests
 import os
 import logging
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from .provider_router import ProviderRouter
+from ..utils import http
+
+MYMEMORY_KEY = "mymemory"
+
 
 class LibreTranslate:
-    def __init__(self, base_url: str = "https://libretranslate.com"):
+    def __init__(
+        self,
+        base_url: str = "https://libretranslate.com",
+        router: Optional[ProviderRouter] = None,
+        timeout: Optional[float] = None,
+        include_defaults: Optional[bool] = None,
+        mymemory_url: Optional[str] = None,
+    ):
         # Allow comma-separated list in env to try multiple public instances
         # Example: "https://libretranslate.com,https://libretranslate.de"
-        raw = os.getenv("LIBRETRANSLATE_URL", base_url)
+        raw = base_url or os.getenv("LIBRETRANSLATE_URL", "https://libretranslate.com")
         parts = [p.strip().rstrip('/') for p in raw.split(',') if p.strip()]
         # Provide sane defaults if single URL fails
         defaults = [
@@ -14,6 +28,10 @@ class LibreTranslate:
             "https://libretranslate.de",
             "https://translate.argosopentech.com"
         ]
+        if include_defaults is None:
+            include_defaults = (os.getenv("LIBRETRANSLATE_FALLBACK_HOSTS") or "1") not in ("0", "false", "no")
+        if not include_defaults:
+            defaults = []
         # Ensure uniqueness while preserving order
         seen = set()
         self.base_urls = []
@@ -21,11 +39,19 @@ class LibreTranslate:
             if u and u not in seen:
                 self.base_urls.append(u)
                 seen.add(u)
+        self.timeout = float(timeout if timeout is not None else (os.getenv("LIBRETRANSLATE_TIMEOUT") or "5"))
+        self.mymemory_url = mymemory_url or (os.getenv("MYMEMORY_URL") or "https://api.mymemory.translated.net/get")
+        self.router = router or ProviderRouter()
         self.logger = logging.getLogger("rt_dub")
 
+    @staticmethod
+    def host_key(base: str) -> str:
+        return f"libre:{base}"
+
     def translate(self, text: str, source: str, target: str) -> str:
-        if not text:
-            return ""
+        return self.translate_with_provider(text, source, target)[0]
+
+    def _libre_request(self, text: Union[str, List[str]], source: str, target: str) -> Tuple[Dict, Dict]:
         payload = {
             "q": text,
             "source": source or "auto",
@@ -35,45 +61,141 @@ class LibreTranslate:
         api_key = os.getenv("LIBRETRANSLATE_API_KEY", "").strip()
         if api_key:
             payload["api_key"] = api_key
-        headers = {"Content-Type": "application/json"}
+        return payload, {"Content-Type": "application/json"}
+
+    @staticmethod
+    def _libre_result(resp) -> str:
+        if resp.status_code == 429:
+            # Rate limited, try next base
+            raise RuntimeError("rate limited")
+        resp.raise_for_status()
+        out = resp.json().get("translatedText", "")
+        if not out:
+            # If empty but 200, fall through to next
+            raise RuntimeError("empty translate response")
+        return out
+
+    @staticmethod
+    def _mymemory_result(resp) -> str:
+        resp.raise_for_status()
+        out = (resp.json().get("responseData", {}) or {}).get("translatedText", "")
+        if not out:
+            raise RuntimeError("empty mymemory response")
+        return out
+
+    def translate_host(self, base: str, text: str, source: str, target: str) -> str:
+        """One request to one Libre host; outcome and latency are reported to the router."""
+        payload, headers = self._libre_request(text, source, target)
+        key = self.host_key(base)
+        t0 = time.monotonic()
+        try:
+            resp = http.get_client().post(f"{base}/translate", json=payload, headers=headers, timeout=self.timeout)
+            out = self._libre_result(resp)
+        except Exception as e:
+            self.router.record_failure(key, e, time.monotonic() - t0)
+            raise
+        self.router.record_success(key, time.monotonic() - t0)
+        return out
+
+    async def atranslate_host(self, base: str, text: str, source: str, target: str) -> str:
+        """Event-loop variant of translate_host on the pooled async client."""
+        client = http.get_async_client()
+        if client is None:
+            raise RuntimeError("async HTTP client unavailable (httpx not installed)")
+        payload, headers = self._libre_request(text, source, target)
+        key = self.host_key(base)
+        t0 = time.monotonic()
+        try:
+            resp = await client.post(f"{base}/translate", json=payload, headers=headers, timeout=self.timeout)
+            out = self._libre_result(resp)
+        except Exception as e:
+            self.router.record_failure(key, e, time.monotonic() - t0)
+            raise
+        self.router.record_success(key, time.monotonic() - t0)
+        return out
+
+    def translate_mymemory(self, text: str, source: str, target: str) -> str:
+        params = {"q": text, "langpair": f"{source or 'en'}|{target}"}
+        t0 = time.monotonic()
+        try:
+            r = http.get_client().get(self.mymemory_url, params=params, timeout=self.timeout)
+            out = self._mymemory_result(r)
+        except Exception as e:
+            self.router.record_failure(MYMEMORY_KEY, e, time.monotonic() - t0)
+            raise
+        self.router.record_success(MYMEMORY_KEY, time.monotonic() - t0)
+        return out
+
+    async def atranslate_mymemory(self, text: str, source: str, target: str) -> str:
+        client = http.get_async_client()
+        if client is None:
+            raise RuntimeError("async HTTP client unavailable (httpx not installed)")
+        params = {"q": text, "langpair": f"{source or 'en'}|{target}"}
+        t0 = time.monotonic()
+        try:
+            r = await client.get(self.mymemory_url, params=params, timeout=self.timeout)
+            out = self._mymemory_result(r)
+        except Exception as e:
+            self.router.record_failure(MYMEMORY_KEY, e, time.monotonic() - t0)
+            raise
+        self.router.record_success(MYMEMORY_KEY, time.monotonic() - t0)
+        return out
+
+    def translate_batch_host(self, base: str, texts: List[str], source: str, target: str) -> List[str]:
+        """Translate several texts in one request (Libre accepts a list for `q`)."""
+        payload, headers = self._libre_request(texts, source, target)
+        key = self.host_key(base)
+        t0 = time.monotonic()
+        try:
+            resp = http.get_client().post(f"{base}/translate", json=payload, headers=headers, timeout=self.timeout)
+            out = self._libre_result(resp)
+            if not isinstance(out, list) or len(out) != len(texts):
+                raise RuntimeError("batch response size mismatch")
+        except Exception as e:
+            self.router.record_failure(key, e, time.monotonic() - t0)
+            raise
+        self.router.record_success(key, time.monotonic() - t0)
+        return [str(o or "") for o in out]
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> Tuple[List[str], str]:
+        """One batched call to the fastest healthy host; returns (outputs, provider) or ([], "")."""
+        for base in self.ordered_hosts():
+            if not self.router.allow(self.host_key(base)):
+                continue
+            try:
+                return self.translate_batch_host(base, texts, source, target), self.host_key(base)
+            except Exception as e:
+                self.logger.warning("translate.batch.failed base=%s n=%d err=%s", base, len(texts), e)
+        return [], ""
+
+    def ordered_hosts(self):
+        """Libre hosts fastest-healthy first, per the router."""
+        keys = self.router.order(self.host_key(b) for b in self.base_urls)
+        return [k.split(":", 1)[1] for k in keys]
+
+    def translate_with_provider(self, text: str, source: str, target: str) -> Tuple[str, str]:
+        """Returns (translated, provider); provider is "" when every host failed."""
+        if not text:
+            return "", ""
         last_err = None
-        for base in self.base_urls:
-            url = f"{base}/translate"
+        for base in self.ordered_hosts():
+            if not self.router.allow(self.host_key(base)):
+                continue
             try:
-                resp = requests.post(url, json=payload, headers=headers, timeout=12)
-                if resp.status_code == 429:
-                    # Rate limited, try next base
-                    self.logger.warning("translate.rate_limited base=%s", base)
-                    last_err = Exception("rate limited")
-                    continue
-                resp.raise_for_status()
-                data = resp.json()
-                out = data.get("translatedText", "")
-                if out:
-                    return out
-                # If empty but 200, fall through to next
-                self.logger.warning("translate.empty_response base=%s", base)
-                last_err = Exception("empty translate response")
+                return self.translate_host(base, text, source, target), self.host_key(base)
             except Exception as e:
                 self.logger.warning("translate.failed base=%s err=%s", base, e)
                 last_err = e
                 continue
         # Fallback 1: MyMemory (free, rate-limited)
-        try:
-            pair = f"{(source or 'en')|''}|{target}"
-        except Exception:
-            pair = f"{source or 'en'}|{target}"
-        try:
-            mm_url = "https://api.mymemory.translated.net/get"
-            r = requests.get(mm_url, params={"q": text, "langpair": f"{source or 'en'}|{target}"}, timeout=10)
-            r.raise_for_status()
-            j = r.json()
-            out = (j.get("responseData", {}) or {}).get("translatedText", "")
-            if out:
+        if self.router.allow(MYMEMORY_KEY):
+            try:
+                out = self.translate_mymemory(text, source, target)
                 self.logger.info("translate.mymemory.used")
-                return out
-        except Exception as e:
-            self.logger.warning("translate.mymemory.failed err=%s", e)
+                return out, MYMEMORY_KEY
+            except Exception as e:
+                self.logger.warning("translate.mymemory.failed err=%s", e)
+                last_err = e
         # All providers failed — return original text so TTS can still run
         self.logger.error("translate.all_failed returning original text. last_err=%s", last_err)
-        return text
+        return text, ""
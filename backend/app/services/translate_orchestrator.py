@@ -1,7 +1,12 @@
 import logging
-from typing import Optional
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
 
-from .translate_libre import LibreTranslate
+from .translate_libre import LibreTranslate, MYMEMORY_KEY
+from .translate_cache import TranslationCache
+from .health_prober import ARGOS_KEY
+from .translate_hedge import HedgedTranslator
 try:
     from .translate_argos import ArgosTranslate
     ARGOS_OK = True
@@ -23,13 +28,23 @@ class TranslatorOrchestrator:
     Order:
       1) LibreTranslate (JSON, multi-host, optional api_key)
          - Its implementation already falls back to MyMemory when needed.
-      2) ArgosTranslate (offline), installs model on first use if available.
+      2) ArgosTranslate (offline); models are preloaded/installed in the background.
+
+    With a TranslationCache attached, hits return before any provider is
+    contacted; only real translations (not the give-up passthrough) are stored.
+    With a HedgedTranslator attached, the same chain is raced instead of
+    walked: backups start once the primary exceeds its p95.
+    With prefer_offline, Argos moves to the front of the chain for any
+    pair whose model is already warm in its registry.
     """
 
-    def __init__(self, libre: LibreTranslate, argos: Optional[ArgosTranslate] = None):
+    def __init__(self, libre: LibreTranslate, argos: Optional[ArgosTranslate] = None, cache: Optional[TranslationCache] = None, hedger: Optional[HedgedTranslator] = None, prefer_offline: bool = False):
         self.logger = logging.getLogger("rt_dub")
         self.libre = libre
         self.argos = argos if ARGOS_OK else None
+        self.cache = cache
+        self.hedger = hedger
+        self.prefer_offline = prefer_offline
 
         # Startup diagnostics (masked)
         try:
@@ -37,35 +52,163 @@ class TranslatorOrchestrator:
             urls = os.getenv("LIBRETRANSLATE_URL", "https://libretranslate.com")
             key = os.getenv("LIBRETRANSLATE_API_KEY", "")
             self.logger.info(
-                "translator.config libre_urls=%s api_key=%s argos=%s",
+                "translator.config libre_urls=%s api_key=%s argos=%s prefer_offline=%s",
                 urls,
                 _mask(key),
                 bool(self.argos),
+                self.prefer_offline,
             )
         except Exception:
             pass
 
     def translate(self, text: str, source: str, target: str) -> str:
+        return self.translate_with_provider(text, source, target)[0]
+
+    def _offline_first(self, source: str, target: str) -> bool:
+        return bool(self.prefer_offline and self.argos and self.argos.ready(source, target))
+
+    def translate_with_provider(self, text: str, source: str, target: str) -> Tuple[str, str]:
+        """Returns (translated, provider); provider is "" when the original text is passed through."""
         if not text:
-            return ""
+            return "", ""
+        if self.cache:
+            try:
+                hit = self.cache.get(text, source, target)
+                if hit:
+                    return hit
+            except Exception as e:
+                self.logger.warning("translator.cache.get_failed err=%s", e)
+        out, provider = self._translate_uncached(text, source, target)
+        if self.cache and provider:
+            try:
+                self.cache.put(text, source, target, out, provider)
+            except Exception as e:
+                self.logger.warning("translator.cache.put_failed err=%s", e)
+        return out, provider
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        """
+        Translate many texts for one language pair with as few provider calls
+        as possible: cache hits first, then one batched Libre request, then one
+        Argos pass, and only then the per-item chain for whatever is left.
+        """
+        results: List[Optional[str]] = [None] * len(texts)
+        misses: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if not text:
+                results[i] = ""
+                continue
+            hit = None
+            if self.cache:
+                try:
+                    hit = self.cache.get(text, source, target)
+                except Exception as e:
+                    self.logger.warning("translator.cache.get_failed err=%s", e)
+            if hit:
+                results[i] = hit[0]
+            else:
+                misses.setdefault(text, []).append(i)
+
+        def _fill(text: str, out: str, provider: str) -> None:
+            for i in misses.pop(text):
+                results[i] = out
+            if self.cache and provider:
+                try:
+                    self.cache.put(text, source, target, out, provider)
+                except Exception as e:
+                    self.logger.warning("translator.cache.put_failed err=%s", e)
+
+        def _accept(text: str, out: str) -> bool:
+            return bool(out) and (out != text or source == target)
+
+        def _libre_batch() -> None:
+            if len(misses) > 1:
+                pending = list(misses)
+                outs, provider = self.libre.translate_batch(pending, source, target)
+                for text, out in zip(pending, outs):
+                    if _accept(text, out):
+                        _fill(text, out, provider)
+
+        def _argos_batch() -> None:
+            if len(misses) > 1 and self.argos and self.libre.router.allow(ARGOS_KEY):
+                pending = list(misses)
+                t0 = time.monotonic()
+                try:
+                    outs = self.argos.translate_batch(pending, source, target)
+                    self.libre.router.record_success(ARGOS_KEY, time.monotonic() - t0)
+                    for text, out in zip(pending, outs):
+                        if _accept(text, out):
+                            _fill(text, out, ARGOS_KEY)
+                except Exception as e:
+                    self.libre.router.record_failure(ARGOS_KEY, e, time.monotonic() - t0)
+                    self.logger.warning("translator.argos.batch_failed n=%d err=%s", len(pending), e)
+
+        for step in ((_argos_batch, _libre_batch) if self._offline_first(source, target) else (_libre_batch, _argos_batch)):
+            step()
+        for text in list(misses):
+            out, provider = self._translate_uncached(text, source, target)
+            _fill(text, out, provider)
+        return [r if r is not None else "" for r in results]
+
+    def _argos_call(self, text: str, source: str, target: str) -> str:
+        t0 = time.monotonic()
+        try:
+            out = self.argos.translate(text, source, target)
+        except Exception as e:
+            self.libre.router.record_failure(ARGOS_KEY, e, time.monotonic() - t0)
+            raise
+        self.libre.router.record_success(ARGOS_KEY, time.monotonic() - t0)
+        return out
+
+    def _candidates(self, text: str, source: str, target: str) -> List[Tuple[str, Callable[[], str]]]:
+        """The provider chain in routing order, as zero-arg calls for the hedger."""
+        out = [
+            (LibreTranslate.host_key(base), partial(self.libre.translate_host, base, text, source, target))
+            for base in self.libre.ordered_hosts()
+        ]
+        if self.argos:
+            argos = (ARGOS_KEY, partial(self._argos_call, text, source, target))
+            if self._offline_first(source, target):
+                out.insert(0, argos)
+            else:
+                out.append(argos)
+        out.append((MYMEMORY_KEY, partial(self.libre.translate_mymemory, text, source, target)))
+        return out
+
+    def _translate_uncached(self, text: str, source: str, target: str) -> Tuple[str, str]:
+        if self.hedger:
+            out, provider = self.hedger.run(
+                self._candidates(text, source, target),
+                accept=lambda o: o != text or source == target,
+            )
+            return (out, provider) if provider else (text, "")
+        # 0) Warm offline model, when preferred
+        offline_first = self._offline_first(source, target)
+        if offline_first and self.libre.router.allow(ARGOS_KEY):
+            try:
+                out = self._argos_call(text, source, target)
+                if out:
+                    return out, ARGOS_KEY
+            except Exception as e:
+                self.logger.warning("translator.argos.failed err=%s", e)
         # 1) Libre + internal MyMemory fallback
         try:
-            out = self.libre.translate(text, source, target)
+            out, provider = self.libre.translate_with_provider(text, source, target)
             # If out equals input and language differs, treat as failure and fall back
-            if out and (out != text or (source == target)):
-                return out
+            if out and provider and (out != text or (source == target)):
+                return out, provider
             self.logger.warning("translator.libre.no_change falling back text_len=%d", len(text))
         except Exception as e:
             self.logger.warning("translator.libre.failed err=%s", e)
 
         # 2) Argos offline
-        if self.argos:
+        if self.argos and not offline_first:
             try:
-                out = self.argos.translate(text, source, target)
+                out = self._argos_call(text, source, target)
                 if out:
-                    return out
+                    return out, ARGOS_KEY
             except Exception as e:
                 self.logger.warning("translator.argos.failed err=%s", e)
 
         # 3) Give up — return original text
-        return text
+        return text, ""
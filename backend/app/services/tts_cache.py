@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class TTSCache:
+    """
+    Content-addressed store for rendered TTS clips.
+
+    Clips live once on disk at <root>/<h[:2]>/<h>.mp3 where h hashes
+    (engine, voice, lang, text). Disk usage is kept under `max_bytes` by
+    evicting least recently used clips; session copies are hard links, so
+    evicting a cache entry never breaks a session that still references it.
+    A small in-memory tier holds the hottest clips' bytes.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024, memory_bytes: int = 16 * 1024 * 1024, suffix: str = ".mp3"):
+        self.logger = logging.getLogger("rt_dub")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.memory_bytes = int(memory_bytes)
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> size, LRU order
+        self._disk_bytes = 0
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        self.counters: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._load_index()
+
+    @staticmethod
+    def key(lang: str, text: str, engine: str = "gtts", voice: str = "") -> str:
+        h = hashlib.sha256()
+        for part in (engine, voice, lang, " ".join((text or "").split())):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{self.suffix}"
+
+    def _load_index(self) -> None:
+        entries = []
+        for p in self.root.glob(f"*/*{self.suffix}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        if entries:
+            self.logger.info("tts.cache.loaded clips=%d bytes=%d", len(entries), self._disk_bytes)
+        # The budget may have shrunk since the clips were written
+        self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return data
+            if key not in self._disk:
+                self.counters["misses"] += 1
+                return None
+            self._disk.move_to_end(key)
+        try:
+            data = self.path_for(key).read_bytes()
+        except OSError:
+            with self._lock:
+                size = self._disk.pop(key, 0)
+                self._disk_bytes -= size
+                self.counters["misses"] += 1
+            return None
+        with self._lock:
+            self.counters["disk_hits"] += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> Path:
+        path = self.path_for(key)
+        with self._lock:
+            known = key in self._disk
+        if not known:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+            self._disk.move_to_end(key)
+            self._remember(key, data)
+            self._evict()
+        return path
+
+    def link(self, key: str, dest: str, data: Optional[bytes] = None) -> str:
+        """
+        Make the cached clip available at `dest` as a hard link and return
+        `dest`. Where hard links fail (e.g. across filesystems) the clip is
+        copied, from the cache file or from `data` if it was evicted, so a
+        session never references the cache itself. Returns "" if neither works.
+        """
+        src = self.path_for(key)
+        try:
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            os.link(src, dest)
+            return str(dest)
+        except FileExistsError:
+            return str(dest)
+        except OSError as e:
+            self.logger.debug("tts.cache.link_failed err=%s -> copying", e)
+        tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                shutil.copyfile(src, tmp)
+            except OSError:
+                if data is None:
+                    raise
+                Path(tmp).write_bytes(data)
+            os.replace(tmp, dest)
+            return str(dest)
+        except OSError as e:
+            self.logger.warning("tts.cache.copy_failed key=%s dest=%s err=%s", key[:12], dest, e)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return ""
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_bytes // 4:
+            return
+        if key in self._mem:
+            self._mem.move_to_end(key)
+            return
+        self._mem[key] = data
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.memory_bytes and self._mem:
+            _, old = self._mem.popitem(last=False)
+            self._mem_bytes -= len(old)
+
+    def _evict(self) -> None:
+        while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old)
+            try:
+                self.path_for(key).unlink()
+            except OSError:
+                pass
+            self.counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.counters)
+            out.update({
+                "clips": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "memory_clips": len(self._mem),
+                "memory_bytes": self._mem_bytes,
+            })
+        return out
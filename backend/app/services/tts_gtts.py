@@ -1,11 +1,37 @@
 from gtts import gTTS
 from io import BytesIO
+from typing import Optional, Tuple
+
+from .tts_cache import TTSCache
+
 
 class GTTSService:
-    def synthesize(self, text: str, lang: str) -> bytes:
-        if not text:
-            return b""
-        tts = gTTS(text=text, lang=lang)
+    ENGINE = "gtts"
+
+    def __init__(self, cache: Optional[TTSCache] = None, voice: str = "com"):
+        # gTTS "voice" is the Google Translate domain (tld) that picks the accent
+        self.cache = cache
+        self.voice = voice or "com"
+
+    def _render(self, text: str, lang: str) -> bytes:
+        tts = gTTS(text=text, lang=lang, tld=self.voice)
         fp = BytesIO()
         tts.write_to_fp(fp)
         return fp.getvalue()
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        return self.synthesize_clip(text, lang)[0]
+
+    def synthesize_clip(self, text: str, lang: str) -> Tuple[bytes, str]:
+        """Returns (mp3 bytes, cache key); the key is "" when no cache is attached."""
+        if not text:
+            return b"", ""
+        if not self.cache:
+            return self._render(text, lang), ""
+        key = TTSCache.key(lang, text, self.ENGINE, self.voice)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._render(text, lang)
+            if data:
+                self.cache.put(key, data)
+        return data, key
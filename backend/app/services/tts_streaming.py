@@ -0,0 +1,134 @@
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .tts_cache import TTSCache
+from .tts_gtts import GTTSService
+
+# Sentence ends (Latin, Devanagari danda, CJK) and weaker clause breaks
+_SENTENCE = re.compile(r"(?<=[.!?।॥。！？])\s+|(?<=[。！？])")
+_CLAUSE = re.compile(r"(?<=[,;:،、，；：])\s*")
+# Full-width punctuation is not followed by a space in the source text
+_NO_SPACE_AFTER = "。！？、，；："
+
+
+def _join(head: str, tail: str) -> str:
+    if not head:
+        return tail
+    return head + tail if head[-1] in _NO_SPACE_AFTER else f"{head} {tail}"
+
+
+def split_clauses(text: str, max_chars: int = 120, first_chars: int = 60, min_chars: int = 12) -> List[str]:
+    """
+    Split `text` into speakable pieces: sentences first, then clauses for
+    long sentences, then words as a last resort. The first piece is capped
+    at `first_chars` so it synthesizes fast; fragments under `min_chars`
+    are merged into their neighbour (gTTS adds a pause per request).
+    """
+    text = " ".join((text or "").split())
+    if not text:
+        return []
+    pieces: List[str] = []
+    for sentence in filter(None, _SENTENCE.split(text)):
+        limit = first_chars if not pieces else max_chars
+        if len(sentence) <= limit:
+            pieces.append(sentence)
+            continue
+        buf = ""
+        for clause in filter(None, _CLAUSE.split(sentence)):
+            limit = first_chars if not pieces else max_chars
+            if buf and len(buf) + 1 + len(clause) > limit:
+                pieces.append(buf)
+                buf = ""
+            buf = _join(buf, clause)
+            while len(buf) > (first_chars if not pieces else max_chars):
+                # One clause is still too long: break it between words
+                limit = first_chars if not pieces else max_chars
+                cut = buf.rfind(" ", 0, limit)
+                if cut <= 0:
+                    cut = limit
+                pieces.append(buf[:cut].strip())
+                buf = buf[cut:].strip()
+        if buf:
+            pieces.append(buf)
+    merged: List[str] = []
+    for piece in pieces:
+        limit = first_chars if len(merged) == 1 else max_chars
+        if merged and (len(piece) < min_chars or len(merged[-1]) < min_chars) and len(_join(merged[-1], piece)) <= limit:
+            merged[-1] = _join(merged[-1], piece)
+        else:
+            merged.append(piece)
+    return merged
+
+
+class StreamingTTS:
+    """
+    Synthesizes a translated chunk piece by piece.
+
+    The text is split at sentence/clause boundaries (`split_clauses`) and
+    every piece is rendered concurrently on a shared pool of `workers`
+    threads (gTTS is one HTTP request per piece, each cached on its own).
+    `on_piece(index, mp3_bytes)` is called in order as soon as each piece
+    and all pieces before it are ready, so the first audio goes out after
+    the first clause rather than the whole text. MP3 frames concatenate
+    cleanly, so the joined pieces are the segment's single clip; it is
+    stored in the TTS cache under the full-text key, and a later identical
+    text is served from there as one piece.
+    """
+
+    def __init__(self, tts: GTTSService, workers: int = 4, max_chars: int = 120, first_chars: int = 60):
+        self.logger = logging.getLogger("rt_dub")
+        self.tts = tts
+        self.max_chars = max(20, int(max_chars))
+        self.first_chars = max(10, min(int(first_chars), self.max_chars))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="tts-piece")
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"texts": 0, "pieces": 0, "whole_hits": 0}
+
+    def synthesize_clip(self, text: str, lang: str, on_piece: Optional[Callable[[int, bytes], None]] = None) -> Tuple[bytes, str]:
+        """Returns (mp3 bytes of the whole text, cache key or "") like GTTSService.synthesize_clip."""
+        if not text:
+            return b"", ""
+        cache = self.tts.cache
+        key = TTSCache.key(lang, text, self.tts.ENGINE, self.tts.voice) if cache else ""
+        if cache:
+            data = cache.get(key)
+            if data is not None:
+                with self._lock:
+                    self.counters["whole_hits"] += 1
+                if on_piece:
+                    on_piece(0, data)
+                return data, key
+
+        pieces = split_clauses(text, self.max_chars, self.first_chars)
+        if len(pieces) <= 1:
+            data, key = self.tts.synthesize_clip(text, lang)
+            if on_piece and data:
+                on_piece(0, data)
+            return data, key
+
+        futures = [self._pool.submit(self.tts.synthesize, piece, lang) for piece in pieces]
+        parts: List[bytes] = []
+        try:
+            for i, fut in enumerate(futures):
+                data = fut.result()
+                parts.append(data)
+                if on_piece and data:
+                    on_piece(i, data)
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            raise
+        with self._lock:
+            self.counters["texts"] += 1
+            self.counters["pieces"] += len(pieces)
+        clip = b"".join(parts)
+        if cache and clip:
+            cache.put(key, clip)
+        return clip, key
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
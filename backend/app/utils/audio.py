@@ -1,53 +1,55 @@
-import subprocess
-import tempfile
-import os
-from pathlib import Path
+import io
+import wave
 
-# Transcodes given input bytes (e.g., webm/opus) to WAV PCM16 mono 16kHz
-# Returns path to temporary wav file (caller should delete) and duration (best-effort)
+import numpy as np
 
-def transcode_to_wav_mono_16k(input_bytes: bytes, input_suffix: str = ".webm"):
-    tmpdir = tempfile.mkdtemp(prefix="rt_dub_")
-    in_path = os.path.join(tmpdir, f"in{input_suffix}")
-    out_path = os.path.join(tmpdir, "out.wav")
-    with open(in_path, "wb") as f:
-        f.write(input_bytes)
-    # Resolve ffmpeg/ffprobe
-    FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
-    FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
 
-    # Force format detection for chunked webm/ogg files
-    # Use -f to bypass header parsing issues
-    input_format = None
-    if input_suffix == ".webm":
-        input_format = "webm"
-    elif input_suffix == ".ogg":
-        input_format = "ogg"
-    
-    cmd = [FFMPEG_BIN, "-y"]
-    if input_format:
-        cmd.extend(["-f", input_format])
-    cmd.extend([
-        "-i", in_path,
-        "-ac", "1",
-        "-ar", "16000",
-        out_path
-    ])
-    # Run ffmpeg and capture stderr for debugging
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-    if result.returncode != 0:
-        import logging
-        logger = logging.getLogger("rt_dub")
-        logger.error("ffmpeg failed: returncode=%d stderr=%s", result.returncode, result.stderr)
-        raise RuntimeError(f"FFmpeg transcode failed (exit {result.returncode}): {result.stderr[:500]}")
-    # Attempt to probe duration
-    dur = 0.0
-    try:
-        probe = subprocess.run([
-            FFPROBE_BIN, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", in_path
-        ], capture_output=True, text=True)
-        if probe.returncode == 0 and probe.stdout.strip():
-            dur = float(probe.stdout.strip())
-    except Exception:
-        pass
-    return out_path, dur, tmpdir
+def pcm16_to_wav_bytes(pcm: bytes, sample_rate: int = 16000) -> bytes:
+    """Wrap raw PCM16 mono samples in an in-memory WAV container."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buf.getvalue()
+
+
+def _lowpass(x: np.ndarray, cutoff: float, taps: int = 101) -> np.ndarray:
+    """Windowed-sinc FIR low-pass; `cutoff` is a fraction of the input rate (< 0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2.0
+    h = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.hamming(taps)
+    # "full" then centre-trim: mode="same" returns len(h) samples for inputs shorter than the filter
+    return np.convolve(x, h / h.sum())[(taps - 1) // 2:(taps - 1) // 2 + len(x)]
+
+
+def wav_bytes_to_pcm16(wav_bytes: bytes, sample_rate: int = 16000) -> bytes:
+    """
+    Decode a PCM16 WAV payload in-process to PCM16 mono at `sample_rate`.
+    Downmixes channels and resamples with NumPy (low-passed below the new
+    Nyquist rate when downsampling); no ffmpeg spawn needed. Other sample
+    formats raise wave.Error or ValueError so the caller can use ffmpeg.
+    """
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+    if width != 2:
+        raise ValueError(f"unsupported WAV sample width: {width}")
+    samples = np.frombuffer(frames, dtype="<i2")
+    if channels == 1 and rate == sample_rate:
+        return samples.tobytes()
+    x = samples.astype(np.float32)
+    if channels > 1:
+        x = x[: len(x) - len(x) % channels].reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate and len(x):
+        if rate > sample_rate:
+            # Keep a margin below the output Nyquist for the filter's transition band
+            x = _lowpass(x, 0.45 * sample_rate / rate)
+        if rate % sample_rate == 0:
+            x = x[:: rate // sample_rate]
+        else:
+            n_out = int(round(len(x) * sample_rate / rate))
+            x = np.interp(np.linspace(0, len(x) - 1, n_out), np.arange(len(x)), x)
+    return np.clip(np.rint(x), -32768, 32767).astype("<i2").tobytes()
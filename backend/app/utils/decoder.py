@@ -0,0 +1,457 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+import wave
+from typing import Dict, Optional, Tuple
+
+from .audio import wav_bytes_to_pcm16
+
+# Long-lived ffmpeg decoders: container bytes (webm/ogg opus, ...) on stdin,
+# PCM16 mono on stdout. Used by the streaming socket and, per session, by
+# /api/chunk so a continuous encoded stream is decoded without temp files,
+# per-chunk process spawns or ffprobe.
+
+
+class StreamDecoder:
+    def __init__(self, input_format: str, sample_rate: int = 16000):
+        self.input_format = input_format
+        self.sample_rate = int(sample_rate)
+        self.logger = logging.getLogger("rt_dub")
+        self._buf = bytearray()
+        self._cond = threading.Condition()
+        self._eof = False
+        FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+        cmd = [
+            FFMPEG_BIN, "-hide_banner", "-loglevel", "error",
+            "-f", input_format, "-i", "pipe:0",
+            "-ac", "1", "-ar", str(self.sample_rate),
+            "-f", "s16le", "pipe:1",
+        ]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._reader = threading.Thread(target=self._read_loop, name="ffmpeg-decoder", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self) -> None:
+        fd = self.proc.stdout.fileno()
+        try:
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                with self._cond:
+                    self._buf.extend(chunk)
+                    self._cond.notify_all()
+        except Exception as e:
+            self.logger.warning("decoder.read_failed fmt=%s err=%s", self.input_format, e)
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def feed(self, data: bytes) -> None:
+        if not data:
+            return
+        self.proc.stdin.write(data)
+        self.proc.stdin.flush()
+
+    def read(self, wait: float = 0.0) -> bytes:
+        """Drain decoded PCM. With `wait`, block up to that many seconds for the first bytes."""
+        deadline = time.monotonic() + wait
+        with self._cond:
+            while not self._buf and not self._eof:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            out = bytes(self._buf)
+            self._buf.clear()
+        return out
+
+    def read_upto(self, nbytes: int, wait: float = 3.0) -> bytes:
+        """
+        Wait up to `wait` seconds until `nbytes` of PCM are buffered and
+        return at most that much; anything beyond stays for the next read.
+        """
+        deadline = time.monotonic() + wait
+        with self._cond:
+            while len(self._buf) < nbytes and not self._eof:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            out = bytes(self._buf[:nbytes])
+            del self._buf[:nbytes]
+        return out
+
+    def read_settled(self, first_wait: float = 3.0, settle: float = 0.12) -> bytes:
+        """
+        Collect PCM produced for the bytes just fed: wait up to `first_wait`
+        for output to start, then keep draining until it stays quiet for `settle`.
+        """
+        out = bytearray(self.read(first_wait))
+        if not out:
+            return b""
+        while True:
+            more = self.read(settle)
+            if not more:
+                break
+            out.extend(more)
+        return bytes(out)
+
+    def finish(self, timeout: float = 5.0) -> bytes:
+        """Close stdin and return everything ffmpeg still had buffered."""
+        try:
+            self.proc.stdin.close()
+        except Exception:
+            pass
+        self._reader.join(timeout)
+        self.close()
+        with self._cond:
+            out = bytes(self._buf)
+            self._buf.clear()
+        return out
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.close()
+            except Exception:
+                pass
+            try:
+                self.proc.wait(timeout=2)
+            except Exception:
+                self.proc.kill()
+
+
+# Client stream formats accepted by the streaming socket -> ffmpeg demuxer.
+# Anything else is rejected: the value would otherwise reach ffmpeg's -f
+# verbatim and select arbitrary (network, device, concat) input formats.
+STREAM_FORMATS = {
+    "webm": "webm",
+    "opus": "webm",
+    "ogg": "ogg",
+    "wav": "wav",
+    "mp4": "mp4",
+    "m4a": "mp4",
+}
+PCM_FORMATS = ("", "pcm", "pcm16", "s16le")
+
+
+def decode_once(content: bytes, input_format: str, sample_rate: int = 16000) -> bytes:
+    """Decode one self-contained payload with a single ffmpeg run; returns PCM16 mono."""
+    FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+    cmd = [
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "error",
+        "-f", input_format, "-i", "pipe:0",
+        "-ac", "1", "-ar", str(int(sample_rate)),
+        "-f", "s16le", "pipe:1",
+    ]
+    res = subprocess.run(cmd, input=content, capture_output=True)
+    if res.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed (exit {res.returncode}): {res.stderr.decode('utf-8', 'ignore')[:500]}")
+    return res.stdout
+
+
+def stream_format_for(fmt: str) -> Optional[str]:
+    """
+    Map a client-declared stream format to an ffmpeg demuxer (None = raw PCM16).
+    Accepts a bare name or a MIME type such as "audio/webm;codecs=opus";
+    raises ValueError for anything outside STREAM_FORMATS.
+    """
+    name = (fmt or "").split(";", 1)[0].strip().lower()
+    if name in PCM_FORMATS:
+        return None
+    name = name.rsplit("/", 1)[-1]
+    if name.startswith("x-"):
+        name = name[2:]
+    demuxer = STREAM_FORMATS.get(name)
+    if demuxer is None:
+        raise ValueError(f"unsupported stream format {fmt!r}; use pcm16 or one of {', '.join(STREAM_FORMATS)}")
+    return demuxer
+
+
+_EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+
+def _demuxer_for_suffix(suffix: str) -> str:
+    return {".ogg": "ogg", ".mp3": "mp3", ".mp4": "mp4"}.get(suffix, "webm")
+
+
+def _vint(buf: bytearray, pos: int, keep_marker: bool) -> Optional[Tuple[int, int]]:
+    """EBML variable-size integer at `pos` -> (value, length); value -1 = unknown size."""
+    if pos >= len(buf) or buf[pos] == 0:
+        return None
+    length = 8 - buf[pos].bit_length() + 1
+    if pos + length > len(buf):
+        return None
+    value = int.from_bytes(buf[pos:pos + length], "big")
+    if keep_marker:
+        return value, length
+    value &= (1 << (7 * length)) - 1
+    return (-1 if value == (1 << (7 * length)) - 1 else value), length
+
+
+class WebmClock:
+    """
+    Demuxed duration of a WebM byte stream fed in pieces: the start of the
+    latest (Simple)Block, in ms after the first one. Only element headers,
+    cluster timecodes and block timecodes are read; MediaRecorder writes
+    Segment and Cluster with unknown sizes, so masters are descended into.
+    """
+
+    MASTERS = {0x18538067, 0x1F43B675, 0xA0, 0x1549A966}  # Segment, Cluster, BlockGroup, Info
+    CLUSTER_TIMECODE, TIMECODE_SCALE = 0xE7, 0x2AD7B1
+    BLOCKS = {0xA3, 0xA1}  # SimpleBlock, Block
+    MAX_ELEMENT = 16 << 20
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._scale = 1_000_000  # ns per timecode tick
+        self._cluster = 0
+        self._first: Optional[int] = None
+        self._last: Optional[int] = None
+        self.broken = False
+
+    def feed(self, data: bytes) -> Optional[float]:
+        """Parse `data`; returns ms covered so far, None before the first block or once unparseable."""
+        if self.broken:
+            return None
+        buf = self._buf
+        buf.extend(data)
+        pos = 0
+        while True:
+            eid = _vint(buf, pos, True)
+            size = eid and _vint(buf, pos + eid[1], False)
+            if not size:
+                break
+            head = eid[1] + size[1]
+            if eid[0] in self.MASTERS or size[0] < 0:
+                pos += head
+                continue
+            if size[0] > self.MAX_ELEMENT:
+                self.broken = True
+                break
+            if pos + head + size[0] > len(buf):
+                break
+            body = bytes(buf[pos + head:pos + head + size[0]])
+            if eid[0] == self.CLUSTER_TIMECODE:
+                self._cluster = int.from_bytes(body, "big")
+            elif eid[0] == self.TIMECODE_SCALE:
+                self._scale = int.from_bytes(body, "big") or self._scale
+            elif eid[0] in self.BLOCKS:
+                track = _vint(bytearray(body), 0, False)
+                if track and len(body) >= track[1] + 2:
+                    rel = int.from_bytes(body[track[1]:track[1] + 2], "big", signed=True)
+                    ts = (self._cluster + rel) * self._scale
+                    if self._first is None:
+                        self._first = ts
+                    self._last = ts if self._last is None else max(self._last, ts)
+            pos += head + size[0]
+        del buf[:pos]
+        if self.broken or self._first is None:
+            return None
+        return (self._last - self._first) / 1e6
+
+
+class OggClock:
+    """
+    Demuxed duration of an Ogg Opus/Vorbis byte stream fed in pieces, from
+    page granule positions. The last 20 ms are held back: the decoder and
+    resampler may keep that much until the next page arrives.
+    """
+
+    HOLD_MS = 20.0
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._rate = 0
+        self._preskip = 0
+        self._end: Optional[int] = None
+        self.broken = False
+
+    def feed(self, data: bytes) -> Optional[float]:
+        if self.broken:
+            return None
+        buf = self._buf
+        buf.extend(data)
+        pos = 0
+        while pos + 27 <= len(buf):
+            if buf[pos:pos + 4] != b"OggS":
+                self.broken = True
+                break
+            nsegs = buf[pos + 26]
+            if pos + 27 + nsegs > len(buf):
+                break
+            body = sum(buf[pos + 27:pos + 27 + nsegs])
+            start = pos + 27 + nsegs
+            if start + body > len(buf):
+                break
+            granule = int.from_bytes(buf[pos + 6:pos + 14], "little", signed=True)
+            packet = bytes(buf[start:start + 19])
+            if packet.startswith(b"OpusHead"):
+                self._rate, self._preskip = 48000, int.from_bytes(packet[10:12], "little")
+            elif packet.startswith(b"\x01vorbis"):
+                self._rate = int.from_bytes(packet[12:16], "little")
+            elif granule >= 0 and self._rate:
+                self._end = granule - self._preskip
+            pos = start + body
+        del buf[:pos]
+        if self.broken or self._end is None:
+            return None
+        return max(0.0, self._end * 1000.0 / self._rate - self.HOLD_MS)
+
+
+STREAM_CLOCKS = {"webm": WebmClock, "ogg": OggClock}
+
+
+class SessionDecoder:
+    """
+    Per-session chunk decoder that returns 16 kHz mono PCM16 in memory.
+
+    PCM16 WAV chunks are parsed in-process (other WAV sample formats go
+    through a one-shot ffmpeg run). Container chunks (webm/ogg) go through
+    one persistent ffmpeg pipe that is restarted when it dies or when a new
+    stream header shows up; a restart flushes the old pipe first, so its
+    tail joins the current chunk. Duration comes from the sample count.
+
+    How much PCM a webm/ogg chunk gets is bounded by the container: block
+    timecodes (WebmClock) or page granules (OggClock) give the audio the
+    stream covers so far, and the chunk gets exactly that minus what was
+    already handed out, waiting up to `wait` for ffmpeg. Formats without a
+    clock fall back to reading until the output settles.
+    """
+
+    def __init__(self, session_id: str, sample_rate: int = 16000, wait: float = 3.0):
+        self.session_id = session_id
+        self.sample_rate = sample_rate
+        self.wait = wait
+        self.logger = logging.getLogger("rt_dub")
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.restarts = 0
+        self._stream: Optional[StreamDecoder] = None
+        self._stream_fmt = ""
+        self._fed = 0
+        self._clock = None
+        self._delivered = 0  # samples handed out from the current stream
+
+    def _start(self, fmt: str) -> Tuple[StreamDecoder, bytes]:
+        """(Re)start the pipe; returns it with the old pipe's flushed tail."""
+        tail = b""
+        if self._stream:
+            tail = self._stream.finish()
+            self.restarts += 1
+        self._stream = StreamDecoder(fmt, self.sample_rate)
+        self._stream_fmt = fmt
+        self._fed = 0
+        clock = STREAM_CLOCKS.get(fmt)
+        self._clock = clock() if clock else None
+        self._delivered = 0
+        return self._stream, tail
+
+    def _feed_and_read(self, stream: StreamDecoder, content: bytes) -> bytes:
+        stream.feed(content)
+        self._fed += len(content)
+        covered = self._clock.feed(content) if self._clock else None
+        if covered is None and self._clock is not None and not self._clock.broken:
+            return b""  # headers only, no audio yet
+        if covered is None:
+            pcm = stream.read_settled(self.wait)
+        else:
+            # Exactly the audio this chunk completes; a slow ffmpeg can't shift PCM into the next chunk
+            need = int(covered * self.sample_rate / 1000) - self._delivered
+            pcm = stream.read_upto(2 * need, self.wait) if need > 0 else b""
+        self._delivered += len(pcm) // 2
+        return pcm
+
+    def _decode_stream(self, content: bytes, fmt: str) -> bytes:
+        stream = self._stream
+        tail = b""
+        new_header = fmt == "webm" and content[:4] == _EBML_MAGIC and self._fed > 0
+        if stream is None or not stream.alive or fmt != self._stream_fmt or new_header:
+            if stream is not None and not stream.alive:
+                self.logger.warning("decoder.restart sid=%s fmt=%s", self.session_id, fmt)
+            stream, tail = self._start(fmt)
+        try:
+            pcm = self._feed_and_read(stream, content)
+        except (BrokenPipeError, OSError) as e:
+            self.logger.warning("decoder.pipe_failed sid=%s err=%s", self.session_id, e)
+            pcm = b""
+        if not pcm and not stream.alive:
+            # Crashed mid-chunk: restart once and replay this chunk
+            self.logger.warning("decoder.crashed sid=%s fmt=%s -> restarting", self.session_id, fmt)
+            stream, lost = self._start(fmt)
+            tail += lost
+            pcm = self._feed_and_read(stream, content)
+        return tail + pcm
+
+    def decode(self, content: bytes, suffix: str) -> Tuple[bytes, float]:
+        with self.lock:
+            self.last_used = time.monotonic()
+            if suffix == ".wav":
+                try:
+                    pcm = wav_bytes_to_pcm16(content, self.sample_rate)
+                except (wave.Error, ValueError, EOFError) as e:
+                    # 24-bit, float or WAVE_FORMAT_EXTENSIBLE payloads: let ffmpeg convert them
+                    self.logger.info("decoder.wav_fallback sid=%s err=%s", self.session_id, e)
+                    pcm = decode_once(content, "wav", self.sample_rate)
+            else:
+                pcm = self._decode_stream(content, _demuxer_for_suffix(suffix))
+            return pcm, len(pcm) / 2.0 / self.sample_rate
+
+    def close(self) -> None:
+        if self._stream:
+            self._stream.close()
+            self._stream = None
+
+
+class DecoderPool:
+    """Keeps one SessionDecoder per session and reaps idle ones."""
+
+    def __init__(self, idle_timeout: float = 120.0, sample_rate: int = 16000):
+        self.idle_timeout = idle_timeout
+        self.sample_rate = sample_rate
+        self.logger = logging.getLogger("rt_dub")
+        self._decoders: Dict[str, SessionDecoder] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SessionDecoder:
+        with self._lock:
+            dec = self._decoders.get(session_id)
+            if dec is None:
+                dec = SessionDecoder(session_id, self.sample_rate)
+                self._decoders[session_id] = dec
+            return dec
+
+    def decode(self, session_id: str, content: bytes, suffix: str) -> Tuple[bytes, float]:
+        return self.get(session_id).decode(content, suffix)
+
+    def close(self, session_id: str) -> None:
+        with self._lock:
+            dec = self._decoders.pop(session_id, None)
+        if dec:
+            dec.close()
+
+    def reap_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [sid for sid, d in self._decoders.items() if d.last_used < cutoff]
+            reaped = [self._decoders.pop(sid) for sid in idle]
+        for dec in reaped:
+            dec.close()
+        if reaped:
+            self.logger.info("decoder.reaped count=%d", len(reaped))
+        return len(reaped)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "active": len(self._decoders),
+                "restarts": sum(d.restarts for d in self._decoders.values()),
+            }
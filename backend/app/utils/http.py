@@ -0,0 +1,130 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except Exception:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    H2_AVAILABLE = True
+except Exception:
+    H2_AVAILABLE = False
+
+# Shared outbound HTTP clients. Every provider talks to the same few hosts,
+# so connections are pooled per host and kept alive across chunks instead
+# of paying a fresh TCP + TLS handshake per request. The sync client is an
+# httpx.Client with HTTP/2 when httpx and h2 are installed, otherwise a
+# requests.Session; both expose post/get with json/params/headers/timeout.
+# Pool sizes and timeouts come from Settings.HTTP_* via configure().
+
+logger = logging.getLogger("rt_dub")
+
+POOL_HOSTS = 16
+POOL_PER_HOST = 32
+DEFAULT_TIMEOUT = 10.0
+KEEPALIVE_EXPIRY = 60.0
+USE_HTTP2 = HTTPX_AVAILABLE and H2_AVAILABLE
+
+_lock = threading.Lock()
+_clients: Dict[str, Any] = {}
+_async_clients: Dict[str, Any] = {}
+
+
+def configure(pool_hosts: int = 16, pool_per_host: int = 32, timeout: float = 10.0, keepalive_seconds: float = 60.0, http2: bool = True) -> None:
+    """Set pool sizes and timeouts for clients created afterwards (call at startup)."""
+    global POOL_HOSTS, POOL_PER_HOST, DEFAULT_TIMEOUT, KEEPALIVE_EXPIRY, USE_HTTP2
+    POOL_HOSTS = max(1, int(pool_hosts))
+    POOL_PER_HOST = max(1, int(pool_per_host))
+    DEFAULT_TIMEOUT = float(timeout)
+    KEEPALIVE_EXPIRY = float(keepalive_seconds)
+    USE_HTTP2 = bool(http2) and HTTPX_AVAILABLE and H2_AVAILABLE
+    if http2 and not USE_HTTP2:
+        logger.info("http.http2.unavailable httpx=%s h2=%s; using HTTP/1.1", HTTPX_AVAILABLE, H2_AVAILABLE)
+
+
+def _new_sync_client():
+    if USE_HTTP2:
+        return httpx.Client(
+            http2=True,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=POOL_HOSTS * POOL_PER_HOST,
+                max_keepalive_connections=POOL_HOSTS * POOL_PER_HOST,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_client(name: str = "default"):
+    """Process-wide pooled sync client; `name` separates pools with different lifetimes."""
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _new_sync_client()
+                _clients[name] = client
+                logger.info("http.client.created name=%s kind=%s http2=%s", name, type(client).__name__, USE_HTTP2)
+    return client
+
+
+def get_async_client(name: str = "default"):
+    """Pooled httpx.AsyncClient for code running on the event loop (None when httpx is missing)."""
+    if not HTTPX_AVAILABLE:
+        return None
+    client = _async_clients.get(name)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=USE_HTTP2,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=POOL_HOSTS * POOL_PER_HOST,
+                max_keepalive_connections=POOL_HOSTS * POOL_PER_HOST,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+        _async_clients[name] = client
+    return client
+
+
+def close_all() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        try:
+            c.close()
+        except Exception:
+            pass
+
+
+async def aclose_all() -> None:
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for c in clients:
+        try:
+            await c.aclose()
+        except Exception:
+            pass
+
+
+def stats() -> Dict[str, Optional[Any]]:
+    return {
+        "sync_clients": len(_clients),
+        "async_clients": len(_async_clients),
+        "http2": USE_HTTP2,
+        "pool_hosts": POOL_HOSTS,
+        "pool_per_host": POOL_PER_HOST,
+    }
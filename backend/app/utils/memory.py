@@ -0,0 +1,15 @@
+import os
+import resource
+
+# Best-effort resident memory of this process, used to attribute model
+# footprints (load-time RSS deltas) for registries and stats endpoints.
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        # ru_maxrss is a high-water mark (KiB on Linux), still useful as a fallback
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
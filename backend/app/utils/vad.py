@@ -0,0 +1,145 @@
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+try:
+    import webrtcvad
+    WEBRTC_AVAILABLE = True
+except Exception:
+    WEBRTC_AVAILABLE = False
+
+
+class VadResult:
+    """Speech span found in one chunk; offsets are relative to the chunk start."""
+
+    def __init__(self, pcm: bytes, speech_ms: int, total_ms: int, start_ms: int = 0, end_ms: int = 0):
+        self.pcm = pcm
+        self.speech_ms = speech_ms
+        self.total_ms = total_ms
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+
+    @property
+    def silent(self) -> bool:
+        return not self.pcm
+
+
+class VoiceActivityDetector:
+    """
+    Per-session frame classifier for PCM16 mono chunks.
+
+    The default mode is vectorized energy + zero-crossing: a frame is speech
+    when its energy is `threshold_db` above an adaptive noise floor and its
+    zero-crossing rate is not noise-like. The floor starts at, and never
+    rises above, the absolute `max_floor_db`, so a session that opens mid-
+    speech (or stays in speech) is not taken for noise; frames well above
+    that level always count as speech. mode="webrtc" uses webrtcvad when
+    installed. Speech flags are extended by a hangover (and one frame of
+    pre-roll) so word edges survive; the chunk is then trimmed to the first..
+    last speech frame, or dropped when it holds less than `min_speech_ms`.
+    The floor and the hangover carry over between chunks of a session.
+    """
+
+    def __init__(
+        self,
+        mode: str = "energy",
+        frame_ms: int = 30,
+        threshold_db: float = 9.0,
+        min_energy_db: float = -55.0,
+        max_floor_db: float = -45.0,
+        hangover_ms: int = 300,
+        min_speech_ms: int = 120,
+        aggressiveness: int = 2,
+    ):
+        self.logger = logging.getLogger("rt_dub")
+        self.mode = "webrtc" if (mode == "webrtc" and WEBRTC_AVAILABLE) else "energy"
+        if mode == "webrtc" and not WEBRTC_AVAILABLE:
+            self.logger.warning("vad.webrtc_unavailable falling back to energy")
+        self.frame_ms = frame_ms if frame_ms in (10, 20, 30) else 30
+        self.threshold_db = float(threshold_db)
+        self.min_energy_db = float(min_energy_db)
+        self.max_floor_db = float(max_floor_db)
+        self.hangover_frames = max(0, int(hangover_ms // self.frame_ms))
+        self.min_speech_ms = int(min_speech_ms)
+        self._webrtc = webrtcvad.Vad(int(aggressiveness)) if self.mode == "webrtc" else None
+        self._floor_db: Optional[float] = None
+        self._hang_left = 0
+        self.audio_ms = 0
+        self.speech_ms = 0
+        self.chunks = 0
+        self.skipped = 0
+
+    def _energy_flags(self, frames: np.ndarray) -> np.ndarray:
+        x = frames.astype(np.float32) / 32768.0
+        energy_db = 10.0 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        if self._floor_db is None:
+            # A chunk's own quietest frames are speech when it is speech throughout: cap the seed
+            self._floor_db = min(float(np.percentile(energy_db, 10)), self.max_floor_db)
+        flags = (energy_db > self._floor_db + self.threshold_db) & (energy_db > self.min_energy_db)
+        # Broadband noise (fans, hiss) crosses zero constantly; only loud frames keep it
+        flags &= (zcr < 0.35) | (energy_db > self._floor_db + 2 * self.threshold_db)
+        # Well above the absolute floor cap is speech whatever the adaptive floor says
+        flags |= energy_db > self.max_floor_db + 2 * self.threshold_db
+        quiet = energy_db[~flags]
+        if quiet.size:
+            # Track the floor slowly upwards, quickly downwards, never above the cap
+            target = float(np.median(quiet))
+            rate = 0.5 if target < self._floor_db else 0.1
+            self._floor_db = min(self._floor_db + rate * (target - self._floor_db), self.max_floor_db)
+        return flags
+
+    def _webrtc_flags(self, frames: np.ndarray, sample_rate: int) -> np.ndarray:
+        return np.array([self._webrtc.is_speech(f.tobytes(), sample_rate) for f in frames], dtype=bool)
+
+    def process(self, pcm: bytes, sample_rate: int = 16000) -> VadResult:
+        total_ms = int(len(pcm) // 2 * 1000 / sample_rate)
+        self.chunks += 1
+        self.audio_ms += total_ms
+        flen = int(sample_rate * self.frame_ms / 1000)
+        samples = np.frombuffer(pcm[: len(pcm) - len(pcm) % 2], dtype=np.int16)
+        n = len(samples) // flen if flen else 0
+        if n == 0:
+            return VadResult(pcm, total_ms, total_ms, 0, total_ms)
+        frames = samples[: n * flen].reshape(n, flen)
+        if self._webrtc is not None and sample_rate in (8000, 16000, 32000, 48000):
+            flags = self._webrtc_flags(frames, sample_rate)
+        else:
+            flags = self._energy_flags(frames)
+        raw_speech = int(flags.sum())
+        # Hangover after each speech frame (carried in from the previous chunk) and one frame of pre-roll
+        extended = np.convolve(flags.astype(np.int8), np.ones(self.hangover_frames + 1, dtype=np.int8))[:n] > 0
+        if self._hang_left:
+            extended[: self._hang_left] = True
+        extended[:-1] |= flags[1:]
+        idx = np.flatnonzero(flags)
+        self._hang_left = max(0, self.hangover_frames - (n - 1 - int(idx[-1]))) if idx.size else max(0, self._hang_left - n)
+        speech_ms = int(extended.sum()) * self.frame_ms
+        if raw_speech * self.frame_ms < self.min_speech_ms:
+            self.skipped += 1
+            return VadResult(b"", 0, total_ms)
+        on = np.flatnonzero(extended)
+        first, last = int(on[0]), int(on[-1])
+        # The sub-frame tail is kept when the last frame is speech
+        end = len(samples) if last == n - 1 else (last + 1) * flen
+        self.speech_ms += speech_ms
+        return VadResult(
+            samples[first * flen:end].tobytes(),
+            speech_ms,
+            total_ms,
+            first * self.frame_ms,
+            int(end * 1000 / sample_rate),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "chunks": self.chunks,
+            "skipped_chunks": self.skipped,
+            "audio_ms": self.audio_ms,
+            "speech_ms": self.speech_ms,
+            "speech_ratio": round(self.speech_ms / self.audio_ms, 3) if self.audio_ms else None,
+            "noise_floor_db": round(self._floor_db, 1) if self._floor_db is not None else None,
+        }
@@ -0,0 +1,105 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import argos_registry
+from app.services.argos_registry import ArgosModelRegistry, parse_pairs
+
+
+class Argos:
+    """Stands in for argostranslate's translate and package modules."""
+
+    def __init__(self, installed=(), available=()):
+        self.installed = set(installed)
+        self.available = set(available)
+        self.lookups = 0
+        self.index_refreshes = 0
+        self.installed_event = threading.Event()
+
+    # argostranslate.translate
+    def get_installed_languages(self):
+        self.lookups += 1
+        codes = {c for pair in self.installed for c in pair}
+        return [SimpleNamespace(code=c, get_translation=self._translation_from(c)) for c in sorted(codes)]
+
+    def _translation_from(self, src):
+        def get_translation(tgt):
+            if (src, tgt.code) not in self.installed:
+                return None
+            return SimpleNamespace(pair=(src, tgt.code), translate=lambda text: f"{tgt.code}:{text}")
+        return get_translation
+
+    # argostranslate.package
+    def update_package_index(self):
+        self.index_refreshes += 1
+
+    def get_available_packages(self):
+        return [SimpleNamespace(from_code=s, to_code=t, download=lambda s=s, t=t: (s, t)) for s, t in self.available]
+
+    def install_from_path(self, pair):
+        self.installed.add(pair)
+        self.installed_event.set()
+
+
+@pytest.fixture
+def argos(monkeypatch):
+    fake = Argos(installed={("en", "hi"), ("es", "en")})
+    monkeypatch.setattr(argos_registry, "ARGOS_AVAILABLE", True)
+    monkeypatch.setattr(argos_registry, "argos_translate", fake, raising=False)
+    monkeypatch.setattr(argos_registry, "argos_package", fake, raising=False)
+    return fake
+
+
+def test_parse_pairs():
+    assert parse_pairs(" en:hi, es:en ,bad,:x") == [("en", "hi"), ("es", "en")]
+
+
+def test_pairs_resolve_once_and_are_shared(argos):
+    registry = ArgosModelRegistry(auto_install=False)
+    first = registry.get("en", "hi")
+    lookups = argos.lookups
+
+    assert registry.get("en", "hi") is first
+    # An empty source means English
+    assert registry.get("", "hi") is first
+    assert argos.lookups == lookups
+    info = registry.stats()["models"]["en->hi"]
+    assert info["requests"] == 2 and "load_ms" in info and "rss_delta_mb" in info
+
+
+def test_misses_are_remembered_and_never_touch_the_index(argos):
+    registry = ArgosModelRegistry(auto_install=False, miss_ttl=60)
+
+    assert registry.get("en", "fr") is None
+    lookups = argos.lookups
+    assert registry.get("en", "fr") is None
+    assert argos.lookups == lookups
+    assert argos.index_refreshes == 0
+    assert registry.stats()["missing"] == ["en->fr"]
+
+
+def test_a_miss_installs_in_the_background_once(argos):
+    argos.available.add(("en", "fr"))
+    registry = ArgosModelRegistry(miss_ttl=0)
+
+    assert registry.get("en", "fr") is None  # served as a miss while installing
+    assert argos.installed_event.wait(5)
+    deadline = time.monotonic() + 5
+    while not registry.loaded("en", "fr"):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    assert registry.get("en", "fr").translate("hi") == "fr:hi"
+    assert argos.index_refreshes == 1
+    stats = registry.stats()
+    assert stats["installing"] == [] and stats["missing"] == []
+
+
+def test_preload_warms_configured_pairs(argos):
+    registry = ArgosModelRegistry(auto_install=False)
+    registry.preload([("", "hi"), ("es", "en"), ("en", "de")]).join(5)
+
+    assert registry.loaded("en", "hi") and registry.loaded("es", "en")
+    assert not registry.loaded("en", "de")
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from app.services.asr_pool import AsrWorkerTimeout, VoskWorkerPool
+
+
+class FakeAsr:
+    """Stands in for VoskModelRegistry in the forked workers; b"hang" never returns in time."""
+
+    def transcribe_pcm(self, pcm, sample_rate, lang):
+        if pcm == b"hang":
+            time.sleep(60)
+        if pcm == b"slow":
+            time.sleep(0.3)
+        return f"{len(pcm)}@{sample_rate}"
+
+    def open_stream(self, sample_rate, lang):
+        return FakeStream()
+
+
+class FakeStream:
+    def accept(self, pcm):
+        return [{"type": "partial", "text": str(len(pcm))}]
+
+    def finish(self):
+        return []
+
+
+@pytest.fixture
+def pool():
+    p = VoskWorkerPool(FakeAsr(), processes=1, call_timeout=0.5)
+    yield p
+    p.shutdown()
+
+
+def test_call_past_its_deadline_kills_and_respawns_the_worker(pool):
+    assert pool.transcribe("s1", b"\0" * 4) == "4@16000"
+    old_pid = pool.workers[0].proc.pid
+
+    errors = []
+
+    def hang():
+        try:
+            pool.transcribe("s1", b"hang")
+        except Exception as e:
+            errors.append(e)
+
+    t0 = time.monotonic()
+    caller = threading.Thread(target=hang)
+    caller.start()
+    time.sleep(0.1)
+    queued = pool.submit("s1", "transcribe", b"\0" * 2, 16000, "")
+    caller.join(timeout=5)
+    assert time.monotonic() - t0 < 5
+    assert len(errors) == 1 and isinstance(errors[0], AsrWorkerTimeout)
+
+    stats = pool.stats()["workers"][0]
+    assert (stats["restarts"], stats["timeouts"], stats["alive"]) == (1, 1, True)
+    assert pool.workers[0].proc.pid != old_pid
+    # A stateless job queued behind the hung one reruns on the new worker
+    assert queued.result(timeout=2) == "2@16000"
+    assert stats["requeued"] == 1
+    assert pool.transcribe("s1", b"\0" * 6) == "6@16000"
+
+
+def test_queue_wait_does_not_count_toward_the_deadline(pool):
+    # Each job runs 0.3 s, under the 0.5 s deadline, but the last one waits ~0.6 s in the queue
+    futures = [pool.submit("s1", "transcribe", b"slow", 16000, "") for _ in range(2)]
+    assert pool.transcribe("s1", b"slow") == "4@16000"
+    assert [f.result(timeout=2) for f in futures] == ["4@16000"] * 2
+    stats = pool.stats()["workers"][0]
+    assert (stats["restarts"], stats["timeouts"]) == (0, 0)
+
+
+def test_wedged_job_without_a_caller_is_reaped(pool):
+    stream = pool.open_stream("s1")
+    assert stream.accept(b"\0" * 8) == [{"type": "partial", "text": "8"}]
+    hung = pool.submit("s1", "transcribe", b"hang", 16000, "")
+
+    with pytest.raises(AsrWorkerTimeout):
+        hung.result(timeout=5)
+    assert pool.stats()["workers"][0]["timeouts"] == 1
+    # The recognizer died with the old worker
+    with pytest.raises(RuntimeError):
+        stream.accept(b"\0" * 8)
+    assert pool.transcribe("s1", b"\0" * 6) == "6@16000"
@@ -0,0 +1,91 @@
+import pytest
+
+from app.services import asr_registry
+from app.services.asr_registry import VoskModelRegistry, parse_model_paths
+
+
+class Model:
+    def __init__(self, path):
+        self.path = path
+
+    def transcribe_pcm(self, pcm, sample_rate=16000):
+        return f"{self.path}:{len(pcm)}"
+
+
+@pytest.fixture
+def models(tmp_path, monkeypatch):
+    # No measurable RSS growth, so each model is charged its on-disk size
+    monkeypatch.setattr(asr_registry, "rss_bytes", lambda: 0)
+    paths = {}
+    for lang, size in (("en", 100), ("hi", 100), ("es", 100), ("fr", 300)):
+        d = tmp_path / lang
+        d.mkdir()
+        (d / "final.mdl").write_bytes(b"m" * size)
+        paths[lang] = str(d)
+    return paths
+
+
+def _registry(models, **kwargs):
+    loaded = []
+
+    def loader(path):
+        loaded.append(path)
+        return Model(path)
+
+    kwargs.setdefault("paths", {k: v for k, v in models.items() if k != "en"})
+    registry = VoskModelRegistry(models["en"], loader=loader, **kwargs)
+    return registry, loaded
+
+
+def test_parse_model_paths():
+    assert parse_model_paths("EN:/m/en, hi:C:/m/hi,bad") == {"en": "/m/en", "hi": "C:/m/hi"}
+
+
+def test_unknown_languages_map_to_the_default_model(models, tmp_path):
+    registry, loaded = _registry(models)
+
+    assert registry.resolve("hi-IN") == "hi"
+    assert registry.resolve("HI") == "hi"
+    assert registry.resolve("de") == "en"
+    assert registry.resolve("") == "en"
+    assert registry.get("de") is registry.get("en")
+    assert loaded == [models["en"]]
+
+    # A default without a valid path falls back to the first configured language
+    only_hi = VoskModelRegistry(str(tmp_path / "missing"), {"hi": models["hi"]}, loader=Model)
+    assert only_hi.resolve("de") == "hi"
+    with pytest.raises(RuntimeError):
+        VoskModelRegistry(str(tmp_path / "missing"), loader=Model)
+
+
+def test_least_recently_used_model_is_evicted_under_the_budget(models):
+    registry, loaded = _registry(models, memory_budget_bytes=250)
+    en = registry.get("en")
+    registry.get("hi")
+    assert registry.get("en") is en  # en is now the most recent
+    registry.get("es")  # 300 > 250: drops hi, not en
+
+    stats = registry.stats()
+    assert stats["loaded"] == ["en", "es"] and stats["evictions"] == 1
+    assert stats["resident_mb"] == round(200 / (1024 * 1024), 1)
+
+    registry.get("hi")  # reloads, now evicting en
+    assert registry.stats()["loaded"] == ["es", "hi"]
+    assert loaded == [models["en"], models["hi"], models["es"], models["hi"]]
+
+
+def test_a_model_larger_than_the_budget_still_loads_alone(models):
+    registry, _ = _registry(models, memory_budget_bytes=250)
+    registry.get("en")
+    registry.get("hi")
+
+    assert registry.transcribe_pcm(b"\0" * 10, lang="fr") == f"{models['fr']}:10"
+    assert registry.stats()["loaded"] == ["fr"]
+
+
+def test_no_budget_keeps_everything(models):
+    registry, loaded = _registry(models)
+    registry.preload(["en", "hi", "es", "fr", "de"])
+    # "de" is served by (and refreshes) the default model
+    assert registry.stats()["loaded"] == ["hi", "es", "fr", "en"]
+    assert len(loaded) == 4 and registry.evictions == 0
@@ -0,0 +1,75 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from app.utils.audio import pcm16_to_wav_bytes, wav_bytes_to_pcm16
+
+
+def _wav(samples: np.ndarray, rate: int, channels: int = 1) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def _tone(freq: float, rate: int, seconds: float = 1.0, amp: float = 10000.0) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return amp * np.sin(2 * np.pi * freq * t)
+
+
+def _pcm(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<i2").astype(np.float64)
+
+
+def _rms(x: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(x ** 2)))
+
+
+def test_mono_16k_passes_through():
+    pcm = (np.arange(1600) % 200 - 100).astype("<i2")
+    assert wav_bytes_to_pcm16(pcm16_to_wav_bytes(pcm.tobytes())) == pcm.tobytes()
+
+
+def test_stereo_is_downmixed():
+    left = np.full(1600, 1000)
+    right = np.full(1600, 3000)
+    stereo = np.stack([left, right], axis=1).reshape(-1)
+    out = _pcm(wav_bytes_to_pcm16(_wav(stereo, 16000, channels=2)))
+    assert len(out) == 1600
+    assert np.all(out == 2000)
+
+
+@pytest.mark.parametrize("rate", [48000, 44100, 22050, 8000])
+def test_resampled_length_and_passband(rate):
+    out = _pcm(wav_bytes_to_pcm16(_wav(_tone(1000, rate), rate)))
+    assert abs(len(out) - 16000) <= 1
+    # A 1 kHz tone is well inside the passband: level kept within ~1 dB
+    assert _rms(out[200:-200]) == pytest.approx(10000 / np.sqrt(2), rel=0.12)
+
+
+@pytest.mark.parametrize("rate,freq", [(44100, 10000), (48000, 12000)])
+def test_downsampling_does_not_alias(rate, freq):
+    # Above the 8 kHz output Nyquist: without a low-pass these fold back to 6 kHz / 4 kHz
+    out = _pcm(wav_bytes_to_pcm16(_wav(_tone(freq, rate), rate)))
+    assert _rms(out[200:-200]) < 0.01 * 10000
+
+
+def test_short_payload_keeps_its_length():
+    out = wav_bytes_to_pcm16(_wav(_tone(1000, 44100, seconds=0.001), 44100))
+    assert len(out) // 2 == int(round(44 * 16000 / 44100))
+
+
+def test_unsupported_sample_width_raises():
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(3)
+        wf.setframerate(16000)
+        wf.writeframes(bytes(300))
+    with pytest.raises(ValueError):
+        wav_bytes_to_pcm16(buf.getvalue())
@@ -0,0 +1,185 @@
+import os
+import struct
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+
+from app.utils.audio import pcm16_to_wav_bytes
+from app.utils.decoder import OggClock, SessionDecoder, WebmClock, stream_format_for
+
+
+@pytest.mark.parametrize("fmt,demuxer", [
+    ("", None),
+    ("pcm16", None),
+    ("S16LE", None),
+    ("webm", "webm"),
+    ("opus", "webm"),
+    ("audio/webm;codecs=opus", "webm"),
+    ("audio/ogg; codecs=opus", "ogg"),
+    ("audio/x-wav", "wav"),
+    ("mp4", "mp4"),
+    ("audio/mp4", "mp4"),
+    ("m4a", "mp4"),
+])
+def test_stream_format_allowlist(fmt, demuxer):
+    assert stream_format_for(fmt) == demuxer
+
+
+@pytest.mark.parametrize("fmt", ["concat", "lavfi", "http", "alsa", "mp3", "audio/webm-bogus", "webm,concat"])
+def test_stream_format_rejects_unknown(fmt):
+    with pytest.raises(ValueError):
+        stream_format_for(fmt)
+
+
+# Stands in for ffmpeg on one-shot decodes: records the input format and
+# answers with a fixed PCM16 ramp so the caller can tell it was used.
+FAKE_FFMPEG_ONCE = textwrap.dedent('''
+    import sys
+    args = sys.argv[1:]
+    sys.stdin.buffer.read()
+    sys.stdout.buffer.write(bytes(range(64)))
+    open(sys.argv[0] + ".log", "a").write(args[args.index("-f") + 1] + "\\n")
+''')
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG_ONCE}")
+    script.chmod(0o755)
+    monkeypatch.setenv("FFMPEG_BIN", str(script))
+    return script
+
+
+def _riff(fmt_tag: int, bits: int, data: bytes, extensible: bool = False) -> bytes:
+    channels, rate = 1, 16000
+    block = channels * bits // 8
+    fmt = struct.pack("<HHIIHH", fmt_tag, channels, rate, rate * block, block, bits)
+    if extensible:
+        # cbSize, valid bits, channel mask, PCM sub-format GUID
+        fmt += struct.pack("<HHI", 22, bits, 4) + bytes.fromhex("0100000000001000800000aa00389b71")
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+@pytest.mark.parametrize("payload", [
+    _riff(1, 24, bytes(300)),
+    _riff(3, 32, bytes(400)),
+    _riff(0xFFFE, 16, bytes(200), extensible=True),
+], ids=["pcm24", "float32", "extensible"])
+def test_unsupported_wav_falls_back_to_ffmpeg(fake_ffmpeg, payload):
+    pcm, dur = SessionDecoder("s1").decode(payload, ".wav")
+    assert pcm == bytes(range(64))
+    assert dur == pytest.approx(32 / 16000)
+    assert open(str(fake_ffmpeg) + ".log").read().split() == ["wav"]
+
+
+def test_pcm16_wav_stays_in_process(fake_ffmpeg):
+    data = (np.arange(160, dtype="<i2") * 3).tobytes()
+    pcm, _ = SessionDecoder("s1").decode(pcm16_to_wav_bytes(data), ".wav")
+    assert pcm == data
+    assert not os.path.exists(str(fake_ffmpeg) + ".log")
+
+
+def _el(eid: int, body: bytes, unknown: bool = False) -> bytes:
+    head = eid.to_bytes((eid.bit_length() + 7) // 8, "big")
+    size = b"\x01\xff\xff\xff\xff\xff\xff\xff" if unknown else (0x10000000 | len(body)).to_bytes(4, "big")
+    return head + size + body
+
+
+BLOCK_SAMPLES = 320  # 20 ms at 16 kHz
+
+
+def _block(rel_ms: int, value: int) -> bytes:
+    pcm = np.full(BLOCK_SAMPLES, value, dtype="<i2").tobytes()
+    return _el(0xA3, b"\x81" + rel_ms.to_bytes(2, "big", signed=True) + b"\x80" + b"BLK!" + pcm)
+
+
+def _webm_header(cluster_ms: int = 1000) -> bytes:
+    ebml = _el(0x1A45DFA3, _el(0x4282, b"webm"))
+    info = _el(0x1549A966, _el(0x2AD7B1, (1_000_000).to_bytes(3, "big")))
+    return ebml + _el(0x18538067, b"", unknown=True) + info + _el(0x1F43B675, b"", unknown=True) + _el(0xE7, cluster_ms.to_bytes(2, "big"))
+
+
+def test_webm_clock_reads_block_times_across_any_split():
+    data = _webm_header() + b"".join(_block(20 * i, i) for i in range(5))
+    clock = WebmClock()
+    covered = [clock.feed(data[i:i + 1]) for i in range(len(data))]
+    assert covered[-1] == 80.0
+    assert covered[0] is None
+    assert not clock.broken
+
+
+def _ogg_page(granule: int, packet: bytes) -> bytes:
+    assert len(packet) < 255
+    return b"OggS" + bytes(2) + granule.to_bytes(8, "little", signed=True) + bytes(12) + bytes([1, len(packet)]) + packet
+
+
+def test_ogg_clock_uses_granules_minus_preskip():
+    head = b"OpusHead" + bytes([1, 1]) + (312).to_bytes(2, "little") + bytes(7)
+    clock = OggClock()
+    assert clock.feed(_ogg_page(0, head) + _ogg_page(0, b"OpusTags")) == 0.0
+    page = _ogg_page(312 + 48000, b"audio")
+    assert clock.feed(page[:10]) == 0.0
+    assert clock.feed(page[10:]) == 1000.0 - OggClock.HOLD_MS
+
+
+# Stands in for a streaming ffmpeg webm decoder: every "BLK!" payload is one
+# 20 ms block of PCM. Output lags one block behind the input and each block
+# is written 150 ms after the previous one, longer than the settle window;
+# the lagging block is written when stdin closes.
+FAKE_FFMPEG_STREAM = textwrap.dedent('''
+    import os, sys, time
+    buf, blocks, sent = b"", [], 0
+    while True:
+        data = os.read(0, 65536)
+        if data:
+            buf += data
+            while True:
+                i = buf.find(b"BLK!")
+                if i < 0 or len(buf) < i + 4 + 640:
+                    break
+                blocks.append(buf[i + 4:i + 4 + 640])
+                buf = buf[i + 4 + 640:]
+        ready = len(blocks) - 1 if data else len(blocks)
+        while ready > sent:
+            time.sleep(0.15)
+            sys.stdout.buffer.write(blocks[sent])
+            sys.stdout.buffer.flush()
+            sent += 1
+        if not data:
+            break
+''')
+
+
+def _values(pcm: bytes):
+    x = np.frombuffer(pcm, dtype="<i2")
+    assert len(x) % BLOCK_SAMPLES == 0
+    return [int(v) for v in x[::BLOCK_SAMPLES]]
+
+
+def test_stream_chunks_get_exactly_their_audio(tmp_path, monkeypatch):
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG_STREAM}")
+    script.chmod(0o755)
+    monkeypatch.setenv("FFMPEG_BIN", str(script))
+    dec = SessionDecoder("s1")
+    try:
+        first = _webm_header() + b"".join(_block(20 * i, i) for i in range(5))
+        pcm, dur = dec.decode(first, ".webm")
+        # Up to the start of the last block: the decoder may still hold that one
+        assert _values(pcm) == [0, 1, 2, 3]
+        assert dur == pytest.approx(0.08)
+
+        pcm, _ = dec.decode(b"".join(_block(20 * i, i) for i in range(5, 10)), ".webm")
+        assert _values(pcm) == [4, 5, 6, 7, 8]
+
+        # A new stream header restarts the pipe; the old tail is flushed into this chunk
+        restart = _webm_header(cluster_ms=0) + b"".join(_block(20 * i, 100 + i) for i in range(3))
+        pcm, _ = dec.decode(restart, ".webm")
+        assert _values(pcm) == [9, 100, 101]
+        assert dec.restarts == 1
+    finally:
+        dec.close()
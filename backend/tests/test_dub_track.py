@@ -0,0 +1,104 @@
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+
+from app.services import audio_mixer
+from app.services.dub_track import DubTrackRegistry, IncrementalDubTrack, adts_prefix
+
+RATE = 8000
+
+# Stands in for ffmpeg: "decodes" raw s16 files as they are, and "encodes" to
+# ADTS frames whose payload is the raw 1024-sample PCM block, primed with one
+# silent frame like ffmpeg's AAC encoder. Decoding a track is then exact.
+FAKE_FFMPEG = textwrap.dedent('''
+    import sys
+    args = sys.argv[1:]
+    src = args[args.index("-i") + 1]
+    if src != "pipe:0":
+        sys.stdout.buffer.write(open(src, "rb").read())
+        sys.exit(0)
+    pcm = sys.stdin.buffer.read()
+    frame = 2048
+    pcm = bytes(frame) + pcm + bytes(-len(pcm) % frame)
+    with open(args[-1], "wb") as f:
+        for i in range(0, len(pcm), frame):
+            size = 7 + frame
+            f.write(bytes([0xFF, 0xF1, 0, (size >> 11) & 3, (size >> 3) & 0xFF, (size & 7) << 5, 0]))
+            f.write(pcm[i:i + frame])
+''')
+
+
+def decode(path) -> np.ndarray:
+    data = open(path, "rb").read()
+    assert adts_prefix(data) == len(data)
+    out, pos = [], 0
+    while pos < len(data):
+        size = ((data[pos + 3] & 3) << 11) | (data[pos + 4] << 3) | (data[pos + 5] >> 5)
+        out.append(data[pos + 7:pos + size])
+        pos += size
+    # Drop the encoder's priming frame
+    return np.frombuffer(b"".join(out), dtype=np.int16)[audio_mixer.AAC_FRAME:]
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG}")
+    script.chmod(0o755)
+    monkeypatch.setattr(audio_mixer, "FFMPEG_BIN", str(script))
+    return tmp_path
+
+
+def clip(dir_, name, value, seconds=0.5):
+    path = dir_ / f"{name}.raw"
+    np.full(int(RATE * seconds), value, dtype=np.int16).tofile(path)
+    return str(path)
+
+
+def expected(*clips):
+    end = max(int(start * RATE // 1000) + int(RATE * seconds) for start, _, seconds in clips)
+    pcm = np.zeros(end, dtype=np.int16)
+    for start, value, seconds in clips:
+        s = int(start * RATE // 1000)
+        pcm[s:s + int(RATE * seconds)] += value
+    return pcm
+
+
+def test_render_append_render_reuses_the_live_track(fake_ffmpeg):
+    track = IncrementalDubTrack("s1", str(fake_ffmpeg / "s1_dub_live.aac"), sample_rate=RATE)
+    track.append(0, clip(fake_ffmpeg, "a", 100))
+    track.append(1000, clip(fake_ffmpeg, "b", 200))
+
+    covered, first = track.snapshot()
+    first_path = first.result(timeout=10)
+    assert covered == 2 and first_path
+    assert np.array_equal(decode(first_path)[: 12000], expected((0, 100, 0.5), (1000, 200, 0.5)))
+
+    # The render did not end the track: later segments still land in it
+    track.append(2000, clip(fake_ffmpeg, "c", 300))
+    covered, second = track.snapshot()
+    second_path = second.result(timeout=10)
+    assert covered == track.appended == 3 and second_path
+    full = expected((0, 100, 0.5), (1000, 200, 0.5), (2000, 300, 0.5))
+    assert np.array_equal(decode(second_path)[: len(full)], full)
+    assert track.stats()["snapshots"] == 2 and not track.broken
+
+    assert np.array_equal(decode(track.finalize(timeout=10))[: len(full)], full)
+
+
+def test_close_with_a_pending_snapshot_still_delivers_it(fake_ffmpeg):
+    registry = DubTrackRegistry(str(fake_ffmpeg), sample_rate=RATE)
+    track = registry.get("s2")
+    track.append(0, clip(fake_ffmpeg, "a", 100))
+    _, snapshot = track.snapshot()
+    registry.close("s2")
+    assert snapshot.result(timeout=10)
+
+
+def test_adts_prefix_stops_at_incomplete_frames():
+    frame = bytes([0xFF, 0xF1, 0, 0, 2, 0, 0]) + bytes(9)  # 16-byte frame
+    assert adts_prefix(frame * 3) == 48
+    assert adts_prefix(frame * 3, 2) == 32
+    assert adts_prefix(frame * 2 + frame[:10]) == 32
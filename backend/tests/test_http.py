@@ -0,0 +1,127 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.utils import http  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools(monkeypatch):
+    for name in ("POOL_HOSTS", "POOL_PER_HOST", "DEFAULT_TIMEOUT", "KEEPALIVE_EXPIRY", "USE_HTTP2", "HTTPX_AVAILABLE", "H2_AVAILABLE"):
+        monkeypatch.setattr(http, name, getattr(http, name))
+    monkeypatch.setattr(http, "_clients", {})
+    monkeypatch.setattr(http, "_async_clients", {})
+    yield
+    http.close_all()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.server.peers.append(self.client_address)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.daemon_threads = True
+    srv.peers = []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_clients_are_shared_per_name_and_recreated_after_close():
+    http.configure(http2=False)
+    client = http.get_client()
+    assert http.get_client() is client
+    assert http.get_client("render") is not client
+    assert http.stats()["sync_clients"] == 2
+
+    http.close_all()
+    assert http.stats()["sync_clients"] == 0
+    assert http.get_client() is not client
+
+
+def test_connections_are_kept_alive_across_requests(server):
+    http.configure(http2=False)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    for _ in range(3):
+        assert http.get_client().get(url, timeout=5).text == "ok"
+    # One TCP connection (same client port) served every request
+    assert len(server.peers) == 3 and len(set(server.peers)) == 1
+
+
+def test_configure_sets_pool_sizes_on_the_requests_fallback():
+    http.configure(pool_hosts=4, pool_per_host=8, timeout=3, keepalive_seconds=5, http2=False)
+    adapter = http.get_client().get_adapter("https://example.com")
+    assert (adapter._pool_connections, adapter._pool_maxsize) == (4, 8)
+    stats = http.stats()
+    assert (stats["pool_hosts"], stats["pool_per_host"], stats["http2"]) == (4, 8, False)
+
+
+def test_http2_falls_back_when_h2_is_missing(monkeypatch):
+    monkeypatch.setattr(http, "H2_AVAILABLE", False)
+    http.configure(http2=True)
+    assert not http.USE_HTTP2
+    assert type(http.get_client()).__name__ == "Session"
+
+
+class _FakeHttpx:
+    """Records how httpx clients would be built (httpx itself is optional)."""
+
+    def __init__(self):
+        self.built = []
+
+    def Limits(self, **kwargs):
+        return SimpleNamespace(**kwargs)
+
+    def Client(self, **kwargs):
+        self.built.append(("sync", kwargs))
+        return SimpleNamespace(close=lambda: None, **kwargs)
+
+    def AsyncClient(self, **kwargs):
+        self.built.append(("async", kwargs))
+        return SimpleNamespace(**kwargs)
+
+
+def test_http2_client_when_httpx_and_h2_are_available(monkeypatch):
+    fake = _FakeHttpx()
+    monkeypatch.setattr(http, "httpx", fake, raising=False)
+    monkeypatch.setattr(http, "HTTPX_AVAILABLE", True)
+    monkeypatch.setattr(http, "H2_AVAILABLE", True)
+    http.configure(pool_hosts=2, pool_per_host=3, timeout=4, keepalive_seconds=30, http2=True)
+
+    client = http.get_client()
+    async_client = http.get_async_client()
+
+    assert http.get_async_client() is async_client
+    assert [kind for kind, _ in fake.built] == ["sync", "async"]
+    for _, kwargs in fake.built:
+        assert kwargs["http2"] is True and kwargs["timeout"] == 4.0
+        assert (kwargs["limits"].max_connections, kwargs["limits"].keepalive_expiry) == (6, 30.0)
+    assert client.http2
+
+    # Turned off by configuration, the sync client is a requests.Session again
+    http.close_all()
+    http.configure(http2=False)
+    assert type(http.get_client()).__name__ == "Session"
+
+
+def test_no_async_client_without_httpx(monkeypatch):
+    monkeypatch.setattr(http, "HTTPX_AVAILABLE", False)
+    assert http.get_async_client() is None
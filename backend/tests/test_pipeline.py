@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.services.pipeline import ChunkJob, PipelineRegistry, SessionPipeline
+from app.services.scheduler import StageOverloaded
+
+
+def _job(ts, content=b"x"):
+    return ChunkJob("s1", ts, content, ".webm", "es", "en")
+
+
+def _pipeline(log, delivered, asr_delay=0.0, **kwargs):
+    async def asr(job):
+        log.append(("asr", job.client_ts))
+        await asyncio.sleep(asr_delay)
+        if job.content == b"bad":
+            raise RuntimeError("asr failed")
+        job.text = f"t{job.client_ts}"
+
+    async def tts(job):
+        log.append(("tts", job.client_ts))
+        await asyncio.sleep(0.02)
+        log.append(("tts_done", job.client_ts))
+
+    return SessionPipeline("s1", [("asr", asr), ("tts", tts)], lambda job: delivered.append(job.client_ts), **kwargs)
+
+
+def test_out_of_order_submissions_are_delivered_in_client_order():
+    log, delivered = [], []
+    pipe = _pipeline(log, delivered)
+
+    async def main():
+        # Uploads landing together but out of order
+        jobs = await asyncio.gather(*(pipe.submit(_job(ts)) for ts in (300, 100, 200)))
+        pipe.close()
+        return jobs
+
+    jobs = asyncio.run(main())
+
+    assert delivered == [100, 200, 300]
+    assert [a for a in log if a[0] == "asr"] == [("asr", 100), ("asr", 200), ("asr", 300)]
+    # Each submitter gets its own job back, filled in
+    assert [(j.client_ts, j.text) for j in jobs] == [(300, "t300"), (100, "t100"), (200, "t200")]
+
+
+def test_stages_overlap_across_chunks():
+    log, delivered = [], []
+    pipe = _pipeline(log, delivered, asr_delay=0.01)
+
+    async def main():
+        await asyncio.gather(*(pipe.submit(_job(ts)) for ts in (1, 2)))
+        pipe.close()
+
+    asyncio.run(main())
+
+    # Chunk 2 is in ASR while chunk 1 is in TTS
+    assert log.index(("asr", 2)) < log.index(("tts_done", 1))
+    assert log.index(("tts_done", 1)) < log.index(("tts", 2))
+
+
+def test_failed_chunk_skips_later_stages_without_blocking_the_rest():
+    log, delivered = [], []
+    pipe = _pipeline(log, delivered)
+
+    async def main():
+        jobs = await asyncio.gather(pipe.submit(_job(1, b"bad")), pipe.submit(_job(2)))
+        pipe.close()
+        return jobs
+
+    bad, good = asyncio.run(main())
+
+    assert (bad.failed_stage, str(bad.error)) == ("asr", "asr failed")
+    assert ("tts", 1) not in log
+    assert good.error is None and delivered == [2]
+
+
+def test_full_pipeline_rejects_and_close_fails_inflight():
+    log, delivered = [], []
+    pipe = _pipeline(log, delivered, asr_delay=10, max_pending=1)
+
+    async def main():
+        first = asyncio.ensure_future(pipe.submit(_job(1)))
+        await asyncio.sleep(0.01)
+        with pytest.raises(StageOverloaded):
+            await pipe.submit(_job(2))
+        pipe.close()
+        with pytest.raises(RuntimeError, match="session closed"):
+            await first
+
+    asyncio.run(main())
+    assert pipe.pending == 0 and delivered == []
+
+
+def test_registry_reaps_idle_pipelines_only():
+    log, delivered = [], []
+    registry = PipelineRegistry(lambda sid: _pipeline(log, delivered), idle_timeout=0)
+    idle = registry.get("a")
+    busy = registry.get("b")
+    busy._pending = 1
+
+    assert registry.get("a") is idle
+    assert registry.reap_idle() == 1
+    assert registry.sessions() == ["b"]
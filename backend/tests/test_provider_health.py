@@ -0,0 +1,123 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.provider_router import CLOSED, HALF_OPEN, OPEN, ProviderRouter
+
+pytest.importorskip("requests")
+
+from app.services.health_prober import HealthProber  # noqa: E402
+from app.services.translate_libre import LibreTranslate  # noqa: E402
+
+
+class StubLibre(ThreadingHTTPServer):
+    """Local LibreTranslate /translate endpoint with a configurable delay and failure switch."""
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delay = delay
+        self.failing = False
+        self.hits = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        server.hits += 1
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(server.delay)
+        if server.failing:
+            self.send_response(503)
+            self.end_headers()
+            return
+        data = json.dumps({"translatedText": f"[{body['target']}] {body['q']}"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stubs():
+    servers = [StubLibre(delay=0.15), StubLibre(delay=0.0)]
+    for s in servers:
+        threading.Thread(target=s.serve_forever, daemon=True).start()
+    yield servers
+    for s in servers:
+        s.shutdown()
+        s.server_close()
+
+
+def _libre(stubs, router):
+    return LibreTranslate(",".join(s.url for s in stubs), router=router, include_defaults=False, timeout=2, mymemory_url=stubs[1].url + "/mymemory")
+
+
+def test_hosts_are_ordered_by_ewma_latency(stubs):
+    slow, fast = stubs
+    libre = _libre(stubs, ProviderRouter())
+    for base in (slow.url, fast.url):
+        libre.translate_host(base, "hello", "en", "hi")
+    assert libre.ordered_hosts() == [fast.url, slow.url]
+    assert libre.translate_with_provider("hi", "en", "es") == ("[es] hi", libre.host_key(fast.url))
+
+
+def test_breaker_opens_on_failures_and_closes_after_a_trial(stubs):
+    slow, fast = stubs
+    router = ProviderRouter(failure_threshold=2, open_seconds=0.2)
+    libre = _libre(stubs, router)
+    key = libre.host_key(fast.url)
+    fast.failing = True
+    for _ in range(2):
+        with pytest.raises(Exception):
+            libre.translate_host(fast.url, "hello", "en", "hi")
+    assert router.health(key).state == OPEN
+    # While open, traffic goes to the other host and the failing one is not called
+    hits = fast.hits
+    assert libre.translate_with_provider("hello", "en", "hi")[1] == libre.host_key(slow.url)
+    assert fast.hits == hits
+
+    fast.failing = False
+    time.sleep(0.25)
+    assert router.allow(key) and router.health(key).state == HALF_OPEN
+    assert not router.allow(key)  # one trial at a time
+    libre.translate_host(fast.url, "hello", "en", "hi")
+    assert router.health(key).state == CLOSED
+
+
+def test_prober_only_probes_open_circuits_and_recovers_them(stubs):
+    slow, fast = stubs
+    router = ProviderRouter(failure_threshold=1, open_seconds=60)
+    libre = _libre(stubs, router)
+    prober = HealthProber(libre, interval=1)
+
+    hits = [s.hits for s in stubs]
+    snap = asyncio.run(prober.probe_once())
+    assert prober.probes == 0 and [s.hits for s in stubs] == hits
+    assert snap["libre"]["hosts"][fast.url] == {"ok": True, "probed": False, "state": CLOSED}
+
+    fast.failing = True
+    with pytest.raises(Exception):
+        libre.translate_host(fast.url, "hello", "en", "hi")
+    assert router.health(libre.host_key(fast.url)).state == OPEN
+
+    snap = asyncio.run(prober.probe_once())
+    assert prober.probes == 1 and not snap["libre"]["hosts"][fast.url]["ok"]
+    fast.failing = False
+    snap = asyncio.run(prober.probe_once())
+    assert snap["libre"]["hosts"][fast.url]["ok"]
+    assert router.health(libre.host_key(fast.url)).state == CLOSED
+    assert slow.hits == hits[0]
@@ -0,0 +1,97 @@
+import os
+
+from app.services.render_cache import RenderCache
+
+SEGMENTS = [
+    {"start_ms": 0, "end_ms": 800, "text": "hola", "translated_text": "hello"},
+    {"start_ms": 800, "end_ms": 1500, "text": "mundo", "translated_text": "world"},
+]
+
+
+def _src(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(name.encode()[:1] * size)
+    return str(path)
+
+
+def test_text_and_timing_changes_alter_the_keys():
+    key = RenderCache.srt_key
+    base = key(SEGMENTS, True)
+
+    retimed = [dict(SEGMENTS[0], end_ms=900), SEGMENTS[1]]
+    retext = [SEGMENTS[0], dict(SEGMENTS[1], translated_text="earth")]
+    assert key(retimed, True) != base
+    assert key(retext, True) != base
+    # Only the rendered text counts: source edits do not touch a translated SRT
+    assert key([SEGMENTS[0], dict(SEGMENTS[1], text="tierra")], True) == base
+    assert key(SEGMENTS, False) != base
+    assert key([*SEGMENTS, {"start_ms": 2000, "end_ms": 2500, "translated_text": "  "}], True) == base
+
+
+def test_final_key_follows_every_input(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    srt = cache.srt_key(SEGMENTS, True)
+    final = cache.final_key("video", srt, "audio", {"subs_mode": "burn"})
+
+    assert cache.final_key("video", srt, "audio", {"subs_mode": "burn"}) == final
+    assert cache.final_key("video", cache.srt_key([dict(SEGMENTS[0], start_ms=50), SEGMENTS[1]], True), "audio", {"subs_mode": "burn"}) != final
+    assert cache.final_key("other", srt, "audio", {"subs_mode": "burn"}) != final
+    assert cache.final_key("video", srt, "audio2", {"subs_mode": "burn"}) != final
+    assert cache.final_key("video", srt, "audio", {"subs_mode": "soft"}) != final
+
+
+def test_outputs_survive_eviction_of_their_cache_entry(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=150)
+    out = tmp_path / "out"
+    out.mkdir()
+    a = _src(tmp_path, "a.mp4", 100)
+    cache.store("aa" * 32, ".mp4", a)
+    dest = str(out / "s1_final.mp4")
+    assert cache.fetch("aa" * 32, ".mp4", dest) == dest
+
+    cache.store("bb" * 32, ".mp4", _src(tmp_path, "b.mp4", 100))  # over budget: evicts a
+
+    assert cache.lookup("aa" * 32, ".mp4") is None
+    assert cache.fetch("aa" * 32, ".mp4", str(out / "s2_final.mp4")) is None
+    assert not (out / "s2_final.mp4").exists()
+    # The materialized output and the original source are separate links to the evicted bytes
+    assert open(dest, "rb").read() == b"a" * 100
+    assert open(a, "rb").read() == b"a" * 100
+    stats = cache.stats()
+    assert (stats["artifacts"], stats["disk_bytes"], stats["evictions"]) == (1, 100, 1)
+
+    # Storing it again (from the surviving output) works as before
+    cache.store("aa" * 32, ".mp4", dest)
+    assert cache.lookup("aa" * 32, ".mp4") and cache.lookup("bb" * 32, ".mp4") is None
+
+
+def test_fetch_treats_an_artifact_removed_after_lookup_as_a_miss(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    path = cache.store("cc" * 32, ".srt", _src(tmp_path, "c.srt", 10))
+    os.unlink(path)  # e.g. another process's eviction
+
+    assert cache.fetch("cc" * 32, ".srt", str(tmp_path / "out.srt")) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["artifacts"], stats["disk_bytes"]) == (0, 1, 0, 0)
+
+
+def test_reload_recounts_bytes_and_keeps_lru_order(tmp_path):
+    root = tmp_path / "cache"
+    cache = RenderCache(str(root))
+    for i, key in enumerate(("aa", "bb", "cc")):
+        path = cache.store(key * 32, ".mp4", _src(tmp_path, f"{key}.mp4", 100 * (i + 1)))
+        os.utime(path, (1000 + i, 1000 + i))
+    leftover = root / "dd" / "dd.123.456.tmp"
+    leftover.parent.mkdir()
+    leftover.write_bytes(b"x" * 1000)
+
+    reloaded = RenderCache(str(root))
+    stats = reloaded.stats()
+    assert (stats["artifacts"], stats["disk_bytes"]) == (3, 600)
+    assert not leftover.exists()
+
+    # A lowered budget is enforced at startup, oldest first
+    smaller = RenderCache(str(root), max_bytes=550)
+    assert smaller.stats()["disk_bytes"] == 500
+    assert smaller.lookup("aa" * 32, ".mp4") is None
+    assert smaller.lookup("bb" * 32, ".mp4") and smaller.lookup("cc" * 32, ".mp4")
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from app.services import render_ffmpeg
+from app.services.render_cache import RenderCache
+
+
+def test_configured_mix_rate_reaches_the_mixer_and_the_cache_key(tmp_path, monkeypatch):
+    mixed, runs = [], []
+
+    def fake_mix(segments, out_path, sample_rate, on_clip=None):
+        mixed.append(sample_rate)
+        Path(out_path).write_bytes(b"aac")
+        return len(segments)
+
+    def fake_run(cmd, *args, **kwargs):
+        runs.append(cmd)
+        Path(cmd[-1]).write_bytes(b"mp4")
+
+    monkeypatch.setattr(render_ffmpeg, "mix_segments", fake_mix)
+    monkeypatch.setattr(render_ffmpeg, "_run", fake_run)
+    clip = tmp_path / "clip.mp3"
+    clip.write_bytes(b"mp3")
+    video = tmp_path / "s1_upload.mp4"
+    video.write_bytes(b"video")
+    segments = [{"start_ms": 0, "end_ms": 900, "text": "hola", "translated_text": "hello", "audio_path": str(clip)}]
+    cache = RenderCache(str(tmp_path / "cache"))
+
+    def render(rate):
+        return render_ffmpeg.render_final_video(
+            str(video), segments, str(tmp_path / "out"), burn_subs=False, cache=cache, mix_sample_rate=rate,
+        )
+
+    render(16000)
+    render(16000)  # cached: nothing is mixed or muxed again
+    render(48000)  # another rate is another dubbed track
+
+    assert mixed == [16000, 48000]
+    assert len(runs) == 2
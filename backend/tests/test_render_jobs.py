@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app.services import render_jobs
+from app.services.render_jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, RenderJobManager
+from app.services.scheduler import StageOverloaded
+
+
+class Runner:
+    """Render stand-in: blocks until released, reporting progress so cancels land."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.ran = []
+
+    def __call__(self, job, control):
+        self.ran.append(job.id)
+        self.started.set()
+        while not self.release.wait(0.01):
+            control.report("mux", 0.5)
+        return {"final_path": f"/out/{job.session_id}.mp4"}
+
+
+def _wait(pred, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not pred():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def runner():
+    r = Runner()
+    yield r
+    r.release.set()
+
+
+def test_job_runs_and_is_persisted(tmp_path, runner):
+    mgr = RenderJobManager(str(tmp_path), runner, workers=1)
+    job = mgr.submit("s1", {"burn_subs": True})
+    runner.started.wait(5)
+    assert job.status == RUNNING and mgr.busy_sessions() == {"s1"}
+    runner.release.set()
+    _wait(lambda: job.status == DONE)
+    assert job.result == {"final_path": "/out/s1.mp4"} and job.progress == 1.0
+    _wait(lambda: json.loads((tmp_path / f"{job.id}.json").read_text())["status"] == DONE)
+    assert mgr.busy_sessions() == set()
+    mgr.shutdown()
+
+
+def test_queue_limit_raises_overloaded_with_retry_hint(tmp_path, runner):
+    mgr = RenderJobManager(str(tmp_path), runner, workers=1, max_queued=2)
+    mgr.submit("s1")
+    runner.started.wait(5)
+    mgr.submit("s2")
+    mgr.submit("s3")
+    with pytest.raises(StageOverloaded) as exc:
+        mgr.submit("s4")
+    assert exc.value.stage == "render"
+    # Default 30 s per job before any has finished, three jobs ahead on one worker
+    assert exc.value.retry_after == 90.0
+    assert mgr.stats()["jobs"] == {RUNNING: 1, QUEUED: 2}
+    mgr.shutdown()
+
+
+def test_cancel_queued_job_never_runs_and_releases_its_context(tmp_path, runner):
+    discarded = []
+    mgr = RenderJobManager(str(tmp_path), runner, workers=1, discard=discarded.append)
+    first = mgr.submit("s1")
+    runner.started.wait(5)
+    queued = mgr.submit("s2", context={"snapshot": "s2.aac"})
+
+    assert mgr.cancel(queued.id).status == CANCELLED
+    runner.release.set()
+    _wait(lambda: first.status == DONE)
+    _wait(lambda: discarded == [{"snapshot": "s2.aac"}])
+    assert runner.ran == [first.id]
+    assert queued.status == CANCELLED and queued.started is None
+    mgr.shutdown()
+
+
+def test_cancel_running_job_stops_the_render(tmp_path, runner):
+    mgr = RenderJobManager(str(tmp_path), runner, workers=1)
+    job = mgr.submit("s1")
+    runner.started.wait(5)
+    mgr.cancel(job.id)
+    _wait(lambda: job.status == CANCELLED)
+    assert job.finished is not None
+    # Cancelling a finished job is a no-op
+    assert mgr.cancel(job.id).status == CANCELLED
+    assert mgr.cancel("missing") is None
+    mgr.shutdown()
+
+
+def test_cancel_racing_the_start_is_not_lost(tmp_path, runner, monkeypatch):
+    mgr = RenderJobManager(str(tmp_path), runner, workers=1)
+    seen = {}
+    real_control = render_jobs.RenderControl
+
+    def control_factory(*args, **kwargs):
+        # The worker is taking the job: land a cancel right now, from another thread.
+        # The test thread may not have bound `job` yet, so look it up through the manager.
+        t = threading.Thread(target=lambda: seen.setdefault("status", mgr.cancel(mgr.list("s1")[0].id).status))
+        t.start()
+        t.join(0.2)
+        return real_control(*args, **kwargs)
+
+    monkeypatch.setattr(render_jobs, "RenderControl", control_factory)
+    job = mgr.submit("s1")
+    _wait(lambda: job.status in (CANCELLED, DONE))
+
+    # The cancel either won before the start (never ran) or stopped the running render
+    assert job.status == CANCELLED
+    if seen["status"] == CANCELLED:
+        assert runner.ran == []
+    mgr.shutdown()
+
+
+def test_interrupted_jobs_reload_as_failed(tmp_path):
+    (tmp_path / "a.json").write_text(json.dumps({"job_id": "a", "session_id": "s1", "status": RUNNING, "created": 1.0}))
+    (tmp_path / "b.json").write_text(json.dumps({"job_id": "b", "session_id": "s1", "status": QUEUED, "created": 2.0}))
+    (tmp_path / "c.json").write_text(json.dumps({"job_id": "c", "session_id": "s1", "status": DONE, "created": 3.0, "finished": 4.0}))
+    (tmp_path / "broken.json").write_text("{")
+
+    mgr = RenderJobManager(str(tmp_path), lambda job, control: {})
+
+    assert [mgr.get(k).status for k in "abc"] == [FAILED, FAILED, DONE]
+    assert mgr.get("a").error == "interrupted by server restart"
+    assert json.loads((tmp_path / "b.json").read_text())["status"] == FAILED
+    assert mgr.busy_sessions() == set()
+    mgr.shutdown()
+
+
+def test_finished_jobs_are_pruned_oldest_first(tmp_path):
+    for i in range(4):
+        (tmp_path / f"j{i}.json").write_text(json.dumps({"job_id": f"j{i}", "session_id": "s", "status": DONE, "created": i, "finished": 10 + i}))
+    (tmp_path / "failed.json").write_text(json.dumps({"job_id": "failed", "session_id": "s", "status": FAILED, "created": 0, "finished": 20}))
+
+    mgr = RenderJobManager(str(tmp_path), lambda job, control: {}, keep=2)
+
+    assert sorted(j.id for j in mgr.list()) == ["failed", "j3"]
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["failed", "j3"]
+    mgr.shutdown()
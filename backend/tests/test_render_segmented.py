@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+
+import pytest
+
+from app.services import render_segmented
+from app.services.render_cache import RenderCache
+from app.services.render_ffmpeg import RenderControl, RenderError
+from app.services.render_segmented import burn_segmented, plan_ranges, slice_segments
+from app.services.timeline import SegmentTimeline
+
+# Encodes write "part@<ss>" to their output, or hang (reporting progress) until
+# killed when FAKE_HANG is set; the -ss in FAKE_FAIL_SS exits 1. The concat
+# writes "<path>=<content>" for every listed part. Each encode leaves its pid.
+FAKE_FFMPEG = f"""#!{sys.executable}
+import os, sys, time
+args = sys.argv[1:]
+out = args[-1]
+if "concat" in args:
+    with open(out, "w") as f:
+        for line in open(args[args.index("-i") + 1]):
+            path = line.strip()[len("file '"):-1]
+            f.write(path + "=" + open(path).read() + "\\n")
+    sys.exit(0)
+ss = args[args.index("-ss") + 1]
+with open(os.path.join(os.environ["FAKE_DIR"], "pid." + ss), "w") as f:
+    f.write(str(os.getpid()))
+if ss == os.environ.get("FAKE_FAIL_SS"):
+    time.sleep(0.2)
+    sys.exit(1)
+if os.environ.get("FAKE_HANG"):
+    for _ in range(600):
+        print("out_time_us=0", flush=True)
+        time.sleep(0.05)
+with open(out, "w") as f:
+    f.write("part@" + ss)
+"""
+
+
+def _frames(duration_ms, step):
+    return list(range(0, duration_ms, step))
+
+
+def test_cuts_snap_to_nearby_keyframes():
+    frames = _frames(20000, 40)
+    assert plan_ranges(20000, frames, [0, 4000, 9000, 16000], 2) == [(0, 9000), (9000, 20000)]
+
+
+def test_cuts_fall_back_to_the_nearest_frame():
+    # The only keyframe near 10 s is 5 s away, beyond snap_ms
+    frames = _frames(20000, 33)
+    assert plan_ranges(20000, frames, [0, 15000], 2) == [(0, 9999), (9999, 20000)]
+
+
+def test_short_sources_collapse_to_fewer_parts():
+    frames = _frames(25000, 40)
+    keys = _frames(25000, 1000)
+    assert plan_ranges(25000, frames, keys, 8) == [(0, 12000), (12000, 25000)]
+    assert plan_ranges(9000, frames, keys, 8) == [(0, 9000)]
+    assert len(plan_ranges(25000, frames, keys, 8, min_part_ms=5000)) == 5
+
+
+@pytest.mark.parametrize("timeline", [False, True])
+def test_slice_segments_shifts_and_clips_to_the_range(timeline):
+    segments = [
+        {"start_ms": 0, "end_ms": 1000, "text": "a"},
+        {"start_ms": 9500, "end_ms": 10500, "text": "b"},
+        {"start_ms": 12000, "end_ms": 12050, "text": "c"},  # stretched to the 200 ms minimum
+        {"start_ms": 19900, "end_ms": 21000, "text": "d"},
+    ]
+    if timeline:
+        tl = SegmentTimeline()
+        for s in segments:
+            tl.append(s)
+        segments = tl
+
+    out = slice_segments(segments, 10000, 20000)
+
+    assert [(s["text"], s["start_ms"], s["end_ms"]) for s in out] == [("b", 0, 500), ("c", 2000, 2200), ("d", 9900, 10000)]
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    script = tmp_path / "ffmpeg"
+    script.write_text(FAKE_FFMPEG)
+    script.chmod(0o755)
+    pids = tmp_path / "pids"
+    pids.mkdir()
+    monkeypatch.setattr(render_segmented, "FFMPEG_BIN", str(script))
+    monkeypatch.setattr(render_segmented, "probe_frames", lambda path: (30000, _frames(30000, 40), _frames(30000, 2000)))
+    monkeypatch.setenv("FAKE_DIR", str(pids))
+    return pids
+
+
+def _burn(tmp_path, control=None, cache=None):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir(exist_ok=True)
+    video = tmp_path / "in.mp4"
+    video.write_bytes(b"video")
+    segments = [{"start_ms": 0, "end_ms": 1000, "text": "hola", "translated_text": "hello"}]
+    burn_segmented(str(video), segments, "dub.aac", ["-c:a", "copy"], str(out_dir / "final.mp4"), 3, control=control, cache=cache)
+    return out_dir
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed child stays a zombie until reaped; its /proc state says so
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(") ", 1)[1][0] != "Z"
+    except OSError:
+        return True
+
+
+def test_one_failing_part_kills_the_others_and_cleans_up(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_HANG", "1")
+    monkeypatch.setenv("FAKE_FAIL_SS", "10.000")
+    t0 = time.monotonic()
+
+    with pytest.raises(RenderError):
+        _burn(tmp_path, control=RenderControl())
+
+    assert time.monotonic() - t0 < 10
+    assert sorted(p.name for p in fake_ffmpeg.iterdir()) == ["pid.0.000", "pid.10.000", "pid.20.000"]
+    for p in fake_ffmpeg.iterdir():
+        assert not _alive(int(p.read_text()))
+    assert list((tmp_path / "out").iterdir()) == []
+
+
+def test_cached_parts_are_linked_into_the_work_dir(tmp_path, fake_ffmpeg):
+    cache = RenderCache(str(tmp_path / "cache"))
+    first = (_burn(tmp_path, control=RenderControl(), cache=cache) / "final.mp4").read_text()
+    assert cache.stats()["stores"] == 3
+    for p in fake_ffmpeg.iterdir():
+        p.unlink()
+
+    lines = (_burn(tmp_path, control=RenderControl(), cache=cache) / "final.mp4").read_text().splitlines()
+
+    # No part was encoded again, yet the concat read every one from the (since removed) work dir
+    assert list(fake_ffmpeg.iterdir()) == []
+    assert cache.stats()["hits"] == 3
+    assert [line.split("=", 1)[1] for line in lines] == ["part@0.000", "part@10.000", "part@20.000"]
+    assert all(os.path.basename(os.path.dirname(line.split("=", 1)[0])).startswith(".parts_") for line in lines)
+    assert first.splitlines()[0].endswith("=part@0.000")
@@ -0,0 +1,25 @@
+import pytest
+
+from app.services.render_soft import pick_container
+
+
+@pytest.mark.parametrize("video, audio, expected", [
+    ("vp8", "opus", "webm"),
+    ("vp9", "opus", "webm"),
+    ("vp9", "aac", "webm"),
+    ("av1", "opus", "webm"),
+    ("av1", "aac", "mp4"),
+    ("h264", "aac", "mp4"),
+    ("h264", "opus", "mp4"),
+    ("hevc", "", "mp4"),
+    ("", "", "mp4"),
+])
+def test_auto_container_follows_the_source(video, audio, expected):
+    assert pick_container(video, "auto", audio) == expected
+
+
+def test_requested_container_must_fit_the_video():
+    assert pick_container("vp9", "mp4") == "mp4"
+    assert pick_container("h264", "webm") == "mp4"
+    assert pick_container("vp8", "mp4", "opus") == "webm"
+    assert pick_container("", "webm") == "webm"
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.scheduler import Scheduler, StageOverloaded
+
+
+@pytest.fixture
+def pool():
+    ex = ThreadPoolExecutor(max_workers=4)
+    yield ex
+    ex.shutdown(wait=False, cancel_futures=True)
+
+
+def test_full_queue_rejects_fast_and_reject_false_waits(pool):
+    sched = Scheduler()
+    stage = sched.add_stage("asr", pool, max_concurrency=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(sched.run("asr", release.wait, 5))
+        queued = asyncio.ensure_future(sched.run("asr", lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert stage.stats()["running"] == 1 and stage.stats()["queued"] == 1
+
+        with pytest.raises(StageOverloaded) as exc:
+            await sched.run("asr", lambda: "rejected")
+        waiting = asyncio.ensure_future(sched.run("asr", lambda: "patient", reject=False))
+        await asyncio.sleep(0.05)
+        release.set()
+        return exc.value, await asyncio.gather(running, queued, waiting)
+
+    err, results = asyncio.run(main())
+
+    assert err.stage == "asr"
+    assert results == [True, "queued", "patient"]
+    stats = sched.stats()["asr"]
+    assert (stats["completed"], stats["rejected"], stats["running"], stats["queued"]) == (3, 1, 0, 0)
+
+
+def test_retry_after_estimates_the_backlog_from_service_time(pool):
+    sched = Scheduler()
+    stage = sched.add_stage("tts", pool, max_concurrency=2, max_queue=0)
+
+    # Before anything has completed, each call is assumed to take 1 s
+    assert stage.retry_after() == 0.5
+    stage._running = 2
+    assert stage.retry_after() == 1.5
+
+    async def main():
+        stage._running = 0
+        await sched.run("tts", time.sleep, 0.3)
+        return stage.retry_after()
+
+    # ~0.3 s per call, three calls' worth (two running + the caller) over two slots
+    idle = asyncio.run(main())
+    assert idle == 0.5
+    stage._running = 2
+    assert 0.4 <= stage.retry_after() <= 0.6
+    stage._waiting = 4
+    assert 0.8 <= stage.retry_after() <= 1.2
+
+
+def test_failures_are_counted_and_reraised(pool):
+    sched = Scheduler()
+    sched.add_stage("io", pool, max_concurrency=1, max_queue=0)
+
+    def boom():
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        asyncio.run(sched.run("io", boom))
+    stats = sched.stats()["io"]
+    assert (stats["failed"], stats["completed"], stats["running"]) == (1, 1, 0)
@@ -0,0 +1,293 @@
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app.services.session_store import IF_EXISTS_SCRIPT, MemorySessionStore, RedisSessionStore, SQLiteSessionStore
+
+
+class RespStub(socketserver.ThreadingTCPServer):
+    """In-process server for the Redis commands RedisSessionStore sends, with a movable clock for TTLs."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.data = {}
+        self.expires = {}
+        self.skew = 0.0
+        self.clients = set()
+        self.drop_replies = 0  # apply the next N commands, then hang up instead of replying
+
+    def close_clients(self):
+        """Hang up every idle client connection, like a server-side idle timeout."""
+        for sock in list(self.clients):
+            sock.shutdown(socket.SHUT_RDWR)
+
+    def now(self) -> float:
+        return time.time() + self.skew
+
+    def _get(self, key, default=None):
+        if key in self.expires and self.expires[key] <= self.now():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key, default)
+
+    def execute(self, cmd, *args):
+        cmd = cmd.upper()
+        if cmd == "EVAL":
+            assert args[0] == IF_EXISTS_SCRIPT
+            nkeys = int(args[1])
+            key, argv = args[2], args[2 + nkeys:]
+            if self._get(key) is None:
+                return None
+            out, i = [], 0
+            while i < len(argv):
+                n = int(argv[i])
+                out.append(self.execute(*argv[i + 1:i + 1 + n]))
+                i += n + 1
+            return out
+        if cmd == "EXISTS":
+            return sum(1 for k in args if self._get(k) is not None)
+        if cmd == "DEL":
+            n = 0
+            for k in args:
+                n += self._get(k) is not None
+                self.data.pop(k, None)
+                self.expires.pop(k, None)
+            return n
+        if cmd == "EXPIRE":
+            if self._get(args[0]) is None:
+                return 0
+            self.expires[args[0]] = self.now() + int(args[1])
+            return 1
+        if cmd in ("HSET", "HINCRBY", "HGET", "HGETALL"):
+            h = self._get(args[0])
+            if h is None:
+                if cmd == "HGET":
+                    return None
+                if cmd == "HGETALL":
+                    return []
+                h = self.data[args[0]] = {}
+            if cmd == "HSET":
+                pairs = list(zip(args[1::2], args[2::2]))
+                new = sum(1 for f, _ in pairs if f not in h)
+                h.update(pairs)
+                return new
+            if cmd == "HINCRBY":
+                h[args[1]] = str(int(h.get(args[1], 0)) + int(args[2]))
+                return int(h[args[1]])
+            if cmd == "HGET":
+                return h.get(args[1])
+            return [x for kv in h.items() for x in kv]
+        if cmd in ("RPUSH", "LRANGE", "LLEN"):
+            lst = self._get(args[0])
+            if lst is None:
+                if cmd != "RPUSH":
+                    return [] if cmd == "LRANGE" else 0
+                lst = self.data[args[0]] = []
+            if cmd == "RPUSH":
+                lst.extend(args[1:])
+                return len(lst)
+            if cmd == "LLEN":
+                return len(lst)
+            start, stop = int(args[1]), int(args[2])
+            return lst[start:None if stop == -1 else stop + 1]
+        if cmd in ("ZADD", "ZREM", "ZRANGEBYSCORE", "ZCOUNT"):
+            z = self.data.setdefault(args[0], {})
+            if cmd == "ZADD":
+                z[args[2]] = float(args[1])
+                return 1
+            if cmd == "ZREM":
+                return sum(1 for m in args[1:] if z.pop(m, None) is not None)
+            lo, hi = float(args[1]), float(args[2])
+            hits = [m for m, s in sorted(z.items(), key=lambda kv: kv[1]) if lo <= s <= hi]
+            return hits if cmd == "ZRANGEBYSCORE" else len(hits)
+        raise ValueError(f"unknown command {cmd}")
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(v) for v in value)
+    b = str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(b), b)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.server.clients.add(self.request)
+
+    def finish(self):
+        self.server.clients.discard(self.request)
+        super().finish()
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                n = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(n + 2)[:-2].decode())
+            with self.server.lock:
+                try:
+                    reply = _encode(self.server.execute(*args))
+                except Exception as e:
+                    reply = f"-ERR {e}\r\n".encode()
+                if self.server.drop_replies:
+                    self.server.drop_replies -= 1
+                    return
+            self.wfile.write(reply)
+
+
+@pytest.fixture
+def redis_stub():
+    server = RespStub()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_redis_store_roundtrip(redis_stub):
+    store = RedisSessionStore(f"redis://127.0.0.1:{redis_stub.server_address[1]}/0", ttl=60)
+    store.create("s1", node="n1")
+    assert store.advance_timeline("s1", 500) == 0
+    assert store.advance_timeline("s1", 700) == 500
+    assert store.record_chunk("s1", {"start_ms": 0, "end_ms": 500, "text": "hola"}) == 1
+    assert store.record_chunk("s1") == 2
+    assert store.update("s1", video_path="/v.mp4")
+    assert store.touch("s1") == "n1"
+    sess = store.get("s1", with_segments=True)
+    assert (sess["timeline_ms"], sess["chunks"], sess["video_path"]) == (1200, 2, "/v.mp4")
+    assert [s["text"] for s in sess["segments"]] == ["hola"]
+    assert store.count() == 1
+
+
+def test_redis_store_does_not_recreate_an_expired_session(redis_stub):
+    store = RedisSessionStore(f"redis://127.0.0.1:{redis_stub.server_address[1]}/0", ttl=10)
+    store.create("s1")
+    store.record_chunk("s1", {"start_ms": 0, "end_ms": 500, "text": "hola"})
+    redis_stub.skew += 60
+
+    assert store.get("s1") is None
+    assert store.touch("s1") is None
+    assert store.advance_timeline("s1", 500) is None
+    assert store.record_chunk("s1", {"start_ms": 500, "end_ms": 900, "text": "tarde"}) is None
+    assert store.update("s1", video_path="/v.mp4") is False
+    # No hash or segment list came back without a TTL
+    with redis_stub.lock:
+        assert redis_stub._get(store._key("s1")) is None
+        assert redis_stub._get(f"{store._key('s1')}:segs") is None
+
+
+def test_redis_store_never_replays_a_reservation_whose_reply_was_lost(redis_stub):
+    store = RedisSessionStore(f"redis://127.0.0.1:{redis_stub.server_address[1]}/0", ttl=60)
+    store.create("s1")
+    redis_stub.drop_replies = 1
+
+    with pytest.raises((OSError, ConnectionError)):
+        store.advance_timeline("s1", 500)
+    # Applied once on the server, not twice by a blind retry
+    assert store.get("s1")["timeline_ms"] == 500
+    redis_stub.drop_replies = 1
+    with pytest.raises((OSError, ConnectionError)):
+        store.record_chunk("s1", {"start_ms": 0, "end_ms": 500, "text": "hola"})
+    sess = store.get("s1", with_segments=True)
+    assert (sess["chunks"], len(sess["segments"])) == (1, 1)
+
+
+def test_redis_store_reconnects_after_an_idle_hangup(redis_stub):
+    store = RedisSessionStore(f"redis://127.0.0.1:{redis_stub.server_address[1]}/0", ttl=60)
+    store.create("s1")
+    redis_stub.close_clients()
+    time.sleep(0.05)
+
+    assert store.advance_timeline("s1", 500) == 0
+    assert store.record_chunk("s1", {"start_ms": 0, "end_ms": 500, "text": "hola"}) == 1
+    assert store.get("s1")["timeline_ms"] == 500
+
+
+def test_sqlite_store_reservations_are_unique_across_connections(tmp_path):
+    path = str(tmp_path / "s.sqlite3")
+    stores = [SQLiteSessionStore(path), SQLiteSessionStore(path)]
+    stores[0].create("s1")
+    starts = []
+
+    def reserve(store):
+        for _ in range(50):
+            starts.append(store.advance_timeline("s1", 100))
+
+    threads = [threading.Thread(target=reserve, args=(stores[i % 2],)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(starts) == list(range(0, 20000, 100))
+    assert stores[1].get("s1")["timeline_ms"] == 20000
+    assert stores[0].advance_timeline("missing", 100) is None
+
+
+def test_sqlite_store_segment_range(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "s.sqlite3"))
+    store.create("s1")
+    for start, end, text in [(0, 500, "a"), (500, 5000, "long"), (1000, 1400, "b"), (6000, 6500, "c")]:
+        store.record_chunk("s1", {"start_ms": start, "end_ms": end, "text": text})
+
+    def texts(lo, hi):
+        return [s["text"] for s in store.segments("s1", lo, hi)]
+
+    # A segment that starts before the window but still overlaps it is included
+    assert texts(1200, 1300) == ["long", "b"]
+    assert texts(500, 1000) == ["long"]
+    assert texts(5000, 6000) == []
+    assert texts(0, 10000) == ["a", "long", "b", "c"]
+    assert store.segments("missing") is None
+    assert store.get("s1")["segment_count"] == 4
+
+
+def test_sqlite_store_expires_idle_sessions(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.session_store.time.time", lambda: now[0])
+    store = SQLiteSessionStore(str(tmp_path / "s.sqlite3"), ttl=60)
+    store.create("old")
+    store.record_chunk("old", {"start_ms": 0, "end_ms": 500, "text": "a"})
+    now[0] += 50
+    store.create("new")
+    now[0] += 20
+
+    assert store.expire() == ["old"]
+    assert store.get("old") is None and store.segments("old") is None
+    assert store.count() == 1 and store.stats()["expired"] == 1
+    now[0] += 100
+    assert store.touch("new") == ""
+    assert store.expire() == []
+
+
+def test_memory_store_reloads_sessions_from_the_journal(tmp_path):
+    store = MemorySessionStore(ttl=60, journal_dir=str(tmp_path))
+    store.create("s1", node="n1")
+    store.advance_timeline("s1", 1500)
+    store.record_chunk("s1", {"start_ms": 0, "end_ms": 700, "text": "hola", "translated_text": "hello"})
+    store.record_chunk("s1", {"start_ms": 700, "end_ms": 1500, "text": "mundo", "translated_text": "world"})
+    store.update("s1", video_path="/v.mp4")
+
+    reloaded = MemorySessionStore(ttl=60, journal_dir=str(tmp_path))
+    sess = reloaded.get("s1", with_segments=True)
+    assert (sess["timeline_ms"], sess["chunks"], sess["video_path"], sess["node"]) == (1500, 2, "/v.mp4", "n1")
+    assert [s["translated_text"] for s in sess["segments"]] == ["hello", "world"]
+    assert [s["text"] for s in reloaded.segments("s1", 800, 1000)] == ["mundo"]
+    # The reloaded timeline keeps journaling
+    reloaded.record_chunk("s1", {"start_ms": 1500, "end_ms": 2000, "text": "adios"})
+    assert len(MemorySessionStore(ttl=60, journal_dir=str(tmp_path)).get("s1", with_segments=True)["segments"]) == 3
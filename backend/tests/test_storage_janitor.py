@@ -0,0 +1,171 @@
+import os
+import time
+
+import pytest
+
+from app.services.storage_janitor import AUDIO, RENDER, UPLOAD, StorageJanitor
+
+HOUR = 3600.0
+
+
+class Sessions:
+    def __init__(self, *live):
+        self.live = set(live)
+        self.busy = set()
+
+
+def _janitor(tmp_path, sessions, **kwargs):
+    return StorageJanitor(
+        str(tmp_path / "audio"), str(tmp_path / "video"),
+        is_live=lambda sid: sid in sessions.live,
+        busy=lambda: set(sessions.busy),
+        **kwargs,
+    )
+
+
+def _file(janitor, root, sid, name, size=100, age_h=0.0):
+    path = janitor.path(str(root), sid, name)
+    path.write_bytes(b"x" * size)
+    t = time.time() - age_h * HOUR
+    os.utime(path, (t, t))
+    return path
+
+
+def test_layout_and_classes(tmp_path):
+    janitor = _janitor(tmp_path, Sessions())
+    p = janitor.path(str(tmp_path / "video"), "abcdef", "upload.mp4")
+    assert p == tmp_path / "video" / "ab" / "abcdef" / "abcdef_upload.mp4"
+    assert StorageJanitor.classify(True, "s_chunk1.mp3") == AUDIO
+    assert StorageJanitor.classify(False, "s_dub_live.aac") == AUDIO
+    assert StorageJanitor.classify(False, "s_dub_live.snap3.aac") == AUDIO
+    assert StorageJanitor.classify(False, "s_final.mp4") == RENDER
+    assert StorageJanitor.classify(False, "s_upload.mp4") == UPLOAD
+    with pytest.raises(ValueError):
+        janitor.session_dir(str(tmp_path), "../escape")
+
+
+def test_retention_keeps_inputs_of_live_sessions(tmp_path):
+    sessions = Sessions("live1")
+    janitor = _janitor(tmp_path, sessions)
+    audio, video = tmp_path / "audio", tmp_path / "video"
+    live_clip = _file(janitor, audio, "live1", "c1.mp3", age_h=10)
+    live_render = _file(janitor, video, "live1", "final.mp4", age_h=50)
+    live_recent_render = _file(janitor, video, "live1", "subs.srt", age_h=1)
+    dead_clip = _file(janitor, audio, "dead1", "c1.mp3", age_h=10)
+    dead_upload = _file(janitor, video, "dead1", "upload.mp4", age_h=7)
+    dead_fresh = _file(janitor, audio, "dead1", "c2.mp3", age_h=1)
+
+    janitor.sweep()
+
+    assert live_clip.exists()
+    assert not live_render.exists()  # renders expire even for live sessions
+    assert live_recent_render.exists()
+    assert not dead_clip.exists()
+    assert not dead_upload.exists()
+    assert dead_fresh.exists()
+    usage = janitor.usage()
+    assert usage["deleted_files"] == 3
+    assert usage["classes"][AUDIO]["files"] == 2
+
+
+def test_leases_and_busy_sessions_are_never_swept(tmp_path):
+    sessions = Sessions()
+    janitor = _janitor(tmp_path, sessions)
+    leased = _file(janitor, tmp_path / "audio", "lease1", "c1.mp3", age_h=10)
+    busy = _file(janitor, tmp_path / "video", "busy1", "final.mp4", age_h=100)
+    sessions.busy.add("busy1")
+
+    with janitor.lease("lease1"):
+        with janitor.lease("lease1"):
+            pass
+        assert janitor.usage("lease1")["leased"]
+        janitor.sweep()
+        janitor.end_session("lease1")
+        assert leased.exists()
+    assert busy.exists()
+    assert not janitor.usage("lease1")["leased"]
+
+    janitor.sweep()
+    assert not leased.exists()
+    sessions.busy.clear()
+    janitor.sweep()
+    assert not busy.exists()
+
+
+def test_end_session_drops_inputs_but_keeps_renders(tmp_path):
+    sessions = Sessions("s1")
+    janitor = _janitor(tmp_path, sessions)
+    clip = _file(janitor, tmp_path / "audio", "s1", "c1.mp3")
+    track = _file(janitor, tmp_path / "video", "s1", "dub_live.aac")
+    upload = _file(janitor, tmp_path / "video", "s1", "upload.mp4")
+    render = _file(janitor, tmp_path / "video", "s1", "final.mp4")
+
+    janitor.end_session("s1")
+
+    assert not clip.exists() and not track.exists() and not upload.exists()
+    assert render.exists()
+
+
+def test_session_quota_removes_oldest_renders_and_refuses_writes(tmp_path):
+    sessions = Sessions("s1")
+    janitor = _janitor(tmp_path, sessions, session_max_bytes=1000)
+    video = tmp_path / "video"
+    upload = _file(janitor, video, "s1", "upload.mp4", size=600, age_h=2)
+    old_render = _file(janitor, video, "s1", "subs.srt", size=300, age_h=3)
+    new_render = _file(janitor, video, "s1", "final.mp4", size=300, age_h=2)
+    other = _file(janitor, video, "s2", "final.mp4", size=900, age_h=2)
+
+    janitor.sweep()
+
+    assert upload.exists() and new_render.exists() and other.exists()
+    assert not old_render.exists()
+    assert janitor.usage("s1")["bytes"] == 900
+    assert not janitor.over_quota("s1")
+
+    janitor.record("s1", 200)
+    assert janitor.over_quota("s1")
+    assert janitor.usage()["quota_refusals"] == 1
+
+
+def test_global_quota_removes_oldest_removable_first(tmp_path):
+    sessions = Sessions("live1")
+    janitor = _janitor(tmp_path, sessions, max_bytes=1000)
+    audio, video = tmp_path / "audio", tmp_path / "video"
+    live_input = _file(janitor, audio, "live1", "c1.mp3", size=400, age_h=5)
+    oldest_render = _file(janitor, video, "live1", "final.mp4", size=300, age_h=4)
+    dead_input = _file(janitor, audio, "dead1", "c1.mp3", size=300, age_h=3)
+    newer_render = _file(janitor, video, "dead2", "final.mp4", size=300, age_h=2)
+    fresh = _file(janitor, video, "dead3", "final.mp4", size=300)
+
+    usage = janitor.sweep()
+
+    assert live_input.exists()
+    assert not oldest_render.exists()
+    assert not dead_input.exists()
+    assert newer_render.exists() and fresh.exists()
+    assert usage["bytes"] == 1000
+
+
+def test_global_quota_cannot_remove_live_inputs(tmp_path):
+    sessions = Sessions("live1")
+    janitor = _janitor(tmp_path, sessions, max_bytes=100)
+    clip = _file(janitor, tmp_path / "audio", "live1", "c1.mp3", size=500, age_h=5)
+
+    usage = janitor.sweep()
+
+    assert clip.exists()
+    assert usage["bytes"] == 500
+
+
+def test_store_errors_keep_inputs(tmp_path):
+    def broken(sid):
+        raise RuntimeError("store down")
+
+    janitor = StorageJanitor(str(tmp_path / "audio"), str(tmp_path / "video"), is_live=broken)
+    clip = _file(janitor, tmp_path / "audio", "s1", "c1.mp3", age_h=100)
+    render = _file(janitor, tmp_path / "video", "s1", "final.mp4", age_h=100)
+
+    janitor.sweep()
+
+    assert clip.exists()
+    assert not render.exists()
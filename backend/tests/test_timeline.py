@@ -0,0 +1,108 @@
+from app.services.timeline import SegmentTimeline
+
+
+def _seg(start, end, text="", **extra):
+    return {"start_ms": start, "end_ms": end, "text": text, "translated_text": text.upper(), **extra}
+
+
+def _starts(segments):
+    return [s["start_ms"] for s in segments]
+
+
+def test_range_finds_overlaps_including_long_earlier_segment():
+    tl = SegmentTimeline()
+    tl.append(_seg(0, 30000, "long"))  # spans the whole queried window
+    for start in range(1000, 20000, 1000):
+        tl.append(_seg(start, start + 800, f"s{start}"))
+
+    got = tl.range(5000, 7000)
+    assert _starts(got) == [0, 5000, 6000]
+    # End is exclusive, a segment ending exactly at start_ms does not overlap
+    assert _starts(tl.range(5800, 6000)) == [0]
+    assert tl.range(40000, 50000) == []
+
+
+def test_late_append_is_kept_in_start_order():
+    tl = SegmentTimeline()
+    for start in (0, 2000, 4000):
+        tl.append(_seg(start, start + 1000))
+    tl.append(_seg(1000, 1500, "late"))
+
+    assert _starts(tl) == [0, 1000, 2000, 4000]
+    assert [s["text"] for s in tl.range(1200, 1300)] == ["late"]
+
+
+def test_window_returns_trailing_segments():
+    tl = SegmentTimeline()
+    for start in range(0, 600000, 10000):
+        tl.append(_seg(start, start + 5000))
+
+    got = tl.window(60000)
+    assert tl.end_ms == 595000
+    assert _starts(got) == list(range(540000, 600000, 10000))
+
+
+def test_strings_are_interned_once():
+    tl = SegmentTimeline()
+    for start in range(0, 10000, 1000):
+        tl.append(_seg(start, start + 500, "same", source_lang="en", target_lang="hi"))
+
+    stats = tl.stats()
+    assert stats["segments"] == 10
+    # "", "same", "SAME", "en", "hi"
+    assert stats["strings"] == 5
+    assert tl[3] == {
+        "start_ms": 3000, "end_ms": 3500, "text": "same", "translated_text": "SAME",
+        "audio_path": "", "source_lang": "en", "target_lang": "hi",
+    }
+
+
+def test_snapshot_is_not_affected_by_later_appends():
+    tl = SegmentTimeline()
+    tl.append(_seg(0, 1000, "a"))
+    snap = tl.snapshot()
+    tl.append(_seg(1000, 2000, "b"))
+
+    assert len(snap) == 1
+    assert len(tl) == 2
+    assert snap.range(0, 5000)[0]["text"] == "a"
+
+
+def test_journal_reload_restores_segments_and_meta(tmp_path):
+    path = str(tmp_path / "journal" / "sid.jsonl")
+    tl = SegmentTimeline(path)
+    tl.append(_seg(0, 1000, "hello", audio_path="/a.mp3"))
+    tl.append(_seg(2000, 3000, "hello"))
+    tl.append(_seg(1000, 1500, "late"))
+    tl.set_meta(chunks=3, timeline_ms=3000)
+    expected = list(tl)
+    tl.close()
+
+    loaded = SegmentTimeline.load(path)
+    assert list(loaded) == expected
+    assert loaded.meta == {"chunks": 3, "timeline_ms": 3000}
+    assert _starts(loaded.range(900, 1200)) == [0, 1000]
+
+    # The reloaded timeline keeps journaling
+    loaded.append(_seg(4000, 5000, "more"))
+    loaded.close()
+    assert len(SegmentTimeline.load(path)) == 4
+
+
+def test_journal_reload_ignores_torn_last_line(tmp_path):
+    path = str(tmp_path / "sid.jsonl")
+    tl = SegmentTimeline(path)
+    tl.append(_seg(0, 1000, "kept"))
+    tl.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('["g",1000,20')
+
+    loaded = SegmentTimeline.load(path)
+    assert [s["text"] for s in loaded] == ["kept"]
+
+    # The torn tail is dropped, so records appended after the reload survive the next one
+    loaded.append(_seg(2000, 3000, "after"))
+    loaded.close()
+    again = SegmentTimeline.load(path)
+    assert [s["text"] for s in again] == ["kept", "after"]
+    again.close(delete=True)
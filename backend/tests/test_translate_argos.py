@@ -0,0 +1,53 @@
+import pytest
+
+from app.services import translate_argos
+from app.services.translate_argos import ArgosTranslate
+
+
+class Translation:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.seen = []
+
+    def translate(self, text):
+        self.seen.append(text)
+        if text in self.failing:
+            raise RuntimeError("model error")
+        return text.upper()
+
+
+class Registry:
+    def __init__(self, tr):
+        self.tr = tr
+
+    def get(self, source, target):
+        return self.tr
+
+
+@pytest.fixture(autouse=True)
+def argos_installed(monkeypatch):
+    monkeypatch.setattr(translate_argos, "ARGOS_AVAILABLE", True)
+
+
+def test_batch_goes_through_the_public_translate_per_text():
+    tr = Translation()
+    argos = ArgosTranslate(Registry(tr))
+    # Multi-sentence texts reach Argos whole, so its own sentence splitting applies
+    texts = ["hola. que tal?", "", "line\nbreak"]
+    assert argos.translate_batch(texts, "es", "en") == ["HOLA. QUE TAL?", "", "LINE\nBREAK"]
+    assert tr.seen == ["hola. que tal?", "line\nbreak"]
+
+
+def test_failed_items_come_back_empty_unless_all_fail():
+    argos = ArgosTranslate(Registry(Translation(failing={"b"})))
+    assert argos.translate_batch(["a", "b"], "es", "en") == ["A", ""]
+
+    argos = ArgosTranslate(Registry(Translation(failing={"a", "b"})))
+    with pytest.raises(RuntimeError):
+        argos.translate_batch(["a", "b"], "es", "en")
+
+
+def test_missing_model_fails_fast():
+    argos = ArgosTranslate(Registry(None))
+    with pytest.raises(RuntimeError, match="not installed"):
+        argos.translate_batch(["a"], "es", "en")
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.services.translate_batcher import TranslationBatcher  # noqa: E402
+
+
+class Orchestrator:
+    def __init__(self, fail_on=""):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def translate_batch(self, texts, source, target):
+        self.calls.append((list(texts), source, target))
+        if self.fail_on in texts:
+            raise RuntimeError("provider down")
+        return [f"{target}:{t}" for t in texts]
+
+
+async def _run(fn, *args):
+    return fn(*args)
+
+
+def _batcher(orchestrator, **kwargs):
+    return TranslationBatcher(orchestrator, _run, **kwargs)
+
+
+def test_full_batch_flushes_without_waiting_for_the_timer():
+    orch = Orchestrator()
+    batcher = _batcher(orch, max_wait_ms=10_000, min_wait_ms=10_000)
+
+    async def main():
+        texts = ["a", "b", "c", "d"]  # the initial batch_limit
+        return await asyncio.wait_for(asyncio.gather(*(batcher.translate(t, "en", "hi") for t in texts)), 1.0)
+
+    assert asyncio.run(main()) == ["hi:a", "hi:b", "hi:c", "hi:d"]
+    assert orch.calls == [(["a", "b", "c", "d"], "en", "hi")]
+    stats = batcher.stats()
+    assert (stats["batches"], stats["full_batches"], stats["batch_limit"]) == (1, 1, 8)
+
+
+def test_partial_batch_flushes_after_the_delay_per_pair():
+    orch = Orchestrator()
+    batcher = _batcher(orch, min_wait_ms=20, max_wait_ms=20)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        outs = await asyncio.gather(
+            batcher.translate("a", "en", "hi"),
+            batcher.translate("a", "en", "hi"),
+            batcher.translate("b", "en", "fr"),
+            batcher.translate("", "en", "fr"),
+        )
+        return outs, loop.time() - t0
+
+    outs, elapsed = asyncio.run(main())
+
+    assert outs == ["hi:a", "hi:a", "fr:b", ""]
+    assert 0.015 <= elapsed < 1.0
+    # One call per pair; duplicate texts are translated once
+    assert sorted(orch.calls) == [(["a"], "en", "hi"), (["b"], "en", "fr")]
+
+
+def test_batch_failure_reaches_every_waiting_caller_only():
+    orch = Orchestrator(fail_on="bad")
+    batcher = _batcher(orch, min_wait_ms=5, max_wait_ms=5)
+
+    async def main():
+        return await asyncio.gather(
+            batcher.translate("ok", "en", "hi"),
+            batcher.translate("bad", "en", "hi"),
+            batcher.translate("ok", "en", "fr"),
+            return_exceptions=True,
+        )
+
+    hi_ok, hi_bad, fr_ok = asyncio.run(main())
+
+    assert isinstance(hi_ok, RuntimeError) and hi_bad is hi_ok
+    assert fr_ok == "fr:ok"
+
+
+def test_cancelled_caller_does_not_break_its_batch():
+    orch = Orchestrator()
+    batcher = _batcher(orch, min_wait_ms=20, max_wait_ms=20)
+
+    async def main():
+        gone = asyncio.ensure_future(batcher.translate("a", "en", "hi"))
+        kept = asyncio.ensure_future(batcher.translate("b", "en", "hi"))
+        await asyncio.sleep(0)
+        gone.cancel()
+        return await kept
+
+    assert asyncio.run(main()) == "hi:b"
+    assert orch.calls == [(["a", "b"], "en", "hi")]
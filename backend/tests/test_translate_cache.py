@@ -0,0 +1,88 @@
+from app.services import translate_cache
+from app.services.translate_cache import TranslationCache, normalize_text
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(translate_cache.time, "time", clock)
+    return TranslationCache(str(tmp_path / "cache" / "t.sqlite3"), **kwargs), clock
+
+
+def test_normalize_text():
+    assert normalize_text("  Hello\tWORLD \n") == "hello world"
+    assert normalize_text(None) == ""
+
+
+def test_memory_hit_and_key_parts(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch)
+    cache.put("Hello  World", "en", "hi", "namaste", "libre:a")
+
+    assert cache.get("hello world", "en", "hi") == ("namaste", "libre:a")
+    assert cache.get("hello world", "en", "fr") is None
+    assert cache.get("hello world", "en", "hi", provider="argos") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["puts"]) == (1, 2, 1)
+
+
+def test_memory_lru_evicts_least_recent_and_disk_serves_it(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch, memory_items=2)
+    cache.put("a", "en", "hi", "A", "p")
+    cache.put("b", "en", "hi", "B", "p")
+    cache.get("a", "en", "hi")  # a is now the most recent
+    cache.put("c", "en", "hi", "C", "p")  # evicts b from memory
+
+    assert cache.stats()["memory_items"] == 2
+    assert cache.get("a", "en", "hi") == ("A", "p")
+    assert cache.stats()["disk_hits"] == 0
+    assert cache.get("b", "en", "hi") == ("B", "p")
+    assert cache.stats()["disk_hits"] == 1
+    # The disk hit is promoted back into memory
+    assert cache.get("b", "en", "hi") == ("B", "p")
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_survives_reopen(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch)
+    cache.put("good morning", "en", "hi", "suprabhat", "argos")
+    cache.close()
+
+    reopened, _ = _cache(tmp_path, monkeypatch)
+    assert reopened.get("Good Morning", "en", "hi") == ("suprabhat", "argos")
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_ttl_expires_both_tiers(tmp_path, monkeypatch):
+    cache, clock = _cache(tmp_path, monkeypatch, ttl_seconds=60)
+    cache.put("a", "en", "hi", "A", "p")
+    clock.now += 30
+    assert cache.get("a", "en", "hi") == ("A", "p")
+
+    clock.now += 31
+    assert cache.get("a", "en", "hi") is None
+    assert cache.stats()["memory_items"] == 0
+
+
+def test_disk_tier_trimmed_by_last_access(tmp_path, monkeypatch):
+    cache, clock = _cache(tmp_path, monkeypatch, memory_items=0, max_entries=10, ttl_seconds=0)
+    cache.put("keep", "en", "hi", "K", "p")
+    for i in range(254):
+        clock.now += 1
+        cache.put(f"t{i}", "en", "hi", str(i), "p")
+    clock.now += 1
+    cache.get("keep", "en", "hi")  # touched, so it outlives older entries
+    clock.now += 1
+    cache.put("last", "en", "hi", "L", "p")  # 256th put runs the trim
+
+    assert cache.stats()["evictions"] == 246
+    assert cache.get("keep", "en", "hi") == ("K", "p")
+    assert cache.get("last", "en", "hi") == ("L", "p")
+    assert cache.get("t0", "en", "hi") is None
+    assert cache.get("t253", "en", "hi") == ("253", "p")
@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from app.services.provider_router import HALF_OPEN, ProviderRouter
+from app.services.translate_hedge import HedgeBudget, HedgedTranslator
+
+
+def _call(out, delay=0.0, error=None):
+    def fn():
+        time.sleep(delay)
+        if error:
+            raise error
+        return out
+    return fn
+
+
+@pytest.fixture
+def router():
+    return ProviderRouter(failure_threshold=1, open_seconds=0)
+
+
+def _hedger(router, **kwargs):
+    kwargs.setdefault("min_delay_ms", 50)
+    kwargs.setdefault("default_delay_ms", 50)
+    return HedgedTranslator(router, **kwargs)
+
+
+def test_fast_primary_fires_no_backup(router):
+    hedger = _hedger(router)
+    out = hedger.run([("a", _call("A")), ("b", _call("B"))], accept=bool)
+    assert out == ("A", "a")
+    stats = hedger.stats()
+    assert (stats["calls"], stats["backups_fired"], stats["extra_load_pct"]) == (1, 0, 0.0)
+    hedger.shutdown()
+
+
+def test_slow_primary_is_hedged_and_backup_wins(router):
+    hedger = _hedger(router)
+    t0 = time.monotonic()
+    out = hedger.run([("a", _call("A", delay=1.0)), ("b", _call("B", delay=0.01))], accept=bool)
+    assert out == ("B", "b")
+    assert time.monotonic() - t0 < 0.5
+    stats = hedger.stats()
+    assert (stats["backups_fired"], stats["backup_wins"]) == (1, 1)
+    hedger.shutdown()
+
+
+def test_failed_primary_falls_back_without_waiting(router):
+    hedger = _hedger(router, min_delay_ms=1000, default_delay_ms=1000)
+    t0 = time.monotonic()
+    out = hedger.run([("a", _call("", error=RuntimeError("down"))), ("b", _call("B"))], accept=bool)
+    assert out == ("B", "b")
+    assert time.monotonic() - t0 < 0.5
+    # A plain fallback is not a hedge
+    assert hedger.stats()["backups_fired"] == 0
+    hedger.shutdown()
+
+
+def test_rejected_answers_fall_through_and_all_failing_returns_empty(router):
+    hedger = _hedger(router)
+    assert hedger.run([("a", _call("same")), ("b", _call("other"))], accept=lambda o: o != "same") == ("other", "b")
+    assert hedger.run([("a", _call("", error=RuntimeError("x")))], accept=bool) == ("", "")
+    hedger.shutdown()
+
+
+def test_budget_limits_hedges_to_its_share():
+    budget = HedgeBudget(ratio=0.5, burst=1)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.earn()
+    assert not budget.try_spend()
+    budget.earn()
+    assert budget.try_spend()
+
+
+def test_denied_budget_waits_for_the_primary(router):
+    hedger = _hedger(router, budget=HedgeBudget(ratio=0.0, burst=1))
+    slow = [("a", _call("A", delay=0.2)), ("b", _call("B"))]
+    assert hedger.run(slow, accept=bool) == ("B", "b")  # spends the only token
+    assert hedger.run(slow, accept=bool) == ("A", "a")
+    stats = hedger.stats()
+    assert (stats["backups_fired"], stats["budget_denied"]) == (1, 1)
+    hedger.shutdown()
+
+
+def test_open_circuits_are_skipped(router):
+    router.record_failure("a", "down")
+    router.open_seconds = 60
+    hedger = _hedger(router)
+    assert hedger.run([("a", _call("A")), ("b", _call("B"))], accept=bool) == ("B", "b")
+    hedger.shutdown()
+
+
+class FirstOnlyExecutor:
+    """Runs the first submitted call in a thread and leaves the rest queued (never started)."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn):
+        fut = Future()
+        self.submitted += 1
+        if self.submitted == 1:
+            threading.Thread(target=lambda: fut.set_result(fn())).start()
+        return fut
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_cancelled_backup_hands_back_its_half_open_slot(router):
+    router.record_failure("b", "down")  # opens; open_seconds=0 makes the next allow() the trial
+    hedger = _hedger(router)
+    hedger._pool = FirstOnlyExecutor()
+
+    out = hedger.run([("a", _call("A", delay=0.3)), ("b", _call("B"))], accept=bool)
+
+    assert out == ("A", "a")
+    assert hedger.stats()["backups_fired"] == 1
+    health = router.health("b")
+    assert health.state == HALF_OPEN and not health.trial_inflight
+    # The next caller can claim the trial
+    assert router.allow("b")
@@ -0,0 +1,36 @@
+import os
+
+from app.services.tts_cache import TTSCache
+
+
+def test_reloaded_index_is_trimmed_to_the_budget(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=10_000)
+    keys = [TTSCache.key("es", f"frase {i}") for i in range(5)]
+    for i, key in enumerate(keys):
+        cache.put(key, bytes(1000))
+        os.utime(cache.path_for(key), (1000 + i, 1000 + i))
+
+    smaller = TTSCache(str(tmp_path), max_bytes=2_500)
+    assert smaller.stats()["disk_bytes"] <= 2_500
+    # Oldest clips go first
+    assert [k for k in keys if smaller.path_for(k).exists()] == keys[-2:]
+
+
+def test_link_copies_into_the_session_when_hard_links_fail(tmp_path, monkeypatch):
+    cache = TTSCache(str(tmp_path / "cache"))
+    key = TTSCache.key("es", "hola")
+    cache.put(key, b"mp3-bytes")
+
+    def no_links(src, dst):
+        raise OSError("cross-device link")
+
+    monkeypatch.setattr(os, "link", no_links)
+    dest = tmp_path / "session" / "clip.mp3"
+    assert cache.link(key, str(dest)) == str(dest)
+    assert dest.read_bytes() == b"mp3-bytes" and not os.path.samefile(dest, cache.path_for(key))
+
+    # An evicted entry is rebuilt from the bytes the caller still holds
+    cache.path_for(key).unlink()
+    other = tmp_path / "session" / "clip2.mp3"
+    assert cache.link(key, str(other), b"mp3-bytes") == str(other)
+    assert cache.link(key, str(tmp_path / "session" / "clip3.mp3")) == ""
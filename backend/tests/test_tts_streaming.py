@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("gtts")
+
+from app.services.tts_cache import TTSCache  # noqa: E402
+from app.services.tts_streaming import StreamingTTS, split_clauses  # noqa: E402
+
+TEXT = (
+    "This opening sentence is fairly long and keeps going for a while. Ok. "
+    "Then the second sentence arrives, with a clause; and another clause: and the end."
+)
+
+
+def _words(pieces):
+    return " ".join(pieces).split()
+
+
+def test_split_keeps_every_word_in_order():
+    pieces = split_clauses(TEXT, max_chars=120, first_chars=60)
+    assert len(pieces) > 1
+    assert _words(pieces) == TEXT.split()
+
+
+def test_split_caps_first_and_later_pieces():
+    pieces = split_clauses(TEXT * 3, max_chars=50, first_chars=30)
+    assert len(pieces[0]) <= 30
+    assert all(len(p) <= 50 for p in pieces)
+    assert _words(pieces) == (TEXT * 3).split()
+
+
+def test_short_fragments_are_merged():
+    pieces = split_clauses("Yes. No. Maybe so. I think that is right.", max_chars=120, first_chars=60, min_chars=12)
+    assert pieces == ["Yes. No. Maybe so.", "I think that is right."]
+
+
+def test_split_breaks_long_word_runs():
+    pieces = split_clauses("a" * 300, max_chars=120, first_chars=60)
+    assert [len(p) for p in pieces] == [60, 120, 120]
+
+
+def test_split_devanagari_and_cjk_sentences():
+    assert split_clauses("नमस्ते दुनिया। यह एक परीक्षण वाक्य है। ठीक है।") == ["नमस्ते दुनिया।", "यह एक परीक्षण वाक्य है। ठीक है।"]
+    # Full-width punctuation splits without whitespace and is re-joined without adding any
+    text = "你好，世界，这是一个非常非常长的测试句子，我们需要把它分开，因为它太长了。"
+    pieces = split_clauses(text, max_chars=30, first_chars=15)
+    assert len(pieces) > 1
+    assert "".join(pieces) == text
+
+
+def test_split_empty_text():
+    assert split_clauses("") == []
+    assert split_clauses("   \n ") == []
+
+
+class FakeTTS:
+    ENGINE = "fake"
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.voice = "v"
+        self.calls = []
+
+    def synthesize(self, text, lang):
+        self.calls.append(text)
+        # Later pieces finish first, so delivery order has to be enforced
+        time.sleep(0.05 if len(self.calls) == 1 else 0.0)
+        return text.encode()
+
+    def synthesize_clip(self, text, lang):
+        return self.synthesize(text, lang), ""
+
+
+def test_pieces_are_delivered_in_order_and_joined(tmp_path):
+    tts = FakeTTS(TTSCache(str(tmp_path)))
+    stream = StreamingTTS(tts, workers=4, max_chars=60, first_chars=30)
+    got = []
+    lock = threading.Lock()
+
+    def on_piece(i, data):
+        with lock:
+            got.append((i, data))
+
+    clip, key = stream.synthesize_clip(TEXT, "en", on_piece)
+    expected = split_clauses(TEXT, 60, 30)
+    assert [i for i, _ in got] == list(range(len(expected)))
+    assert [d for _, d in got] == [p.encode() for p in expected]
+    assert clip == b"".join(p.encode() for p in expected)
+    assert key == TTSCache.key("en", TEXT, "fake", "v")
+
+    # The whole clip is cached under the full-text key and served as one piece
+    got.clear()
+    again, _ = stream.synthesize_clip(TEXT, "en", on_piece)
+    assert again == clip
+    assert got == [(0, clip)]
+    assert stream.stats()["whole_hits"] == 1
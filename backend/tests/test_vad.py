@@ -0,0 +1,63 @@
+import numpy as np
+
+from app.utils.vad import VoiceActivityDetector
+
+RATE = 16000
+
+
+def _pcm(signal: np.ndarray) -> bytes:
+    return np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+
+
+def tone(seconds: float, amplitude: float = 8000.0, freq: float = 200.0) -> bytes:
+    t = np.arange(int(RATE * seconds)) / RATE
+    return _pcm(amplitude * np.sin(2 * np.pi * freq * t))
+
+
+def speechlike(seconds: float, amplitude: float = 8000.0, depth: float = 0.5, phase: float = 0.0) -> bytes:
+    """200 Hz carrier amplitude-modulated at a 4 Hz syllable rate."""
+    t = np.arange(int(RATE * seconds)) / RATE + phase
+    envelope = 1.0 - depth * 0.5 * (1.0 + np.sin(2 * np.pi * 4 * t))
+    return _pcm(amplitude * envelope * np.sin(2 * np.pi * 200 * t))
+
+
+def silence(seconds: float, noise: float = 0.0) -> bytes:
+    n = int(RATE * seconds)
+    if not noise:
+        return bytes(2 * n)
+    return _pcm(np.random.default_rng(0).normal(0, noise, n))
+
+
+def test_all_speech_first_chunk_is_kept():
+    vad = VoiceActivityDetector()
+    first = vad.process(tone(1.0), RATE)
+    second = vad.process(tone(1.0), RATE)
+    assert not first.silent and not second.silent
+    assert first.speech_ms >= 900
+
+
+def test_continuous_speechlike_chunks_are_never_dropped():
+    vad = VoiceActivityDetector()
+    results = [vad.process(speechlike(3.0, phase=3.0 * i), RATE) for i in range(5)]
+    assert all(not r.silent for r in results)
+    assert vad.stats()["speech_ratio"] > 0.9
+    assert vad.stats()["noise_floor_db"] <= vad.max_floor_db
+
+
+def test_pure_silence_is_dropped():
+    vad = VoiceActivityDetector()
+    assert vad.process(silence(1.0), RATE).silent
+    assert vad.process(silence(1.0, noise=30.0), RATE).silent
+    assert vad.stats()["skipped_chunks"] == 2
+
+
+def test_silence_speech_silence_is_trimmed_to_the_speech():
+    vad = VoiceActivityDetector(hangover_ms=150)
+    pcm = silence(1.0, noise=30.0) + tone(1.0) + silence(1.0, noise=30.0)
+    res = vad.process(pcm, RATE)
+    assert not res.silent
+    # One frame of pre-roll before, the hangover after
+    assert 900 <= res.start_ms <= 1000
+    assert 2000 <= res.end_ms <= 2200
+    # The next quiet chunk is dropped once the hangover has run out
+    assert vad.process(silence(1.0, noise=30.0), RATE).silent
@@ -1,5 +1,5 @@
 import React, { useEffect, useRef, useState } from 'react'
-import { startSession, stopSession, sendChunk, uploadVideo, renderVideo } from './api'
+import { startSession, stopSession, sendChunk, openAudioSocket, uploadVideo, renderVideo, waitForRender } from './api'
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
 
@@ -22,6 +22,7 @@ export default function App() {
   const audioStreamRef = useRef(null)
   const videoStreamRef = useRef(null)
   const sessionIdRef = useRef('')
+  const audioSocketRef = useRef(null) // dubbed pieces pushed while TTS runs
   const runningRef = useRef(false)
   const audioFlushTimerRef = useRef(null)
   // WebAudio WAV capture
@@ -119,20 +120,31 @@ export default function App() {
         clientTs,
         sourceLang,
         targetLang,
-        sessionId: sessionIdRef.current || sessionId || ''
+        sessionId: sessionIdRef.current || sessionId || '',
+        responseMode: audioSocketRef.current?.readyState === WebSocket.OPEN ? 'ws' : 'binary'
       })
       console.log('[chunk] resp', resp)
       setLastText(resp.text || '')
       setLastTranslated(resp.translated_text || '')
-      if (!resp || !resp.audio_b64) {
+      if (resp && resp.pushed) {
+        // Pieces were already queued from the audio socket as they rendered
+        setStatus('Ready')
+        return
+      }
+      let outBlob = resp && resp.audio
+      if (!outBlob && resp && resp.audio_b64) {
+        const audioBytes = atob(resp.audio_b64)
+        const arr = new Uint8Array(audioBytes.length)
+        for (let i = 0; i < audioBytes.length; i++) arr[i] = audioBytes.charCodeAt(i)
+        outBlob = new Blob([arr], { type: resp.mime || 'audio/mpeg' })
+      } else if (!outBlob && resp && resp.audio_url) {
+        outBlob = await (await fetch(`${API_BASE}${resp.audio_url}`)).blob()
+      }
+      if (!outBlob) {
         console.log('[chunk] no audio returned (likely silence), skipping playback')
         setStatus('No speech detected')
         return
       }
-      const audioBytes = atob(resp.audio_b64)
-      const arr = new Uint8Array(audioBytes.length)
-      for (let i = 0; i < audioBytes.length; i++) arr[i] = audioBytes.charCodeAt(i)
-      const outBlob = new Blob([arr], { type: resp.mime || 'audio/mpeg' })
       if (outBlob.size === 0) {
         console.warn('[chunk] empty audio blob, skipping')
         setStatus('Empty audio')
@@ -204,6 +216,13 @@ export default function App() {
       const { session_id } = await startSession()
       setSessionId(session_id)
       sessionIdRef.current = session_id
+      audioSocketRef.current = openAudioSocket({
+        sessionId: session_id,
+        onPiece: ({ blob, clientTs }) => {
+          audioQueueRef.current.push({ blob, clientTs })
+          playQueue()
+        },
+      })
       // Reset any previous outputs
       setFinalUrl('')
       setSrtUrl('')
@@ -312,7 +331,10 @@ export default function App() {
           uploadResp = await uploadVideo({ blob: videoBlob, sessionId, filename: 'session.webm' })
           setStatus('Rendering final video (merge audio + captions)...')
           // Trigger backend render BEFORE stopping the session (session holds segments)
-          renderResp = await renderVideo({ sessionId, burnSubs: true })
+          const job = await renderVideo({ sessionId, burnSubs: true })
+          renderResp = await waitForRender(job.job_id, {
+            onProgress: (j) => setStatus(`Rendering final video... ${Math.round((j.progress || 0) * 100)}% (${j.stage || j.status})`),
+          })
           // Build absolute URLs for convenience
           if (renderResp?.final_url) setFinalUrl(`${API_BASE}${renderResp.final_url}`)
           if (renderResp?.srt_url) setSrtUrl(`${API_BASE}${renderResp.srt_url}`)
@@ -320,6 +342,7 @@ export default function App() {
       }
 
       // Now safe to stop session
+      if (audioSocketRef.current) { audioSocketRef.current.close(); audioSocketRef.current = null }
       if (sessionIdRef.current) await stopSession(sessionIdRef.current)
       setSessionId('')
       sessionIdRef.current = ''
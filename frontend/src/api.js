@@ -14,15 +14,23 @@ export async function stopSession(sessionId) {
   return res.json()
 }
 
-export async function sendChunk({ blob, clientTs, sourceLang, targetLang, sessionId }) {
+// responseMode: 'binary' (multipart: meta JSON + raw MP3, no base64) | 'url' | 'json'
+//   | 'ws' (pieces arrive on openAudioSocket; resp.pushed) | 'stream' (chunked audio/mpeg)
+// Binary responses resolve to the meta fields plus `audio` (a Blob, absent for silence)
+export async function sendChunk({ blob, clientTs, sourceLang, targetLang, sessionId, responseMode = 'binary' }) {
   const form = new FormData()
   form.append('audio', blob, 'chunk.webm')
   form.append('client_ts', String(clientTs))
   form.append('source_lang', sourceLang)
   form.append('target_lang', targetLang)
   form.append('session_id', sessionId)
+  form.append('response_mode', responseMode)
   const res = await fetch(`${API_BASE}/api/chunk`, { method: 'POST', body: form })
   if (!res.ok) throw new Error('Chunk failed')
+  if ((res.headers.get('content-type') || '').startsWith('multipart/')) {
+    const parts = await res.formData()
+    return { ...JSON.parse(await parts.get('meta').text()), audio: parts.get('audio') }
+  }
   return res.json()
 }
 
@@ -35,11 +43,73 @@ export async function uploadVideo({ blob, sessionId, filename = 'session.webm' }
   return res.json()
 }
 
-export async function renderVideo({ sessionId, burnSubs = true }) {
+// subsMode: 'burn' | 'soft' (selectable tracks, no video re-encode) | 'none'; empty = burnSubs decides
+export async function renderVideo({ sessionId, burnSubs = true, subsMode = '', container = 'auto', originalTracks = false }) {
   const form = new FormData()
   form.append('session_id', sessionId)
   form.append('burn_subs', burnSubs ? '1' : '0')
+  if (subsMode) form.append('subs_mode', subsMode)
+  form.append('container', container)
+  form.append('original_tracks', originalTracks ? '1' : '0')
   const res = await fetch(`${API_BASE}/api/video/render`, { method: 'POST', body: form })
   if (!res.ok) throw new Error('Render failed')
+  return res.json() // { job_id, status, status_url }
+}
+
+export async function getRenderJob(jobId) {
+  const res = await fetch(`${API_BASE}/api/render/${jobId}`)
+  if (!res.ok) throw new Error('Render status failed')
+  return res.json()
+}
+
+export async function cancelRender(jobId) {
+  const res = await fetch(`${API_BASE}/api/render/${jobId}/cancel`, { method: 'POST' })
+  if (!res.ok) throw new Error('Render cancel failed')
   return res.json()
 }
+
+// Poll a render job until it finishes; onProgress receives each status snapshot
+export async function waitForRender(jobId, { intervalMs = 1000, onProgress } = {}) {
+  for (;;) {
+    const job = await getRenderJob(jobId)
+    onProgress && onProgress(job)
+    if (job.status === 'done') return job.result
+    if (job.status === 'failed' || job.status === 'cancelled') throw new Error(`Render ${job.status}: ${job.error || ''}`)
+    await new Promise((r) => setTimeout(r, intervalMs))
+  }
+}
+
+export function openAsrSocket({ sessionId, sampleRate = 16000, format = 'pcm16', sourceLang = '', onEvent }) {
+  const wsBase = API_BASE.replace(/^http/, 'ws')
+  const params = new URLSearchParams({ session_id: sessionId || '', sample_rate: String(sampleRate), format, source_lang: sourceLang })
+  const ws = new WebSocket(`${wsBase}/api/ws/asr?${params}`)
+  ws.binaryType = 'arraybuffer'
+  ws.onmessage = (e) => {
+    try { onEvent && onEvent(JSON.parse(e.data)) } catch (err) { console.error('[ws] bad event', err) }
+  }
+  return ws
+}
+
+// Dubbed audio pushed per TTS piece for chunks sent with responseMode 'ws'.
+// onPiece({ piece, clientTs, text, translatedText, blob }) fires as each piece arrives.
+export function openAudioSocket({ sessionId, onPiece, onEnd }) {
+  const wsBase = API_BASE.replace(/^http/, 'ws')
+  const ws = new WebSocket(`${wsBase}/api/ws/audio?${new URLSearchParams({ session_id: sessionId })}`)
+  ws.binaryType = 'arraybuffer'
+  let header = null
+  ws.onmessage = (e) => {
+    if (typeof e.data !== 'string') {
+      if (header && onPiece) {
+        onPiece({ piece: header.piece, clientTs: header.client_ts, text: header.text, translatedText: header.translated_text, blob: new Blob([e.data], { type: header.mime || 'audio/mpeg' }) })
+      }
+      header = null
+      return
+    }
+    try {
+      const msg = JSON.parse(e.data)
+      if (msg.type === 'audio') header = msg
+      else if (msg.type === 'audio_end') onEnd && onEnd(msg)
+    } catch (err) { console.error('[ws-audio] bad frame', err) }
+  }
+  return ws
+}